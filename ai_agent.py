@@ -1,16 +1,17 @@
 from typing import Dict, List, Optional, Any
 from langgraph.graph import StateGraph, END
 from langchain.schema import HumanMessage, AIMessage
-from database import PatientDatabase
+from database import PatientDatabase, get_shared_database
 from patient_intake import PatientIntake
 from insurance_collection import InsuranceCollector
 from scheduling import SmartScheduler
 from messaging import MessagingService
 from reminder_system import ReminderSystem
+from config import Config
 
 class ClinicSchedulingAgent:
-    def __init__(self):
-        self.db = PatientDatabase()
+    def __init__(self, db: PatientDatabase = None):
+        self.db = db if db is not None else get_shared_database()
         self.patient_intake = PatientIntake(self.db)
         self.insurance_collector = InsuranceCollector()
         self.scheduler = SmartScheduler(self.db)
@@ -38,6 +39,7 @@ class ClinicSchedulingAgent:
         workflow.add_node("insurance_collection", self._insurance_collection_node)
         workflow.add_node("scheduling", self._scheduling_node)
         workflow.add_node("confirmation", self._confirmation_node)
+        workflow.add_node("manage_appointment", self._manage_appointment_node)
         workflow.add_node("form_distribution", self._form_distribution_node)
         workflow.add_node("completion", self._completion_node)
         
@@ -59,6 +61,17 @@ class ClinicSchedulingAgent:
             {
                 "insurance_collection": "insurance_collection",
                 "patient_intake": "patient_intake",
+                "manage_appointment": "manage_appointment",
+                "end": END
+            }
+        )
+        
+        workflow.add_conditional_edges(
+            "manage_appointment",
+            self._route_after_manage,
+            {
+                "scheduling": "scheduling",
+                "completion": "completion",
                 "end": END
             }
         )
@@ -112,7 +125,7 @@ class ClinicSchedulingAgent:
 
 I'm your AI scheduling assistant. I can help you:
 - Schedule new appointments
-- Reschedule existing appointments
+- Reschedule or cancel existing appointments
 - Collect your information
 - Handle insurance details
 
@@ -132,6 +145,10 @@ Are you a new patient or returning patient? Please provide your first and last n
             state['conversation_history'].append(AIMessage(content=response))
             return state
         
+        # Check if we're confirming a close (fuzzy) name match by date of birth
+        if state.get('waiting_for') == 'patient_match_dob':
+            return self._confirm_patient_match(state)
+        
         # Check if user is indicating they are a new patient
         if 'new patient' in user_input or 'new' in user_input:
             response = "Great! I'll help you create a new patient record. Please provide your first and last name."
@@ -169,16 +186,17 @@ Are you a new patient or returning patient? Please provide your first and last n
         patient = self.db.find_patient(first_name, last_name)
         
         if patient:
-            state['patient_data'] = patient
-            response = f"Hello {patient['first_name']}! I found you in our system. "
-            
-            if patient.get('is_new_patient', True):
-                response += "I see you're a new patient. Let me collect some additional information and help you schedule your first appointment."
-            else:
-                response += "Welcome back! I can help you schedule your next appointment."
-            
+            self._greet_found_patient(state, patient)
+            return state
+        
+        candidates = self.db.match_patients(first_name, last_name, limit=1, min_score=Config.PATIENT_MATCH_THRESHOLD)
+        if candidates:
+            candidate = candidates[0]
+            response = f"I couldn't find an exact match for {first_name} {last_name}, but I found a similar name: {candidate['first_name']} {candidate['last_name']}. "
+            response += "To confirm it's you, please provide your date of birth (YYYY-MM-DD format)."
             state['conversation_history'].append(AIMessage(content=response))
-            state['current_step'] = 'insurance_collection'
+            state['patient_data'] = {'first_name': first_name, 'last_name': last_name, 'is_new_patient': True}
+            state['waiting_for'] = 'patient_match_dob'
         else:
             response = f"I couldn't find a patient named {first_name} {last_name} in our system. Let me help you create a new patient record. Please provide your date of birth (YYYY-MM-DD format)."
             state['conversation_history'].append(AIMessage(content=response))
@@ -187,6 +205,57 @@ Are you a new patient or returning patient? Please provide your first and last n
         
         return state
     
+    def _greet_found_patient(self, state: Dict, patient: Dict):
+        state['patient_data'] = patient
+        response = f"Hello {patient['first_name']}! I found you in our system. "
+        
+        if state.get('intent'):
+            # Asked to cancel or reschedule before giving a name: go straight to their appointments
+            state['current_step'] = 'manage_appointment'
+            self._manage_appointment_node(state)
+            response += state['conversation_history'].pop().content
+            state['conversation_history'].append(AIMessage(content=response))
+            return
+        
+        if patient.get('is_new_patient', True):
+            response += "I see you're a new patient. Let me collect some additional information and help you schedule your first appointment."
+        else:
+            response += "Welcome back! I can help you schedule your next appointment."
+        
+        state['conversation_history'].append(AIMessage(content=response))
+        state['current_step'] = 'insurance_collection'
+    
+    def _confirm_patient_match(self, state: Dict) -> Dict:
+        dob = state.get('user_input', '').strip()
+        patient_data = state.get('patient_data', {})
+        
+        is_valid, error_msg = self.patient_intake.validate_date_of_birth(dob)
+        if not is_valid:
+            response = f"Invalid date of birth: {error_msg}. Please try again."
+            state['conversation_history'].append(AIMessage(content=response))
+            return state
+        
+        state['waiting_for'] = None
+        candidates = self.db.match_patients(
+            patient_data['first_name'], patient_data['last_name'], dob,
+            min_score=Config.PATIENT_MATCH_THRESHOLD
+        )
+        for candidate in candidates:
+            if candidate['dob_match']:
+                patient = self.db.get_patient(candidate['patient_id'])
+                if patient:
+                    self._greet_found_patient(state, patient)
+                    return state
+        
+        patient_data['date_of_birth'] = dob
+        state['patient_data'] = patient_data
+        response = f"I couldn't match that date of birth to an existing record, so I'll create a new patient record for {patient_data['first_name']} {patient_data['last_name']}. "
+        response += "Would you like to provide your phone number? (optional)"
+        state['conversation_history'].append(AIMessage(content=response))
+        state['current_step'] = 'patient_intake'
+        state['waiting_for'] = 'phone'
+        return state
+    
     def _patient_intake_node(self, state: Dict) -> Dict:
         user_input = state.get('user_input', '').strip()
         patient_data = state.get('patient_data', {})
@@ -325,8 +394,10 @@ Are you a new patient or returning patient? Please provide your first and last n
         patient_data = state.get('patient_data', {})
         
         # Check if we need to show appointment options
+        session_id = state.get('session_id')
+        
         if not state.get('suggestions'):
-            suggestions = self.scheduler.suggest_appointment_times(patient_data)
+            suggestions = self.scheduler.suggest_appointment_times(patient_data, session_id=session_id)
             
             if suggestions['suggestions']:
                 response = f"Great! I found some available appointment times for you. "
@@ -342,6 +413,9 @@ Are you a new patient or returning patient? Please provide your first and last n
                     response += f"{i}. {suggestion['doctor_name']} - {suggestion['date']}\n"
                     for time_slot in suggestion['available_times'][:2]:
                         response += f"   - {time_slot.split()[1]}\n"
+                        # Offered times are held so another session cannot take them mid-conversation
+                        if session_id:
+                            self.scheduler.hold_slot(suggestion['doctor_name'], time_slot, session_id, suggestions['duration'])
                     response += "\n"
                 
                 response += "Please let me know which option you prefer, or if you'd like to see more options."
@@ -360,6 +434,10 @@ Are you a new patient or returning patient? Please provide your first and last n
             selected_appointment = self._parse_appointment_selection(user_input, state.get('suggestions', []))
             
             if selected_appointment:
+                if session_id:
+                    selected_slot = (selected_appointment['doctor_name'], f"{selected_appointment['appointment_date']} {selected_appointment['appointment_time']}")
+                    self.scheduler.hold_slot(*selected_slot, session_id, selected_appointment['duration'])
+                    self.scheduler.release_holds(session_id, keep=selected_slot)
                 state['appointment_data'] = selected_appointment
                 response = f"Great! I've selected:\n\n"
                 response += f"Doctor: {selected_appointment['doctor_name']}\n"
@@ -441,10 +519,30 @@ Are you a new patient or returning patient? Please provide your first and last n
                     patient_data['patient_id'] = saved_patient['patient_id']
                     state['patient_data'] = patient_data
             
-            # Now book the appointment
-            booking_result = self.scheduler.book_appointment(patient_data, appointment_data)
+            # Now book the appointment, or move the one being rescheduled
+            if state.get('reschedule_id'):
+                booking_result = self.scheduler.reschedule_appointment(state['reschedule_id'], appointment_data, state.get('session_id'))
+            else:
+                booking_result = self.scheduler.book_appointment(patient_data, appointment_data, state.get('session_id'))
             
-            if booking_result['success']:
+            if booking_result['success'] and state.get('reschedule_id'):
+                appointment_data['appointment_id'] = booking_result['appointment_id']
+                state['appointment_data'] = appointment_data
+                self.messaging_service.send_appointment_confirmation(patient_data, appointment_data)
+                self._notify_waitlist_offer(booking_result.get('waitlist_offer'))
+                
+                response = f"Done! Your appointment has been rescheduled.\n\n"
+                response += f"New Appointment ID: {appointment_data['appointment_id']}\n"
+                response += f"Doctor: {appointment_data['doctor_name']}\n"
+                response += f"Date: {appointment_data['appointment_date']}\n"
+                response += f"Time: {appointment_data['appointment_time']}\n\n"
+                response += "You will receive a confirmation email and SMS shortly."
+                
+                state['conversation_history'].append(AIMessage(content=response))
+                state['reschedule_id'] = None
+                state['intent'] = None
+                state['current_step'] = 'completion'
+            elif booking_result['success']:
                 appointment_data['appointment_id'] = booking_result['appointment_id']
                 # Ensure appointment_type is present for email templates
                 if 'appointment_type' not in appointment_data:
@@ -479,6 +577,14 @@ Are you a new patient or returning patient? Please provide your first and last n
                 
                 state['conversation_history'].append(AIMessage(content=response))
                 state['current_step'] = 'form_distribution'
+            elif booking_result.get('conflict'):
+                # Someone else got the slot first: offer fresh times straight away
+                state['suggestions'] = None
+                state['current_step'] = 'scheduling'
+                state = self._scheduling_node(state)
+                offer = state['conversation_history'].pop().content
+                response = f"I'm sorry, that time was just taken by another patient. {offer}"
+                state['conversation_history'].append(AIMessage(content=response))
             else:
                 response = f"I'm sorry, there was an issue booking your appointment: {booking_result['message']}"
                 state['conversation_history'].append(AIMessage(content=response))
@@ -489,6 +595,104 @@ Are you a new patient or returning patient? Please provide your first and last n
         
         return state
     
+    def _detect_intent(self, user_input: str) -> Optional[str]:
+        user_input = user_input.lower()
+        if 'reschedule' in user_input or 'move my appointment' in user_input:
+            return 'reschedule'
+        if 'cancel' in user_input:
+            return 'cancel'
+        return None
+    
+    def _describe_appointment(self, appointment: Dict) -> str:
+        return f"{appointment['doctor_name']} on {appointment['appointment_date']} at {appointment['appointment_time']} (ID: {appointment['appointment_id']})"
+    
+    def _manage_appointment_node(self, state: Dict) -> Dict:
+        user_input = state.get('user_input', '').strip().lower()
+        patient_data = state.get('patient_data', {})
+        intent = state.get('intent') or 'reschedule'
+        
+        if state.get('waiting_for') == 'appointment_choice':
+            appointments = state.get('manage_appointments', [])
+            choice = user_input.replace('option', '').strip()
+            if choice.isdigit() and 1 <= int(choice) <= len(appointments):
+                return self._start_appointment_change(state, appointments[int(choice) - 1])
+            response = f"Please choose an appointment by its number (1-{len(appointments)})."
+            state['conversation_history'].append(AIMessage(content=response))
+            return state
+        
+        if state.get('waiting_for') == 'cancel_confirmation':
+            if 'yes' in user_input or 'confirm' in user_input:
+                result = self.scheduler.cancel_appointment(state['manage_appointment_id'])
+                if result['success']:
+                    self._notify_waitlist_offer(result.get('waitlist_offer'))
+                    response = f"Your appointment with {self._describe_appointment(result['appointment'])} has been cancelled."
+                else:
+                    response = f"I'm sorry, there was an issue cancelling your appointment: {result['message']}"
+            else:
+                response = "No problem, I've kept your appointment as it is."
+            
+            state['conversation_history'].append(AIMessage(content=response))
+            state['waiting_for'] = None
+            state['intent'] = None
+            state['current_step'] = 'completion'
+            return state
+        
+        appointments = self.scheduler.get_upcoming_appointments(patient_data['patient_id'])
+        if not appointments:
+            response = f"I couldn't find any upcoming appointments for you to {intent}."
+            state['conversation_history'].append(AIMessage(content=response))
+            state['intent'] = None
+            state['current_step'] = 'completion'
+        elif len(appointments) == 1:
+            return self._start_appointment_change(state, appointments[0])
+        else:
+            response = f"Which appointment would you like to {intent}?\n\n"
+            for i, appointment in enumerate(appointments, 1):
+                response += f"{i}. {self._describe_appointment(appointment)}\n"
+            state['conversation_history'].append(AIMessage(content=response))
+            state['manage_appointments'] = appointments
+            state['waiting_for'] = 'appointment_choice'
+        
+        return state
+    
+    def _start_appointment_change(self, state: Dict, appointment: Dict) -> Dict:
+        state['manage_appointments'] = None
+        state['reschedule_id'] = None
+        
+        if state.get('intent') == 'cancel':
+            response = f"Your appointment is with {self._describe_appointment(appointment)}. "
+            response += "Would you like to cancel it? Please say 'yes' to cancel or 'no' to keep it."
+            state['conversation_history'].append(AIMessage(content=response))
+            state['manage_appointment_id'] = appointment['appointment_id']
+            state['waiting_for'] = 'cancel_confirmation'
+            return state
+        
+        # Rescheduling offers new times for a visit of the same kind, then confirms as a booking would
+        state['reschedule_id'] = appointment['appointment_id']
+        state['patient_data'] = {**state.get('patient_data', {}), 'is_new_patient': appointment['appointment_type'] == 'new_patient'}
+        state['suggestions'] = None
+        state['waiting_for'] = None
+        state['current_step'] = 'scheduling'
+        self._scheduling_node(state)
+        offer = state['conversation_history'].pop().content
+        response = f"Let's find a new time for your appointment with {self._describe_appointment(appointment)}. {offer}"
+        state['conversation_history'].append(AIMessage(content=response))
+        return state
+    
+    def _notify_waitlist_offer(self, offer: Optional[Dict]) -> Optional[Dict]:
+        """Tell the waitlisted patient a freed slot is being held for them; returns the messaging results"""
+        if not offer:
+            return None
+        patient = self.db.get_patient(offer['patient_id'])
+        if not patient:
+            print(f"Error sending waitlist offer {offer['waitlist_id']}: patient {offer['patient_id']} not found")
+            return None
+        try:
+            return self.messaging_service.send_waitlist_offer(patient, offer)
+        except Exception as e:
+            print(f"Error sending waitlist offer {offer['waitlist_id']} to {offer['patient_id']}: {e}")
+            return None
+    
     def _form_distribution_node(self, state: Dict) -> Dict:
         patient_data = state.get('patient_data', {})
         appointment_data = state.get('appointment_data', {})
@@ -518,9 +722,16 @@ Are you a new patient or returning patient? Please provide your first and last n
     def _route_after_lookup(self, state: Dict) -> str:
         if state.get('patient_data') and not state['patient_data'].get('patient_id'):
             return "patient_intake"
+        elif state.get('intent'):
+            return "manage_appointment"
         else:
             return "insurance_collection"
     
+    def _route_after_manage(self, state: Dict) -> str:
+        if state.get('reschedule_id'):
+            return "scheduling"
+        return "completion"
+    
     def _route_after_intake(self, state: Dict) -> str:
         return "insurance_collection"
     
@@ -547,6 +758,20 @@ Are you a new patient or returning patient? Please provide your first and last n
             # Handle the conversation flow manually for better control
             current_step = self.conversation_state.get('current_step', 'greeting')
             
+            # Cancel and reschedule requests are picked up before a new booking gets under way
+            intent = self._detect_intent(user_input)
+            if intent and current_step in ('greeting', 'patient_lookup', 'insurance_collection', 'completed'):
+                self.conversation_state['intent'] = intent
+                self.conversation_state['waiting_for'] = None
+                if self.conversation_state['patient_data'].get('patient_id'):
+                    current_step = 'manage_appointment'
+                else:
+                    response = f"I can help you {intent} your appointment. Please provide your first and last name."
+                    self.conversation_state['conversation_history'].append(AIMessage(content=response))
+                    self.conversation_state['greeting_shown'] = True
+                    self.conversation_state['current_step'] = 'patient_lookup'
+                    return response
+            
             if current_step == 'greeting':
                 result = self._greeting_node(self.conversation_state)
             elif current_step == 'patient_lookup':
@@ -559,6 +784,8 @@ Are you a new patient or returning patient? Please provide your first and last n
                 result = self._scheduling_node(self.conversation_state)
             elif current_step == 'confirmation':
                 result = self._confirmation_node(self.conversation_state)
+            elif current_step == 'manage_appointment':
+                result = self._manage_appointment_node(self.conversation_state)
             elif current_step == 'form_distribution':
                 result = self._form_distribution_node(self.conversation_state)
             elif current_step == 'completion':
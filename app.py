@@ -3,7 +3,8 @@ import pandas as pd
 from datetime import datetime, timedelta
 import os
 from ai_agent import ClinicSchedulingAgent
-from database import PatientDatabase
+from database import PatientDatabase, get_shared_database
+from frame_schema import formatted
 from reminder_system import ReminderSystem
 from messaging import MessagingService
 
@@ -14,18 +15,18 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Chat, dashboard and reminders all work on the one database instance of this process
 @st.cache_resource
-def load_agent():
-    return ClinicSchedulingAgent()
+def load_database():
+    return get_shared_database()
 
 @st.cache_resource
-def load_database():
-    return PatientDatabase()
+def load_agent():
+    return ClinicSchedulingAgent(load_database())
 
 @st.cache_resource
 def load_reminder_system():
-    db = PatientDatabase()
-    return ReminderSystem(db)
+    return load_agent().reminder_system
 
 def main():
     st.title("🏥 AI Healthcare Scheduling Agent")
@@ -140,6 +141,9 @@ def main():
     
     with tab2:
         st.header("📊 Clinic Dashboard")
+        # Chat bookings are already in db; this picks up other worker processes' writes
+        db.refresh_if_stale()
+        st.caption(f"Data version {db.version}")
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -214,9 +218,7 @@ def main():
                 doctor_names = [doc['name'] for doc in doctors]
                 selected_doctor = st.selectbox("Select Doctor:", doctor_names)
                 if selected_doctor:
-                    doctor_appointments = db.appointments_df[
-                        db.appointments_df['doctor_name'] == selected_doctor
-                    ]
+                    doctor_appointments = db.find_appointments(doctor_name=selected_doctor)
                     if not doctor_appointments.empty:
                         st.dataframe(doctor_appointments, width='stretch')
                     else:
@@ -225,9 +227,8 @@ def main():
             elif search_option == "Date":
                 selected_date = st.date_input("Select Date:")
                 if selected_date:
-                    date_appointments = db.appointments_df[
-                        db.appointments_df['appointment_date'] == selected_date.strftime('%Y-%m-%d')
-                    ]
+                    day = selected_date.strftime('%Y-%m-%d')
+                    date_appointments = db.appointment_history(start_date=day, end_date=day)
                     if not date_appointments.empty:
                         st.dataframe(date_appointments, width='stretch')
                     else:
@@ -345,7 +346,7 @@ def main():
         
         with col1:
             if st.button("Export Patients"):
-                csv = db.patients_df.to_csv(index=False)
+                csv = formatted(db.patients_df, 'patients').to_csv(index=False)
                 st.download_button(
                     label="Download Patients CSV",
                     data=csv,
@@ -355,7 +356,7 @@ def main():
         
         with col2:
             if st.button("Export Appointments"):
-                csv = db.appointments_df.to_csv(index=False)
+                csv = formatted(db.appointments_df, 'appointments').to_csv(index=False)
                 st.download_button(
                     label="Download Appointments CSV",
                     data=csv,
@@ -365,7 +366,7 @@ def main():
         
         with col3:
             if st.button("Export Schedule"):
-                csv = db.schedule_df.to_csv(index=False)
+                csv = formatted(db.schedule_df, 'schedule').to_csv(index=False)
                 st.download_button(
                     label="Download Schedule CSV",
                     data=csv,
@@ -373,6 +374,33 @@ def main():
                     mime="text/csv"
                 )
 
+        st.markdown("---")
+        st.subheader("⏱️ Startup Timing")
+        timings = getattr(db, 'load_timings', {})
+        if timings:
+            for name, value in timings.items():
+                st.write(f"- {name}: {value * 1000:.1f} ms" if isinstance(value, float) else f"- {name}: {value}")
+        else:
+            st.info("No load timings recorded for this storage backend")
+
+        st.markdown("---")
+        st.subheader("🧮 Memory")
+        memory = db.memory_report()
+        st.dataframe(pd.DataFrame([
+            {'Table': table, 'Rows': usage['rows'], 'Memory (KB)': round(usage['bytes'] / 1024, 1)}
+            for table, usage in memory.items()
+        ]), use_container_width=True)
+
+        st.markdown("---")
+        st.subheader("🗂️ Availability Cache")
+        # The chat agent's database is the one shared by every chat session
+        cache_stats = agent.db.availability_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+        col2.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+        col3.metric("Entries", cache_stats['entries'])
+        col4.metric("Invalidations", cache_stats['invalidations'])
+
         st.markdown("---")
         st.subheader("✉️ Email Diagnostics")
         test_email = st.text_input("Send a test email to:", value=os.getenv('EMAIL_USERNAME',''))
@@ -0,0 +1,66 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Hashable, List, Optional
+import numpy as np
+import pandas as pd
+
+
+def _day(date) -> int:
+    """Days since the epoch for a YYYY-MM-DD string, date or Timestamp"""
+    return int(np.datetime64(str(date)[:10], 'D').astype(np.int64))
+
+
+class AppointmentIndex:
+    """Secondary indexes from patient, doctor and date to appointments_df row labels.
+
+    Patient and doctor keys map to row lists in booking order. Dates are
+    kept as a sorted list of day numbers with the rows alongside, so a
+    date range is two bisects plus the rows it covers. Rows are only ever
+    added: a cancellation changes a row's status, not its keys, so callers
+    filter on status themselves.
+    """
+
+    def __init__(self):
+        self.by_patient: Dict[str, List[Hashable]] = {}
+        self.by_doctor: Dict[str, List[Hashable]] = {}
+        self.date_keys: List[int] = []
+        self.date_rows: List[Hashable] = []
+
+    @classmethod
+    def build(cls, appointments_df: pd.DataFrame) -> 'AppointmentIndex':
+        index = cls()
+        if appointments_df.empty:
+            return index
+
+        rows = appointments_df.index.to_numpy()
+        for column, mapping in (('patient_id', index.by_patient), ('doctor_name', index.by_doctor)):
+            for key, positions in appointments_df.groupby(column, sort=False, observed=True).indices.items():
+                mapping[str(key)] = rows[positions].tolist()
+
+        days = pd.to_datetime(appointments_df['appointment_date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        order = np.argsort(days, kind='stable')
+        index.date_keys = days[order].tolist()
+        index.date_rows = rows[order].tolist()
+        return index
+
+    def add(self, row: Hashable, appointment: Dict):
+        self.by_patient.setdefault(appointment['patient_id'], []).append(row)
+        self.by_doctor.setdefault(appointment['doctor_name'], []).append(row)
+        day = _day(appointment['appointment_date'])
+        position = bisect_right(self.date_keys, day)
+        self.date_keys.insert(position, day)
+        self.date_rows.insert(position, row)
+
+    def rows_for_patient(self, patient_id: str) -> List[Hashable]:
+        return self.by_patient.get(patient_id, [])
+
+    def rows_for_doctor(self, doctor_name: str) -> List[Hashable]:
+        return self.by_doctor.get(doctor_name, [])
+
+    def rows_between(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Hashable]:
+        """Rows dated from start_date through end_date (both inclusive, either open), in date order"""
+        low = bisect_left(self.date_keys, _day(start_date)) if start_date else 0
+        high = bisect_right(self.date_keys, _day(end_date)) if end_date else len(self.date_keys)
+        return self.date_rows[low:high]
+
+    def __len__(self) -> int:
+        return len(self.date_rows)
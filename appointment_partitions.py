@@ -0,0 +1,128 @@
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, List
+import pandas as pd
+from frame_schema import formatted
+
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logging.warning("pyarrow not available. Past appointment partitions will stay as CSV.")
+
+PARTITION_FILE = re.compile(r'^(\d{4}-\d{2})\.(csv|parquet)$')
+
+
+def hot_start(now: datetime, hot_months: int) -> str:
+    """First month, as YYYY-MM, kept in memory: the current month and hot_months before it"""
+    months = now.year * 12 + now.month - 1 - hot_months
+    return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+
+class AppointmentPartitions:
+    """Appointments stored as one file per month, YYYY-MM.csv, under data/appointments/.
+
+    Recent and future months are the working set: they are loaded at start
+    and rewritten on save, so neither depends on how much history there
+    is. Older months are read only when a report asks for them, and
+    archive() compacts them into zstd-compressed parquet files, which
+    are read in preference to a CSV of the same month.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.directory)
+
+    def months(self) -> Dict[str, str]:
+        """Path of every stored month, oldest first"""
+        paths = {}
+        if not self.exists():
+            return paths
+        for name in sorted(os.listdir(self.directory)):
+            match = PARTITION_FILE.match(name)
+            if match and (match.group(1) not in paths or match.group(2) == 'parquet'):
+                paths[match.group(1)] = os.path.join(self.directory, name)
+        return paths
+
+    def read(self, months: List[str]) -> pd.DataFrame:
+        """The given months concatenated, with columns as stored (dates as text)"""
+        paths = self.months()
+        frames = []
+        for month in months:
+            path = paths.get(month)
+            if path is None:
+                continue
+            frames.append(pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def read_from(self, first_month: str) -> pd.DataFrame:
+        return self.read([month for month in self.months() if month >= first_month])
+
+    def write(self, appointments_df: pd.DataFrame):
+        """Rewrite the partition of every month that has rows in appointments_df"""
+        os.makedirs(self.directory, exist_ok=True)
+        rows = formatted(appointments_df, 'appointments')
+        for month, partition in rows.groupby(rows['appointment_date'].astype(str).str[:7], sort=True):
+            path = os.path.join(self.directory, f"{month}.csv")
+            temp_path = path + '.tmp'
+            partition.to_csv(temp_path, index=False)
+            os.replace(temp_path, path)
+
+    def archive(self, before_month: str) -> List[str]:
+        """Compact every CSV month before before_month into parquet; returns the months archived"""
+        if not PYARROW_AVAILABLE:
+            return []
+
+        archived = []
+        for month, path in self.months().items():
+            if month >= before_month or not path.endswith('.csv'):
+                continue
+            parquet_path = os.path.join(self.directory, f"{month}.parquet")
+            temp_path = parquet_path + '.tmp'
+            pd.read_csv(path, dtype=str, keep_default_na=False).to_parquet(temp_path, index=False, compression='zstd')
+            # The parquet file is complete before the CSV goes, so a reader always finds the month
+            os.replace(temp_path, parquet_path)
+            os.remove(path)
+            archived.append(month)
+        return archived
+
+    def reassign_patient(self, old_patient_id: str, new_patient_id: str, months: List[str]) -> int:
+        """Move one patient's appointments in the given months to another patient, in place; returns how many moved"""
+        moved = 0
+        for month, path in self.months().items():
+            if month not in months:
+                continue
+            parquet = path.endswith('.parquet')
+            rows = pd.read_parquet(path) if parquet else pd.read_csv(path, dtype=str, keep_default_na=False)
+            mask = rows['patient_id'] == old_patient_id
+            if not mask.any():
+                continue
+            rows.loc[mask, 'patient_id'] = new_patient_id
+            temp_path = path + '.tmp'
+            if parquet:
+                rows.to_parquet(temp_path, index=False, compression='zstd')
+            else:
+                rows.to_csv(temp_path, index=False)
+            os.replace(temp_path, path)
+            moved += int(mask.sum())
+        return moved
+
+    def size_on_disk(self) -> Dict[str, int]:
+        return {month: os.path.getsize(path) for month, path in self.months().items()}
+
+
+if __name__ == "__main__":
+    import sys
+    from config import Config
+    from process_lock import ProcessLock
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    partitions = AppointmentPartitions(os.path.join(data_dir, "appointments"))
+    with ProcessLock(os.path.join(data_dir, ".write.lock")):
+        archived = partitions.archive(hot_start(datetime.now(), Config.APPOINTMENT_HOT_MONTHS))
+    print(f"Archived {len(archived)} month(s) in {partitions.directory}: {', '.join(archived) or 'none'}")
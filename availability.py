@@ -0,0 +1,296 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_ordinal(day: str) -> int:
+    return date.fromisoformat(day).toordinal()
+
+
+class AvailabilityBitmap:
+    """Per-doctor, per-day availability as two integer bitsets.
+
+    Bit i of a day stands for the i-th block of `granularity` minutes after
+    midnight. `free` has a bit set for every free block; `offered` has a bit
+    set where a bookable schedule slot starts. A slot is available when its
+    start bit is set in both, and a contiguous window of n blocks is a run
+    of n set bits in `free`, found with shifts and ANDs.
+
+    `open_days` keeps, per doctor, the sorted ordinals of days that still
+    have an available slot, so "next free slot after T" is a bisect.
+
+    With a `template` attached, days are not loaded up front: each one is
+    materialized from the recurring rules the first time a query or a
+    booking touches it, and day walks stop `horizon_days` out.
+
+    Each doctor-day costs two small ints however many slots it has.
+    """
+
+    def __init__(self, granularity: int = 15, slot_minutes: int = 60):
+        if 1440 % granularity:
+            raise ValueError("Slot granularity must divide a day evenly")
+        self.granularity = granularity
+        self.slot_minutes = slot_minutes
+        self.free: Dict[str, Dict[int, int]] = {}
+        self.offered: Dict[str, Dict[int, int]] = {}
+        self.open_days: Dict[str, List[int]] = {}
+        self.template = None
+        self.horizon_days = 365
+
+    @classmethod
+    def build(cls, schedule_df: pd.DataFrame, granularity: int = 15, slot_minutes: int = 60) -> 'AvailabilityBitmap':
+        bitmap = cls(granularity, slot_minutes)
+        if schedule_df.empty:
+            return bitmap
+
+        slot_times = pd.to_datetime(schedule_df['time_slot'], format='%Y-%m-%d %H:%M')
+        days = (slot_times.dt.normalize() - pd.Timestamp('1970-01-01')).dt.days + EPOCH_ORDINAL
+        minutes = slot_times.dt.hour * 60 + slot_times.dt.minute
+        available = schedule_df['is_available'].fillna(False).astype(bool)
+
+        for doctor_name, day, minute, is_available in zip(schedule_df['doctor_name'].tolist(), days.tolist(), minutes.tolist(), available.tolist()):
+            bitmap._add_slot(doctor_name, day, minute, is_available)
+
+        for doctor_name, offered in bitmap.offered.items():
+            free = bitmap.free[doctor_name]
+            bitmap.open_days[doctor_name] = sorted(day for day, mask in offered.items() if mask & free[day])
+        return bitmap
+
+    def copy(self) -> 'AvailabilityBitmap':
+        """Independent copy to plan against; an attached template is shared"""
+        bitmap = AvailabilityBitmap(self.granularity, self.slot_minutes)
+        bitmap.free = {doctor_name: dict(days) for doctor_name, days in self.free.items()}
+        bitmap.offered = {doctor_name: dict(days) for doctor_name, days in self.offered.items()}
+        bitmap.open_days = {doctor_name: list(days) for doctor_name, days in self.open_days.items()}
+        bitmap.template = self.template
+        bitmap.horizon_days = self.horizon_days
+        return bitmap
+
+    def _blocks(self, minute: int, duration: int) -> int:
+        first = minute // self.granularity
+        count = max(1, -(-int(duration) // self.granularity))
+        return ((1 << count) - 1) << first
+
+    def _add_slot(self, doctor_name: str, day: int, minute: int, is_available: bool):
+        offered = self.offered.setdefault(doctor_name, {})
+        free = self.free.setdefault(doctor_name, {})
+        offered.setdefault(day, 0)
+        free.setdefault(day, 0)
+        if is_available:
+            offered[day] |= 1 << (minute // self.granularity)
+            free[day] |= self._blocks(minute, self.slot_minutes)
+
+    def _reindex_day(self, doctor_name: str, day: int):
+        days = self.open_days.setdefault(doctor_name, [])
+        position = bisect_left(days, day)
+        listed = position < len(days) and days[position] == day
+        is_open = bool(self.offered[doctor_name].get(day, 0) & self.free[doctor_name].get(day, 0))
+        if is_open and not listed:
+            days.insert(position, day)
+        elif listed and not is_open:
+            del days[position]
+
+    def _materialize(self, doctor_name: str, day: int):
+        if self.template is None or day in self.free.get(doctor_name, {}):
+            return
+        free, offered = self.template.day_masks(doctor_name, day)
+        self.open_day(doctor_name, day, free, offered)
+
+    def _days(self, doctor_name: str, first_day: int = None, last_day: int = None) -> List[int]:
+        """Open days of a doctor between two ordinals, materializing template days in that range"""
+        if self.template is not None:
+            first_day = date.today().toordinal() if first_day is None else first_day
+            last_day = first_day + self.horizon_days if last_day is None else last_day
+            for day in range(first_day, last_day + 1):
+                self._materialize(doctor_name, day)
+
+        days = self.open_days.get(doctor_name, [])
+        low = 0 if first_day is None else bisect_left(days, first_day)
+        high = len(days) if last_day is None else bisect_right(days, last_day)
+        return days[low:high]
+
+    def open_day(self, doctor_name: str, day: int, free: int, offered: int):
+        """Set a whole doctor-day at once from precomputed free and offered masks"""
+        self.free.setdefault(doctor_name, {})[day] = free
+        self.offered.setdefault(doctor_name, {})[day] = offered
+        self._reindex_day(doctor_name, day)
+
+    def forget_day(self, doctor_name: str, day: int):
+        """Drop a doctor-day, so an attached template materializes it afresh the next time it is touched"""
+        self.free.get(doctor_name, {}).pop(day, None)
+        self.offered.get(doctor_name, {}).pop(day, None)
+        days = self.open_days.get(doctor_name, [])
+        position = bisect_left(days, day)
+        if position < len(days) and days[position] == day:
+            del days[position]
+
+    def add_slot(self, doctor_name: str, slot_time: datetime, is_available: bool = True):
+        day = slot_time.toordinal()
+        self._add_slot(doctor_name, day, slot_time.hour * 60 + slot_time.minute, is_available)
+        self._reindex_day(doctor_name, day)
+
+    def claim(self, doctor_name: str, start: datetime, duration: int):
+        """Mark [start, start + duration) busy; the slot starting there stops being offered"""
+        day = start.toordinal()
+        self._materialize(doctor_name, day)
+        minute = start.hour * 60 + start.minute
+        free = self.free.setdefault(doctor_name, {})
+        offered = self.offered.setdefault(doctor_name, {})
+        free[day] = free.get(day, 0) & ~self._blocks(minute, duration)
+        offered[day] = offered.get(day, 0) & ~(1 << (minute // self.granularity))
+        self._reindex_day(doctor_name, day)
+
+    def release(self, doctor_name: str, start: datetime, duration: int, offered: bool = True):
+        """Give [start, start + duration) back, re-offering the slot that starts there"""
+        day = start.toordinal()
+        self._materialize(doctor_name, day)
+        minute = start.hour * 60 + start.minute
+        free = self.free.setdefault(doctor_name, {})
+        offered_days = self.offered.setdefault(doctor_name, {})
+        free[day] = free.get(day, 0) | self._blocks(minute, duration)
+        offered_days.setdefault(day, 0)
+        if offered:
+            offered_days[day] |= 1 << (minute // self.granularity)
+        self._reindex_day(doctor_name, day)
+
+    def _bits(self, mask: int) -> Iterator[int]:
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+
+    def _slot_time(self, day: int, bit: int) -> datetime:
+        return datetime.fromordinal(day) + timedelta(minutes=bit * self.granularity)
+
+    def _available_mask(self, doctor_name: str, day: int, duration: int = None) -> int:
+        """Offered starts on a day that are free, or followed by `duration` free minutes if given"""
+        self._materialize(doctor_name, day)
+        offered = self.offered.get(doctor_name, {}).get(day, 0)
+        free = self.free.get(doctor_name, {}).get(day, 0)
+        return offered & (free if duration is None else self._runs(free, duration))
+
+    def available_slot_times(self, doctor_name: str, date_str: str = None, duration: int = None) -> List[datetime]:
+        days = [day_ordinal(date_str)] if date_str else self._days(doctor_name)
+
+        slot_times = []
+        for day in days:
+            for bit in self._bits(self._available_mask(doctor_name, day, duration)):
+                slot_times.append(self._slot_time(day, bit))
+        return slot_times
+
+    def _day_minutes(self, doctor_name: str, day: int, duration: int = None) -> List[int]:
+        day_start = (day - EPOCH_ORDINAL) * 1440
+        return [day_start + bit * self.granularity for bit in self._bits(self._available_mask(doctor_name, day, duration))]
+
+    def available_slot_starts(self, doctor_name: str, date_str: str = None, duration: int = None) -> np.ndarray:
+        """Available slot starts as a sorted datetime64[m] array"""
+        days = [day_ordinal(date_str)] if date_str else self._days(doctor_name)
+
+        minutes = []
+        for day in days:
+            minutes.extend(self._day_minutes(doctor_name, day, duration))
+        return np.array(minutes, dtype='int64').view('datetime64[m]')
+
+    def horizon_slot_starts(self, doctor_names: List[str], start_date: str, end_date: str, duration: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Available slot starts of several doctors between two dates, inclusive.
+
+        Returns parallel arrays of positions in `doctor_names` and datetime64[m]
+        starts, ordered by doctor and then by time.
+        """
+        first_day = day_ordinal(start_date)
+        last_day = day_ordinal(end_date)
+
+        codes = []
+        minutes = []
+        for code, doctor_name in enumerate(doctor_names):
+            for day in self._days(doctor_name, first_day, last_day):
+                day_minutes = self._day_minutes(doctor_name, day, duration)
+                codes.extend([code] * len(day_minutes))
+                minutes.extend(day_minutes)
+
+        return np.array(codes, dtype='int32'), np.array(minutes, dtype='int64').view('datetime64[m]')
+
+    def _runs(self, mask: int, duration: int) -> int:
+        needed = max(1, -(-int(duration) // self.granularity))
+        run = mask
+        for shift in range(1, needed):
+            run &= mask >> shift
+            if not run:
+                break
+        return run
+
+    def window_starts(self, doctor_name: str, date_str: str, duration: int) -> int:
+        """Bitset of blocks that begin `duration` minutes of uninterrupted free time"""
+        day = day_ordinal(date_str)
+        self._materialize(doctor_name, day)
+        return self._runs(self.free.get(doctor_name, {}).get(day, 0), duration)
+
+    def first_window(self, doctor_name: str, date_str: str, duration: int) -> Optional[datetime]:
+        run = self.window_starts(doctor_name, date_str, duration)
+        if not run:
+            return None
+        return self._slot_time(day_ordinal(date_str), (run & -run).bit_length() - 1)
+
+    def free_intervals(self, doctor_name: str, date_str: str) -> List[Tuple[datetime, datetime]]:
+        """Maximal free stretches of a day as (start, end) pairs"""
+        day = day_ordinal(date_str)
+        self._materialize(doctor_name, day)
+        mask = self.free.get(doctor_name, {}).get(day, 0)
+
+        intervals = []
+        while mask:
+            start = (mask & -mask).bit_length() - 1
+            shifted = mask >> start
+            length = (~shifted & (shifted + 1)).bit_length() - 1
+            intervals.append((self._slot_time(day, start), self._slot_time(day, start + length)))
+            mask &= ~(((1 << length) - 1) << start)
+        return intervals
+
+    def capacity(self, doctor_name: str, date_str: str, duration: int) -> int:
+        """How many back-to-back visits of `duration` minutes still fit in the day's free time"""
+        needed = max(1, -(-int(duration) // self.granularity))
+        blocks = [int((end - start).total_seconds() // 60) // self.granularity for start, end in self.free_intervals(doctor_name, date_str)]
+        return sum(length // needed for length in blocks)
+
+    def iter_free_slots(self, doctor_name: str, after: datetime, duration: int) -> Iterator[datetime]:
+        """Available slots starting at or after `after` with `duration` free minutes, in time order"""
+        first_day = after.toordinal()
+        after_minute = after.hour * 60 + after.minute + (1 if after.second or after.microsecond else 0)
+        first_bit = -(-after_minute // self.granularity)
+
+        if self.template is None:
+            # Slicing copies the day list, so callers may book while consuming the generator
+            days = self.open_days.get(doctor_name, [])[bisect_left(self.open_days.get(doctor_name, []), first_day):]
+        else:
+            days = range(first_day, first_day + self.horizon_days + 1)
+
+        for day in days:
+            mask = self._available_mask(doctor_name, day, duration)
+            if day == first_day:
+                mask &= ~((1 << first_bit) - 1)
+            for bit in self._bits(mask):
+                yield self._slot_time(day, bit)
+
+    def next_free_slot(self, doctor_name: str, after: datetime, duration: int) -> Optional[datetime]:
+        return next(self.iter_free_slots(doctor_name, after, duration), None)
+
+    def is_offered(self, doctor_name: str, start: datetime) -> bool:
+        """Whether a slot starts at `start`, booked or not aside"""
+        day = start.toordinal()
+        self._materialize(doctor_name, day)
+        minute = start.hour * 60 + start.minute
+        if minute % self.granularity:
+            return False
+        return bool(self.offered.get(doctor_name, {}).get(day, 0) & (1 << (minute // self.granularity)))
+
+    def is_free(self, doctor_name: str, start: datetime, duration: int) -> bool:
+        self._materialize(doctor_name, start.toordinal())
+        blocks = self._blocks(start.hour * 60 + start.minute, duration)
+        return self.free.get(doctor_name, {}).get(start.toordinal(), 0) & blocks == blocks
+
+    def doctor_days(self) -> int:
+        return sum(len(days) for days in self.free.values())
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class AvailabilityCache:
+    """LRU/TTL cache of suitable slot times keyed by (doctor, date, duration).
+
+    Entries are stamped with the clock reading they were computed at and
+    expire after `ttl_seconds`, or as soon as their earliest slot is in the
+    past, whichever comes first. Bookings and releases drop every duration
+    cached for the affected doctor and date and nothing else.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.entries: 'OrderedDict[Tuple[str, str, int], Tuple[List[str], datetime, datetime]]' = OrderedDict()
+        self.keys_by_day: Dict[Tuple[str, str], Set[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, doctor_name: str, date: str, duration: int, now: datetime) -> Optional[List[str]]:
+        key = (doctor_name, date, duration)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                slot_times, computed_at, expires_at = entry
+                if computed_at <= now < expires_at:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return slot_times
+                self._discard(key)
+            self.misses += 1
+            return None
+
+    def put(self, doctor_name: str, date: str, duration: int, slot_times: List[str], now: datetime):
+        expires_at = now + self.ttl
+        if slot_times:
+            expires_at = min(expires_at, datetime.strptime(slot_times[0], '%Y-%m-%d %H:%M'))
+
+        key = (doctor_name, date, duration)
+        with self._lock:
+            self.entries[key] = (slot_times, now, expires_at)
+            self.entries.move_to_end(key)
+            self.keys_by_day.setdefault((doctor_name, date), set()).add(duration)
+            while len(self.entries) > self.max_entries:
+                self._discard(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _discard(self, key: Tuple[str, str, int]):
+        self.entries.pop(key, None)
+        durations = self.keys_by_day.get(key[:2])
+        if durations is not None:
+            durations.discard(key[2])
+            if not durations:
+                del self.keys_by_day[key[:2]]
+
+    def invalidate(self, doctor_name: str, date: str) -> int:
+        """Drop every cached duration for one doctor-day; returns how many entries went"""
+        with self._lock:
+            durations = self.keys_by_day.pop((doctor_name, date), set())
+            for duration in durations:
+                self.entries.pop((doctor_name, date, duration), None)
+            self.invalidations += len(durations)
+            return len(durations)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.keys_by_day.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions
+            }
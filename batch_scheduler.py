@@ -0,0 +1,161 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from availability import AvailabilityBitmap
+from scheduling import SmartScheduler
+
+
+class BatchScheduler:
+    """Assigns many appointment requests to free slots in one pass.
+
+    Used to rebook patients in bulk, e.g. after a doctor cancels a day or
+    new clinic hours open. Each request is a dict with:
+
+        patient_id        required
+        is_new_patient    picks the visit length, as in the chat flow (default True)
+        doctor_name       preferred doctor, tried before the others
+        preferred_only    never place the request with another doctor
+        earliest_date     first acceptable day, YYYY-MM-DD (default tomorrow)
+        latest_date       last acceptable day, YYYY-MM-DD (default: no limit)
+        priority          higher is placed first (default 0)
+
+    Requests are placed greedily: by priority, then the narrowest date
+    window first, then input order. Each takes the earliest suitable slot
+    of its preferred doctor, falling back to the earliest one across the
+    other doctors. Planning claims slots on a copy of the availability
+    bitmap, so every lookup is a bisect and a few mask operations and the
+    live data is untouched until the whole plan is booked in one write.
+    """
+
+    def __init__(self, scheduler: SmartScheduler):
+        self.scheduler = scheduler
+        self.db = scheduler.db
+
+    def _duration(self, request: Dict) -> int:
+        if request.get('is_new_patient', True):
+            return self.scheduler.new_patient_duration
+        return self.scheduler.returning_patient_duration
+
+    def _window(self, request: Dict) -> Tuple[datetime, Optional[datetime]]:
+        after = self.scheduler._search_start()
+        if request.get('earliest_date'):
+            after = max(after, datetime.strptime(request['earliest_date'], '%Y-%m-%d'))
+        before = None
+        if request.get('latest_date'):
+            before = datetime.strptime(request['latest_date'], '%Y-%m-%d') + timedelta(days=1)
+        return after, before
+
+    def _order(self, requests: List[Dict]) -> List[int]:
+        def key(index: int):
+            request = requests[index]
+            after, before = self._window(request)
+            window_days = (before - after).days if before else float('inf')
+            return -request.get('priority', 0), window_days, index
+        return sorted(range(len(requests)), key=key)
+
+    def _candidates(self, plan: AvailabilityBitmap, doctor_name: str, after: datetime, before: Optional[datetime], duration: int) -> Iterator[Tuple[datetime, str]]:
+        for slot_time in plan.iter_free_slots(doctor_name, after, duration):
+            if before is not None and slot_time >= before:
+                return
+            yield slot_time, doctor_name
+
+    def _place(self, plan: AvailabilityBitmap, request: Dict, doctor_names: List[str], now: datetime) -> Optional[Tuple[str, datetime]]:
+        duration = self._duration(request)
+        after, before = self._window(request)
+
+        preferred = request.get('doctor_name')
+        if preferred:
+            groups = [[preferred]]
+            if not request.get('preferred_only'):
+                groups.append([name for name in doctor_names if name != preferred])
+        else:
+            groups = [doctor_names]
+
+        for group in groups:
+            streams = heapq.merge(*(self._candidates(plan, name, after, before, duration) for name in group))
+            for slot_time, doctor_name in streams:
+                time_slot = slot_time.strftime('%Y-%m-%d %H:%M')
+                if not self.scheduler._suitable_mask(np.array([slot_time], dtype='datetime64[m]'), now)[0]:
+                    continue
+                if self.db.slot_holds.is_held_by_other(doctor_name, time_slot, duration=duration):
+                    continue
+                return doctor_name, slot_time
+        return None
+
+    def plan(self, requests: List[Dict]) -> Dict:
+        """Assignments for the requests without booking anything"""
+        doctor_names = [doctor['name'] for doctor in self.db.get_doctors()]
+        known_doctors = set(doctor_names)
+        now = self.scheduler.clock()
+        plan = self.db.availability.copy()
+
+        assigned = []
+        unplaced = []
+        for index in self._order(requests):
+            request = requests[index]
+            if request.get('doctor_name') and request['doctor_name'] not in known_doctors:
+                unplaced.append({'request_index': index, 'patient_id': request.get('patient_id'), 'reason': f"Unknown doctor {request['doctor_name']}"})
+                continue
+
+            placement = self._place(plan, request, doctor_names, now)
+            if placement is None:
+                unplaced.append({'request_index': index, 'patient_id': request.get('patient_id'), 'reason': 'No free slot in the requested window'})
+                continue
+
+            doctor_name, slot_time = placement
+            duration = self._duration(request)
+            plan.claim(doctor_name, slot_time, duration)
+            assigned.append({
+                'request_index': index,
+                'patient_id': request['patient_id'],
+                'doctor_name': doctor_name,
+                'appointment_date': slot_time.strftime('%Y-%m-%d'),
+                'appointment_time': slot_time.strftime('%H:%M'),
+                'duration': duration,
+                'appointment_type': 'new_patient' if request.get('is_new_patient', True) else 'returning_patient'
+            })
+
+        unplaced.sort(key=lambda entry: entry['request_index'])
+        return {'assigned': assigned, 'unplaced': unplaced}
+
+    def schedule(self, requests: List[Dict], book: bool = True) -> Dict:
+        """Plan the requests and, unless `book` is False, book every assignment in one batch"""
+        try:
+            result = self.plan(requests)
+
+            if book and result['assigned']:
+                appointment_ids = self.db.book_appointments([
+                    {
+                        'patient_id': assignment['patient_id'],
+                        'doctor_name': assignment['doctor_name'],
+                        'appointment_date': assignment['appointment_date'],
+                        'appointment_time': assignment['appointment_time'],
+                        'duration_minutes': assignment['duration'],
+                        'appointment_type': assignment['appointment_type']
+                    }
+                    for assignment in result['assigned']
+                ])
+
+                booked = []
+                for assignment, appointment_id in zip(result['assigned'], appointment_ids):
+                    if appointment_id is None:
+                        # Taken by a live booking between planning and booking
+                        result['unplaced'].append({'request_index': assignment['request_index'], 'patient_id': assignment['patient_id'], 'reason': 'Slot was taken while booking'})
+                    else:
+                        assignment['appointment_id'] = appointment_id
+                        booked.append(assignment)
+                result['assigned'] = booked
+                result['unplaced'].sort(key=lambda entry: entry['request_index'])
+
+            result['success'] = True
+            result['message'] = f"Placed {len(result['assigned'])} of {len(requests)} requests"
+            return result
+
+        except Exception as e:
+            return {
+                'success': False,
+                'assigned': [],
+                'unplaced': [],
+                'message': f"Batch scheduling failed: {str(e)}"
+            }
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+
+def _candidate_slots(data_dir: str, duration: int) -> List[Tuple[str, str]]:
+    from database import PatientDatabase
+
+    db = PatientDatabase(data_dir, journal_mode=False)
+    slots = []
+    for doctor in db.get_doctors():
+        for slot_time in db.available_slot_starts(doctor['name'], None, duration):
+            slots.append((doctor['name'], str(slot_time).replace('T', ' ')[:16]))
+    return slots
+
+
+def _worker(data_dir: str, journal_mode: bool, slots: List[Tuple[str, str]], seed: int, duration: int, queue):
+    from database import BookingConflictError, PatientDatabase
+
+    db = PatientDatabase(data_dir, journal_mode=journal_mode)
+    # Every worker goes after every slot, in its own order, so they collide constantly
+    slots = list(slots)
+    random.Random(seed).shuffle(slots)
+
+    booked = []
+    conflicts = 0
+    start = time.time()
+    for doctor_name, time_slot in slots:
+        try:
+            appointment_id = db.book_appointment({
+                'patient_id': f"P{1001 + seed}",
+                'doctor_name': doctor_name,
+                'appointment_date': time_slot[:10],
+                'appointment_time': time_slot[11:],
+                'duration_minutes': duration,
+                'appointment_type': 'new_patient'
+            })
+            booked.append((appointment_id, doctor_name, time_slot))
+        except BookingConflictError:
+            conflicts += 1
+    end = time.time()
+    db.close()
+    queue.put({'booked': booked, 'conflicts': conflicts, 'start': start, 'end': end})
+
+
+def run_stress(processes: int, source_dir: str = "data", journal_mode: bool = True, duration: int = 60, slot_limit: int = None) -> Dict:
+    """N processes race to book every free slot of a fresh copy of source_dir.
+
+    Returns throughput and a consistency check: each slot must be booked
+    exactly once, and every booking a process reported must be on disk.
+    """
+    from database import PatientDatabase
+
+    data_dir = os.path.join(tempfile.mkdtemp(prefix="booking_stress_"), "data")
+    shutil.copytree(source_dir, data_dir, ignore=shutil.ignore_patterns(".cache", "booking_journal.jsonl", ".data_version", ".write.lock", ".id_sequences.json*"))
+    try:
+        slots = _candidate_slots(data_dir, duration)[:slot_limit]
+
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        workers = [context.Process(target=_worker, args=(data_dir, journal_mode, slots, seed, duration, queue)) for seed in range(processes)]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        booked = [booking for result in results for booking in result['booked']]
+        elapsed = max(result['end'] for result in results) - min(result['start'] for result in results)
+
+        final = PatientDatabase(data_dir, journal_mode=False)
+        on_disk = set(final.appointments_df['appointment_id'])
+        booked_slots = [(doctor_name, time_slot) for _, doctor_name, time_slot in booked]
+
+        return {
+            'processes': processes,
+            'slots': len(slots),
+            'booked': len(booked),
+            'conflicts': sum(result['conflicts'] for result in results),
+            'seconds': elapsed,
+            'bookings_per_second': len(booked) / elapsed if elapsed else 0.0,
+            'double_booked': len(booked_slots) - len(set(booked_slots)),
+            'lost': sum(1 for appointment_id, _, _ in booked if appointment_id not in on_disk)
+        }
+    finally:
+        shutil.rmtree(os.path.dirname(data_dir), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    counts = [int(count) for count in sys.argv[1:]] or [1, 2, 4, 8]
+    for mode in (True, False):
+        print(f"{'Journal' if mode else 'File'} mode:")
+        for processes in counts:
+            result = run_stress(processes, journal_mode=mode)
+            print(
+                f"  {processes} processes: {result['booked']}/{result['slots']} slots booked, "
+                f"{result['conflicts']} conflicts, {result['bookings_per_second']:.1f} bookings/s, "
+                f"{result['double_booked']} double-booked, {result['lost']} lost"
+            )
@@ -0,0 +1,186 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+from database import PatientDatabase
+from frame_schema import formatted
+from insurance_collection import InsuranceCollector
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logging.warning("pyarrow not available. Bulk import will only read CSV files.")
+
+# The patterns PatientIntake and InsuranceCollector check one value at a time
+NAME_PATTERN = r"^[a-zA-Z\s\-']+$"
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+ALPHANUMERIC_PATTERN = r'^[A-Z0-9]+$'
+
+IMPORT_COLUMNS = [
+    'first_name', 'last_name', 'date_of_birth', 'phone', 'email', 'preferred_doctor',
+    'insurance_carrier', 'insurance_member_id', 'insurance_group_number'
+]
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """A CSV or Parquet file as text frames of at most chunk_size rows"""
+    if path.endswith('.parquet'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required to import Parquet files")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+
+def _name_key(df: pd.DataFrame) -> pd.Series:
+    return (
+        df['first_name'].astype(str).str.strip().str.lower() + '|' +
+        df['last_name'].astype(str).str.strip().str.lower() + '|' +
+        df['date_of_birth'].astype(str).str.strip()
+    )
+
+
+class PatientImporter:
+    """Loads a roster of patients with the intake and insurance rules applied per column.
+
+    The file is read in chunks and every rule runs over a whole column at
+    once. Rows that fail a rule, are already registered (same name and
+    date of birth) or repeat an earlier row are reported with their
+    reasons; the rest get IDs from one block reservation and are written
+    with a single commit once the whole file is checked.
+    """
+
+    def __init__(self, db: PatientDatabase, chunk_size: int = 10000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.doctor_names = [doctor['name'] for doctor in db.get_doctors()]
+        self.insurance = InsuranceCollector()
+        existing = formatted(db.patients_df, 'patients')
+        keys = _name_key(existing)
+        self.registered = dict(zip(keys[~keys.duplicated()], existing['patient_id'][~keys.duplicated()]))
+
+    def validate(self, chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """The chunk normalized as the intake would store it, and each row's rejection reasons ('' if none)"""
+        values = chunk.reindex(columns=IMPORT_COLUMNS).fillna('').astype(str).apply(lambda column: column.str.strip())
+        reasons = pd.Series('', index=chunk.index, dtype=object)
+
+        def reject(mask, field: str, message: str):
+            reasons[mask] += f"{field}: {message}; "
+
+        for field in ('first_name', 'last_name'):
+            too_short = values[field].str.len() < 2
+            reject(too_short, field, "Name must be at least 2 characters long")
+            reject(~too_short & ~values[field].str.match(NAME_PATTERN), field, "Name can only contain letters, spaces, hyphens, and apostrophes")
+            values[field] = values[field].str.title()
+
+        dob = pd.to_datetime(values['date_of_birth'], format='%Y-%m-%d', errors='coerce')
+        today = pd.Timestamp(datetime.now())
+        reject(dob.isna(), 'date_of_birth', "Please enter date in YYYY-MM-DD format")
+        reject(dob > today, 'date_of_birth', "Date of birth cannot be in the future")
+        reject((dob <= today) & ((today - dob).dt.days / 365.25 > 120), 'date_of_birth', "Please enter a valid age (0-120 years)")
+        values['date_of_birth'] = dob.dt.strftime('%Y-%m-%d').fillna(values['date_of_birth'])
+
+        digits = values['phone'].str.replace(r'\D', '', regex=True)
+        valid_phone = (digits.str.len() == 10) | ((digits.str.len() == 11) & digits.str.startswith('1'))
+        reject((values['phone'] != '') & ~valid_phone, 'phone', "Please enter a valid 10-digit phone number")
+
+        reject((values['email'] != '') & ~values['email'].str.match(EMAIL_PATTERN), 'email', "Please enter a valid email address")
+        values['email'] = values['email'].str.lower()
+
+        reject(
+            (values['preferred_doctor'] != '') & ~values['preferred_doctor'].isin(self.doctor_names),
+            'preferred_doctor', f"Doctor not found. Available doctors: {', '.join(self.doctor_names)}"
+        )
+
+        # Carrier names repeat heavily, so each distinct one is matched once with the collector's own rule
+        has_insurance = (values['insurance_carrier'] != '') | (values['insurance_member_id'] != '')
+        carriers = {carrier: self.insurance.validate_insurance_carrier(carrier) for carrier in values.loc[has_insurance, 'insurance_carrier'].unique()}
+        carrier_ok = values['insurance_carrier'].map(lambda carrier: carriers.get(carrier, (True, carrier))[0])
+        reject(has_insurance & (values['insurance_carrier'] == ''), 'insurance_carrier', "Insurance carrier is required")
+        reject(has_insurance & (values['insurance_carrier'] != '') & ~carrier_ok, 'insurance_carrier', "Insurance carrier not recognized")
+        values['insurance_carrier'] = values['insurance_carrier'].map(lambda carrier: carriers[carrier][1] if carriers.get(carrier, (False,))[0] else carrier)
+
+        for field, label, minimum, required in (
+            ('insurance_member_id', 'Member ID', 6, has_insurance),
+            ('insurance_group_number', 'Group number', 3, None)
+        ):
+            value = values[field].str.upper()
+            given = value != ''
+            if required is not None:
+                reject(required & ~given, field, f"{label} is required")
+            reject(given & (value.str.len() < minimum), field, f"{label} must be at least {minimum} characters long")
+            reject(given & (value.str.len() >= minimum) & ~value.str.match(ALPHANUMERIC_PATTERN), field, f"{label} can only contain letters and numbers")
+            values[field] = value
+
+        return values, reasons.str.rstrip('; ')
+
+    def import_file(self, path: str, rejections_path: str = None) -> Dict:
+        """Import every valid, new patient in path; rejected rows are numbered from 1 after the header"""
+        try:
+            accepted: List[pd.DataFrame] = []
+            rejections: List[pd.DataFrame] = []
+            seen: Dict[str, int] = {}
+            rows_read = 0
+
+            for chunk in read_chunks(path, self.chunk_size):
+                chunk.index = np.arange(rows_read + 1, rows_read + len(chunk) + 1)
+                rows_read += len(chunk)
+                values, reasons = self.validate(chunk)
+
+                valid = reasons == ''
+                keys = _name_key(values[valid])
+                registered = keys.map(self.registered)
+                reasons[registered.dropna().index] = "Already registered as " + registered.dropna()
+                first_rows = pd.Series(keys.index, index=keys.values)
+                first_rows = first_rows[~first_rows.index.duplicated()]
+                earlier = keys.map(seen).fillna(keys.map(first_rows)).astype(int)
+                repeated = registered.isna() & (earlier != keys.index)
+                reasons[repeated[repeated].index] = "Duplicate of row " + earlier[repeated].astype(str)
+                seen.update(first_rows[~first_rows.index.isin(list(seen))].to_dict())
+
+                rejected = reasons != ''
+                accepted.append(values[~rejected])
+                rejections.append(pd.DataFrame({
+                    'row': chunk.index[rejected],
+                    'first_name': chunk.reindex(columns=['first_name'])['first_name'][rejected].values,
+                    'last_name': chunk.reindex(columns=['last_name'])['last_name'][rejected].values,
+                    'reasons': reasons[rejected].values
+                }))
+
+            new_patients = pd.concat(accepted, ignore_index=True) if accepted else pd.DataFrame(columns=IMPORT_COLUMNS)
+            report = pd.concat(rejections, ignore_index=True) if rejections else pd.DataFrame(columns=['row', 'first_name', 'last_name', 'reasons'])
+            patient_ids = self.db.import_patients(new_patients.to_dict('records'))
+            if rejections_path:
+                report.to_csv(rejections_path, index=False)
+
+            return {
+                'success': True,
+                'rows': rows_read,
+                'imported': len(patient_ids),
+                'rejected': len(report),
+                'patient_ids': patient_ids,
+                'rejections': report,
+                'message': f"Imported {len(patient_ids)} of {rows_read} patients; {len(report)} rejected"
+            }
+        except Exception as e:
+            return {'success': False, 'message': f"Error importing patients from {path}: {e}"}
+
+
+if __name__ == "__main__":
+    import sys
+    from database import open_database
+
+    if len(sys.argv) < 2:
+        print("Usage: python bulk_import.py PATIENTS_FILE [REJECTIONS_CSV]")
+        sys.exit(1)
+
+    db = open_database()
+    result = PatientImporter(db).import_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    db.close()
+    print(result['message'])
+    if result['success'] and result['rejected']:
+        print(result['rejections'].head(20).to_string(index=False))
@@ -16,9 +16,42 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///clinic_scheduling.db')
+    # 'files' keeps the CSV/xlsx files in data/ as the store; 'sqlite' uses DATABASE_URL
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'files').lower()
+    # Journal mode appends each write to data/booking_journal.jsonl and folds it into the files in the background
+    JOURNAL_MODE = os.getenv('JOURNAL_MODE', 'false').lower() in ('1', 'true', 'yes')
+    JOURNAL_COMPACT_INTERVAL_SECONDS = float(os.getenv('JOURNAL_COMPACT_INTERVAL_SECONDS', 30))
+    JOURNAL_COMPACT_MAX_RECORDS = int(os.getenv('JOURNAL_COMPACT_MAX_RECORDS', 500))
+    # Partitioned mode stores appointments as one file per month in data/appointments/ and keeps only recent months in memory
+    PARTITIONED_APPOINTMENTS = os.getenv('PARTITIONED_APPOINTMENTS', 'false').lower() in ('1', 'true', 'yes')
+    APPOINTMENT_HOT_MONTHS = int(os.getenv('APPOINTMENT_HOT_MONTHS', 1))
+    # Writes arriving within this many milliseconds are flushed to the files together; 0 writes each one through
+    WRITE_COALESCE_MS = float(os.getenv('WRITE_COALESCE_MS', 0))
+    
+    # Fuzzy matches scoring at least this much are offered as "did you mean" suggestions
+    PATIENT_MATCH_THRESHOLD = float(os.getenv('PATIENT_MATCH_THRESHOLD', 0.9))
+    # Patient pairs scoring at least this much are proposed for merging by patient_dedup.py
+    PATIENT_DEDUP_THRESHOLD = float(os.getenv('PATIENT_DEDUP_THRESHOLD', 0.8))
     
     NEW_PATIENT_SLOT_DURATION = 60
     RETURNING_PATIENT_SLOT_DURATION = 30
+    # Availability bitmaps track time in blocks of this many minutes
+    SLOT_GRANULARITY_MINUTES = int(os.getenv('SLOT_GRANULARITY_MINUTES', 15))
+    # 'fixed' offers the schedule's slot rows; 'flexible' offers any window inside working hours;
+    # 'template' materializes days on demand from data/schedule_templates.json
+    SLOT_ENGINE = os.getenv('SLOT_ENGINE', 'fixed').lower()
+    SCHEDULE_HORIZON_DAYS = int(os.getenv('SCHEDULE_HORIZON_DAYS', 365))
+    SLOT_STEP_MINUTES = int(os.getenv('SLOT_STEP_MINUTES', 15))
+    WORKDAY_START_HOUR = 9
+    WORKDAY_END_HOUR = 17
+    LUNCH_HOUR = 12
+    # Per-(doctor, date, duration) slot lists shared by all chat sessions
+    AVAILABILITY_CACHE_SIZE = int(os.getenv('AVAILABILITY_CACHE_SIZE', 4096))
+    AVAILABILITY_CACHE_TTL_SECONDS = float(os.getenv('AVAILABILITY_CACHE_TTL_SECONDS', 300))
+    # Slots offered to or picked by a chat session are held for it this long
+    SLOT_HOLD_TTL_SECONDS = float(os.getenv('SLOT_HOLD_TTL_SECONDS', 300))
+    # Patient/appointment IDs each process reserves at a time
+    ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', 20))
     
     CLINIC_NAME = "HealthCare Plus Clinic"
     CLINIC_ADDRESS = "123 Medical Drive, Health City, HC 12345"
@@ -2,6 +2,7 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 import csv
+import json
 
 def generate_synthetic_patients():
     first_names = [
@@ -106,8 +107,34 @@ def create_doctor_schedules():
     print(f"Generated schedule for {len(doctors)} doctors over 30 days")
     return df_schedule
 
+def create_schedule_templates():
+    """Recurring weekly rules equivalent to create_doctor_schedules, with no horizon"""
+    weekdays = ["mon", "tue", "wed", "thu", "fri"]
+    doctors = ["Dr. Sarah Johnson", "Dr. Amit Patel", "Dr. Emily Carter"]
+    
+    templates = {
+        "holidays": ["2025-11-27", "2025-12-25", "2026-01-01"],
+        "doctors": {
+            doctor: {
+                "weekly": {day: ["09:00-17:00"] for day in weekdays},
+                "breaks": ["12:00-13:00"],
+                "slot_starts": ["09:00", "11:00", "14:00"],
+                "blackout_dates": [],
+                "overrides": {}
+            }
+            for doctor in doctors
+        }
+    }
+    
+    with open("data/schedule_templates.json", "w") as f:
+        json.dump(templates, f, indent=2)
+    
+    print(f"Generated recurring schedule templates for {len(doctors)} doctors")
+    return templates
+
 if __name__ == "__main__":
     import os
     os.makedirs("data", exist_ok=True)
     create_patient_database()
     create_doctor_schedules()
+    create_schedule_templates()
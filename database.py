@@ -1,63 +1,426 @@
 import pandas as pd
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import json
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+from journal import BookingJournal, JournalCompactor
+from schedule_cache import ScheduleCache
+from patient_index import PatientIndex
+from patient_matching import PatientMatcher
+from interval_index import DoctorIntervalIndex
+from appointment_index import AppointmentIndex
+from availability import AvailabilityBitmap
+from availability_cache import AvailabilityCache
+from slot_engine import SlotEngine, claim_confirmed
+from schedule_templates import ScheduleTemplates
+from slot_holds import SlotHoldManager
+from waitlist import Waitlist
+from process_lock import DataVersion, ProcessLock
+from id_sequence import IdSequence, next_free_number
+from frame_schema import SCHEMAS, append_rows, apply_schema, assign, formatted, memory_report, to_records
+from appointment_partitions import AppointmentPartitions, hot_start
+from write_coalescer import WriteCoalescer
+
+APPOINTMENT_COLUMNS = [
+    'appointment_id', 'patient_id', 'doctor_name', 'appointment_date',
+    'appointment_time', 'duration_minutes', 'appointment_type',
+    'status', 'created_at', 'insurance_carrier', 'insurance_member_id',
+    'insurance_group_number', 'phone', 'email'
+]
+
+SCHEDULE_COLUMNS = [
+    'doctor_name', 'date', 'time_slot', 'is_available',
+    'patient_id', 'appointment_type', 'duration_minutes'
+]
+
+
+class BookingConflictError(Exception):
+    """The requested slot was taken or is held by another session"""
+
 
 class PatientDatabase:
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", journal_mode: Optional[bool] = None, partitioned: Optional[bool] = None, coalesce_ms: Optional[float] = None):
         self.data_dir = data_dir
         self.patients_file = os.path.join(data_dir, "patients.csv")
         self.doctors_file = os.path.join(data_dir, "doctors.csv")
         self.schedule_file = os.path.join(data_dir, "doctor_schedules.xlsx")
         self.appointments_file = os.path.join(data_dir, "appointments.csv")
+        self.reminder_log_file = os.path.join(data_dir, "reminder_log.csv")
+        self.templates_file = os.path.join(data_dir, "schedule_templates.json")
+        self.journal_file = os.path.join(data_dir, "booking_journal.jsonl")
+        self.waitlist_file = os.path.join(data_dir, "waitlist.csv")
+        self.lock_file = os.path.join(data_dir, ".write.lock")
+        self.version_file = os.path.join(data_dir, ".data_version")
+        self.id_sequence_file = os.path.join(data_dir, ".id_sequences.json")
+        # Monthly appointment files; None keeps everything in appointments.csv
+        use_partitions = Config.PARTITIONED_APPOINTMENTS if partitioned is None else partitioned
+        self.partitions = AppointmentPartitions(os.path.join(data_dir, "appointments")) if use_partitions else None
+        self._cold_id_floor = None
         
-        self._load_data()
+        self._lock = threading.RLock()
+        # Bumped on every change this instance applies, its own writes or ones caught up from other processes
+        self.version = 0
+        self._subscribers: List[Callable[[str], None]] = []
+        # Serializes writes across every process using data_dir; taken before _lock
+        self._process_lock = ProcessLock(self.lock_file)
+        self.data_version = DataVersion(self.version_file)
+        self.journal = None
+        self.compactor = None
+        self.coalescer = None
+        self._journal_dirty = set()
+        self._patient_matcher = None
+        # The recurring rules in template mode, which then stand in for the expanded schedule sheet
+        self.templates = None
+        self.availability_cache = AvailabilityCache(Config.AVAILABILITY_CACHE_SIZE, Config.AVAILABILITY_CACHE_TTL_SECONDS)
+        self.slot_holds = SlotHoldManager(Config.SLOT_HOLD_TTL_SECONDS, default_minutes=Config.RETURNING_PATIENT_SLOT_DURATION)
+        self.id_sequence = IdSequence(self.id_sequence_file, self._id_floor, Config.ID_BLOCK_SIZE)
+        self.waitlist = Waitlist(self.waitlist_file, self._process_lock, self.id_sequence)
+        
+        # Loaded under the process lock so base files and journal come from the same version
+        with self._process_lock:
+            self._data_version = self.data_version.read()
+            self._load_data()
+            
+            if Config.JOURNAL_MODE if journal_mode is None else journal_mode:
+                self._open_journal()
+        
+        window_ms = Config.WRITE_COALESCE_MS if coalesce_ms is None else coalesce_ms
+        if self.journal is None and window_ms > 0:
+            self.coalescer = WriteCoalescer(self._write_tables, self._process_lock, window_ms / 1000)
+            self.coalescer.start()
     
     def _load_data(self):
-        self.patients_df = pd.read_csv(self.patients_file)
-        self.doctors_df = pd.read_csv(self.doctors_file)
-        self.schedule_df = pd.read_excel(self.schedule_file)
+        self.load_timings = {}
+        
+        start = time.perf_counter()
+        self.patients_df = apply_schema(pd.read_csv(self.patients_file), 'patients')
+        self.doctors_df = apply_schema(pd.read_csv(self.doctors_file), 'doctors')
+        self.patient_index = PatientIndex.build(self.patients_df)
+        self.load_timings['patients_and_doctors'] = time.perf_counter() - start
         
-        if os.path.exists(self.appointments_file):
+        if Config.SLOT_ENGINE == 'template':
+            # Days come from the templates, so the expanded sheet is neither read nor rewritten
+            self.schedule_cache = None
+            self.schedule_df = apply_schema(pd.DataFrame(columns=SCHEDULE_COLUMNS), 'schedule')
+            self.load_timings['schedule'] = 0.0
+            self.load_timings['schedule_source'] = 'templates'
+        else:
+            self.schedule_cache = ScheduleCache(self.schedule_file)
+            self.schedule_df = apply_schema(self.schedule_cache.load(), 'schedule')
+            self.load_timings['schedule'] = self.schedule_cache.last_load_seconds
+            self.load_timings['schedule_source'] = self.schedule_cache.last_source
+        
+        start = time.perf_counter()
+        if self.partitions is not None:
+            self.appointments_df = self._read_hot_partitions()
+        elif os.path.exists(self.appointments_file):
             self.appointments_df = pd.read_csv(self.appointments_file)
         else:
-            self.appointments_df = pd.DataFrame(columns=[
-                'appointment_id', 'patient_id', 'doctor_name', 'appointment_date',
-                'appointment_time', 'duration_minutes', 'appointment_type',
-                'status', 'created_at', 'insurance_carrier', 'insurance_member_id',
-                'insurance_group_number', 'phone', 'email'
-            ])
+            self.appointments_df = pd.DataFrame(columns=APPOINTMENT_COLUMNS)
+        self.appointments_df = apply_schema(self.appointments_df, 'appointments')
+        self.appointment_intervals = DoctorIntervalIndex.build(self.appointments_df, Config.RETURNING_PATIENT_SLOT_DURATION)
+        self.appointment_index = AppointmentIndex.build(self.appointments_df)
+        self.load_timings['appointments'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        self.availability = self._build_availability(self.schedule_df, self.appointments_df)
+        self.load_timings['availability'] = time.perf_counter() - start
+    
+    def _read_hot_partitions(self) -> pd.DataFrame:
+        if not self.partitions.exists() and os.path.exists(self.appointments_file):
+            # First start in partitioned mode: split the single file by month, leaving it in place
+            self.partitions.write(pd.read_csv(self.appointments_file))
+        # Months the schedule still offers stay in memory too, so a booking never lands in a past partition
+        self.hot_start = hot_start(datetime.now(), Config.APPOINTMENT_HOT_MONTHS)
+        if not self.schedule_df.empty:
+            self.hot_start = min(self.hot_start, self.schedule_df['date'].min().strftime('%Y-%m'))
+        hot_df = self.partitions.read_from(self.hot_start)
+        return hot_df if not hot_df.empty else pd.DataFrame(columns=APPOINTMENT_COLUMNS)
+    
+    def _build_availability(self, schedule_df: pd.DataFrame, appointments_df: pd.DataFrame) -> AvailabilityBitmap:
+        if Config.SLOT_ENGINE == 'flexible':
+            return SlotEngine.from_config().build(schedule_df, appointments_df)
+        if Config.SLOT_ENGINE == 'template':
+            self.templates = ScheduleTemplates.load(self.templates_file, Config.SLOT_GRANULARITY_MINUTES, Config.SLOT_STEP_MINUTES)
+            return self.templates.build(appointments_df, Config.SCHEDULE_HORIZON_DAYS)
+        return AvailabilityBitmap.build(schedule_df, Config.SLOT_GRANULARITY_MINUTES, Config.NEW_PATIENT_SLOT_DURATION)
+    
+    def _id_floor(self, prefix: str) -> int:
+        """First number above every ID with this prefix already in the data"""
+        if prefix == 'P':
+            return next_free_number(self.patients_df['patient_id'], prefix)
+        if prefix == 'APT':
+            floor = next_free_number(self.appointments_df['appointment_id'], prefix)
+            if self.partitions is not None:
+                if self._cold_id_floor is None:
+                    cold_months = [month for month in self.partitions.months() if month < self.hot_start]
+                    self._cold_id_floor = next_free_number(self.partitions.read(cold_months).get('appointment_id', []), prefix)
+                floor = max(floor, self._cold_id_floor)
+            return floor
+        return next_free_number(self.waitlist.entries, prefix)
+    
+    def memory_report(self) -> Dict[str, Dict]:
+        """Rows and in-memory bytes of each table"""
+        return memory_report({
+            'patients': self.patients_df,
+            'doctors': self.doctors_df,
+            'schedule': self.schedule_df,
+            'appointments': self.appointments_df
+        })
     
     def save_appointments(self):
-        self.appointments_df.to_csv(self.appointments_file, index=False)
+        self._write_appointments(self.appointments_df)
     
-    def find_patient(self, first_name: str, last_name: str, dob: str = None) -> Optional[Dict]:
-        first_name = first_name.lower().strip()
-        last_name = last_name.lower().strip()
+    def _save(self, change: str):
+        """Write the tables a change touched, or leave them to the coalescer's next flush"""
+        if self.coalescer is not None:
+            self.coalescer.mark(self.CHANGE_TABLES[change])
+        else:
+            self._write_tables(self.CHANGE_TABLES[change])
+    
+    def _write_tables(self, tables):
+        with self._lock:
+            patients_df = self.patients_df.copy() if 'patients' in tables else None
+            appointments_df = self.appointments_df.copy() if 'appointments' in tables else None
+            schedule_df = self.schedule_df.copy() if 'schedule' in tables and self.schedule_cache is not None else None
+            templates = json.dumps(self.templates.config, indent=2) if 'templates' in tables else None
         
-        mask = (
-            (self.patients_df['first_name'].str.lower() == first_name) &
-            (self.patients_df['last_name'].str.lower() == last_name)
+        # The slow writes happen outside the in-memory lock so reads keep flowing
+        if patients_df is not None:
+            self._replace_file(self.patients_file, lambda path: formatted(patients_df, 'patients').to_csv(path, index=False))
+        if appointments_df is not None:
+            self._write_appointments(appointments_df)
+        if schedule_df is not None:
+            self._replace_file(self.schedule_file, lambda path: formatted(schedule_df, 'schedule').to_excel(path, index=False))
+            self.schedule_cache.store(schedule_df)
+        if templates is not None:
+            def write_templates(path):
+                with open(path, 'w', encoding='utf-8') as templates_file:
+                    templates_file.write(templates)
+            self._replace_file(self.templates_file, write_templates)
+    
+    def flush(self) -> int:
+        """Write out every change still waiting in the coalescer; returns the number of tables written"""
+        if self.coalescer is None:
+            return 0
+        return self.coalescer.flush()
+    
+    def _write_appointments(self, appointments_df: pd.DataFrame):
+        if self.partitions is not None:
+            # Only the months held in memory are rewritten; past months are never touched by a booking
+            self.partitions.write(appointments_df)
+        else:
+            self._replace_file(self.appointments_file, lambda path: formatted(appointments_df, 'appointments').to_csv(path, index=False))
+    
+    def refresh_if_stale(self) -> bool:
+        """Reload from disk if another process has written since this instance last saw the data"""
+        if self.data_version.read() == self._data_version:
+            return False
+        
+        with self._process_lock, self._lock:
+            version = self.data_version.read()
+            if version == self._data_version:
+                return False
+            if self.journal is not None and not self.journal.replaced():
+                # Only the records other processes appended since we last looked need applying
+                self.journal.record_count += self._replay_journal(self._journal_offset)
+            else:
+                # Files were rewritten, by a write in file mode or by compaction
+                if self.journal is not None:
+                    self.journal.reopen()
+                self._load_data()
+                if self.journal is not None:
+                    self._replay_journal()
+                self._patient_matcher = None
+                self.availability_cache.clear()
+            self.waitlist.reload()
+            self._mark_seen(version)
+        self._notify('refresh')
+        return True
+    
+    def _mark_seen(self, version: int):
+        self._data_version = version
+        if self.journal is not None:
+            self._journal_offset = self.journal.size()
+    
+    def subscribe(self, callback: Callable[[str], None]) -> Callable[[], None]:
+        """Call callback(change) after every change; returns a function that unsubscribes.
+        
+        change is 'patient', 'patient_visit', 'patient_merge', 'booking',
+        'cancellation', 'reschedule', 'schedule_exception', or 'refresh' when writes from another
+        process were picked up. Callbacks run on the writing thread and should be quick.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+    
+    def _notify(self, change: str):
+        with self._lock:
+            self.version += 1
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"Error notifying subscriber of {change}: {e}")
+    
+    @contextmanager
+    def _exclusive(self, change: str):
+        """Hold the process and in-memory locks on state caught up with every other process's writes.
+        
+        The data version is bumped when the block completes, which is what
+        tells other instances to refresh; a block that raises wrote nothing.
+        Subscribers are told about the change once the locks are released.
+        """
+        with self._process_lock, self._lock:
+            self.refresh_if_stale()
+            yield
+            self._mark_seen(self.data_version.bump(self._data_version))
+        self._notify(change)
+    
+    def _open_journal(self):
+        self.journal = BookingJournal(self.journal_file)
+        self._replay_journal()
+        self._journal_offset = self.journal.size()
+        self.compactor = JournalCompactor(
+            self,
+            interval_seconds=Config.JOURNAL_COMPACT_INTERVAL_SECONDS,
+            max_records=Config.JOURNAL_COMPACT_MAX_RECORDS
         )
+        self.compactor.start()
+    
+    # Tables each kind of change rewrites
+    CHANGE_TABLES = {
+        'patient': ('patients',),
+        'patient_visit': ('patients',),
+        'booking': ('appointments', 'schedule'),
+        'cancellation': ('appointments', 'schedule'),
+        'reschedule': ('appointments', 'schedule'),
+        'patient_merge': ('patients', 'appointments', 'schedule'),
+        'schedule_exception': ('templates',)
+    }
+    
+    def _replay_journal(self, start_offset: int = 0) -> int:
+        """Re-apply journal records left over from a previous run or written by another process (replay is idempotent)"""
+        records = self.journal.read_records(start_offset)
+        known_patients = set(self.patients_df['patient_id'])
+        known_appointments = set(self.appointments_df['appointment_id'])
         
-        if dob:
-            mask = mask & (self.patients_df['date_of_birth'] == dob)
+        # Consecutive new patients, a bulk import in particular, are appended together
+        new_patients = []
+        for record in records:
+            data = record['data']
+            if record['type'] != 'patient' and new_patients:
+                self._apply_new_patients(new_patients)
+                new_patients = []
+            if record['type'] == 'patient' and data['patient_id'] not in known_patients:
+                new_patients.append(data)
+                known_patients.add(data['patient_id'])
+            elif record['type'] == 'booking' and data['appointment']['appointment_id'] not in known_appointments:
+                self._apply_booking(data['appointment'])
+                known_appointments.add(data['appointment']['appointment_id'])
+            elif record['type'] == 'cancellation':
+                self._apply_cancellation(data['appointment_id'], data['status'])
+            elif record['type'] == 'reschedule' and data['appointment']['appointment_id'] not in known_appointments:
+                self._apply_cancellation(data['appointment_id'], 'rescheduled')
+                self._apply_booking(data['appointment'])
+                known_appointments.add(data['appointment']['appointment_id'])
+            elif record['type'] == 'patient_visit':
+                self._apply_patient_visit(data['patient_id'], data['last_visit'])
+            elif record['type'] == 'patient_merge':
+                self._apply_patient_merge(data['survivor_id'], data['duplicate_id'], data['updates'])
+            elif record['type'] == 'schedule_exception':
+                self._apply_schedule_exception(data['doctor_name'], data['date'], data['hours'])
+            self._journal_dirty.update(self.CHANGE_TABLES.get(record['type'], ()))
+        if new_patients:
+            self._apply_new_patients(new_patients)
+        return len(records)
+    
+    def _log(self, record_type: str, data: Dict):
+        self.journal.append(record_type, data)
+        self._journal_dirty.update(self.CHANGE_TABLES[record_type])
+        self.compactor.notify(self.journal.record_count)
+    
+    def _log_many(self, record_type: str, items: List[Dict]):
+        self.journal.append_many(record_type, items)
+        self._journal_dirty.update(self.CHANGE_TABLES[record_type])
+        self.compactor.notify(self.journal.record_count)
+    
+    def _replace_file(self, path: str, write):
+        root, extension = os.path.splitext(path)
+        temp_path = f"{root}.tmp{extension}"
+        write(temp_path)
+        os.replace(temp_path, path)
+    
+    def compact_journal(self) -> int:
+        """Fold journaled changes into the base files and drop them from the journal"""
+        if self.journal is None:
+            return 0
         
-        matches = self.patients_df[mask]
+        # Writers in every process wait for compaction, so no append lands in a journal being replaced
+        with self._process_lock:
+            with self._lock:
+                self.refresh_if_stale()
+                if self.journal.record_count == 0:
+                    return 0
+                offset = self.journal.size()
+                dirty = self._journal_dirty
+                self._journal_dirty = set()
+            
+            self._write_tables(dirty)
+            
+            discarded = self.journal.discard_prefix(offset)
+            self._mark_seen(self.data_version.bump(self._data_version))
+            return discarded
+    
+    def close(self):
+        if self.coalescer is not None:
+            self.coalescer.stop()
+            self.coalescer = None
+        if self.compactor is not None:
+            self.compactor.stop()
+            self.compactor = None
+        if self.journal is not None:
+            self.compact_journal()
+            self.journal.close()
+            self.journal = None
+    
+    def find_patient(self, first_name: str, last_name: str, dob: str = None) -> Optional[Dict]:
+        row = self.patient_index.lookup(first_name, last_name, dob)
         
-        if len(matches) > 0:
-            patient = matches.iloc[0].to_dict()
-            patient['is_new_patient'] = patient.get('last_visit') is None or pd.isna(patient.get('last_visit'))
-            return patient
+        if row is not None:
+            return self._patient_record(row)
         
         return None
     
+    def get_patient(self, patient_id: str) -> Optional[Dict]:
+        row = self.patient_index.row_for_id(patient_id)
+        return self._patient_record(row) if row is not None else None
+    
+    def _patient_record(self, row) -> Dict:
+        patient = to_records(self.patients_df.loc[[row]], 'patients')[0]
+        patient['is_new_patient'] = patient.get('last_visit') is None or pd.isna(patient.get('last_visit'))
+        return patient
+    
+    def match_patients(self, first_name: str, last_name: str, dob: str = None, limit: int = 5, min_score: float = 0.0) -> List[Dict]:
+        """Ranked fuzzy/phonetic candidates for a name that may be misspelled"""
+        with self._lock:
+            if self._patient_matcher is None:
+                self._patient_matcher = PatientMatcher.build(self.patients_df)
+        return self._patient_matcher.candidates(first_name, last_name, dob, limit=limit, min_score=min_score)
+    
     def create_new_patient(self, patient_data: Dict) -> str:
-        patient_id = f"P{len(self.patients_df) + 1001:04d}"
-        
         new_patient = {
-            'patient_id': patient_id,
+            'patient_id': None,
             'first_name': patient_data['first_name'],
             'last_name': patient_data['last_name'],
             'date_of_birth': patient_data['date_of_birth'],
@@ -71,11 +434,55 @@ class PatientDatabase:
             'is_new_patient': True
         }
         
-        self.patients_df = pd.concat([self.patients_df, pd.DataFrame([new_patient])], ignore_index=True)
-        self.patients_df.to_csv(self.patients_file, index=False)
+        with self._exclusive('patient'):
+            patient_id = self.id_sequence.next_id('P')
+            new_patient['patient_id'] = patient_id
+            if self.journal is not None:
+                self._log('patient', new_patient)
+                self._apply_new_patient(new_patient)
+            else:
+                self._apply_new_patient(new_patient)
+                self._save('patient')
         
         return patient_id
     
+    def _apply_new_patient(self, new_patient: Dict):
+        self.patients_df = append_rows(self.patients_df, [new_patient], 'patients')
+        self.patient_index.add(self.patients_df.index[-1], new_patient)
+        if self._patient_matcher is not None:
+            self._patient_matcher.add(new_patient['patient_id'], new_patient['first_name'], new_patient['last_name'], new_patient['date_of_birth'])
+    
+    def import_patients(self, patients: List[Dict]) -> List[str]:
+        """Register many already validated patients as one write; returns their new IDs in order"""
+        if not patients:
+            return []
+        
+        with self._exclusive('patient'):
+            patient_ids = self.id_sequence.next_ids('P', len(patients))
+            new_patients = [
+                {**patient, 'patient_id': patient_id, 'last_visit': None, 'is_new_patient': True}
+                for patient, patient_id in zip(patients, patient_ids)
+            ]
+            if self.journal is not None:
+                self._log_many('patient', new_patients)
+                self._apply_new_patients(new_patients)
+            else:
+                self._apply_new_patients(new_patients)
+                self._save('patient')
+        
+        return patient_ids
+    
+    def _apply_new_patients(self, new_patients: List[Dict]):
+        if len(new_patients) == 1:
+            self._apply_new_patient(new_patients[0])
+            return
+        first_row = len(self.patients_df)
+        self.patients_df = append_rows(self.patients_df, new_patients, 'patients')
+        for row, new_patient in zip(self.patients_df.index[first_row:], new_patients):
+            self.patient_index.add(row, new_patient)
+            if self._patient_matcher is not None:
+                self._patient_matcher.add(new_patient['patient_id'], new_patient['first_name'], new_patient['last_name'], new_patient['date_of_birth'])
+    
     def add_patient(self, patient_data: Dict) -> Optional[Dict]:
         """Add a new patient and return the patient data with patient_id"""
         try:
@@ -89,34 +496,49 @@ class PatientDatabase:
             return None
     
     def get_available_slots(self, doctor_name: str, date: str = None) -> List[Dict]:
-        if date:
-            mask = (
-                (self.schedule_df['doctor_name'] == doctor_name) &
-                (self.schedule_df['date'] == date) &
-                (self.schedule_df['is_available'] == True)
-            )
-        else:
-            mask = (
-                (self.schedule_df['doctor_name'] == doctor_name) &
-                (self.schedule_df['is_available'] == True)
-            )
-        
-        available_slots = self.schedule_df[mask].copy()
-        
         slots = []
-        for _, slot in available_slots.iterrows():
+        for slot_time in self.availability.available_slot_times(doctor_name, date):
             slots.append({
-                'time_slot': slot['time_slot'],
-                'date': slot['date'],
-                'doctor_name': slot['doctor_name']
+                'time_slot': slot_time.strftime('%Y-%m-%d %H:%M'),
+                'date': slot_time.strftime('%Y-%m-%d'),
+                'doctor_name': doctor_name
             })
         
         return slots
     
-    def book_appointment(self, appointment_data: Dict) -> str:
-        appointment_id = f"APT{len(self.appointments_df) + 1001:04d}"
+    def available_slot_starts(self, doctor_name: str, date: str = None, duration: int = None):
+        return self.availability.available_slot_starts(doctor_name, date, duration)
+    
+    def horizon_slot_starts(self, doctor_names: List[str], start_date: str, end_date: str, duration: int = None):
+        return self.availability.horizon_slot_starts(doctor_names, start_date, end_date, duration)
+    
+    def iter_free_slots(self, doctor_name: str, after: datetime, duration: int):
+        return self.availability.iter_free_slots(doctor_name, after, duration)
+    
+    def free_intervals(self, doctor_name: str, date: str) -> List[Tuple[str, str]]:
+        return [(start.strftime('%H:%M'), end.strftime('%H:%M')) for start, end in self.availability.free_intervals(doctor_name, date)]
+    
+    def first_available_window(self, doctor_name: str, date: str, duration: int) -> Optional[str]:
+        """Start of the earliest stretch of `duration` free minutes on that day, if any"""
+        window_start = self.availability.first_window(doctor_name, date, duration)
+        return window_start.strftime('%Y-%m-%d %H:%M') if window_start else None
+    
+    def _check_bookable(self, appointment_data: Dict, session_id: str = None):
+        """Raise BookingConflictError unless the slot is offered, free and not held by another session"""
+        doctor_name = appointment_data['doctor_name']
+        time_slot = f"{appointment_data['appointment_date']} {appointment_data['appointment_time']}"
+        start = datetime.strptime(time_slot, '%Y-%m-%d %H:%M')
         
-        new_appointment = {
+        if not self.availability.is_free(doctor_name, start, appointment_data['duration_minutes']):
+            raise BookingConflictError(f"{doctor_name} is no longer available at {time_slot}")
+        # Fixed slots are the only bookable starts; one in between would overlap the slots either side yet leave them offered
+        if Config.SLOT_ENGINE == 'fixed' and not self.availability.is_offered(doctor_name, start):
+            raise BookingConflictError(f"{doctor_name} has no slot starting at {time_slot}")
+        if not self.slot_holds.convert(doctor_name, time_slot, session_id, appointment_data['duration_minutes']):
+            raise BookingConflictError(f"{doctor_name} at {time_slot} is being held for another patient")
+    
+    def _appointment_record(self, appointment_data: Dict, appointment_id: str) -> Dict:
+        return {
             'appointment_id': appointment_id,
             'patient_id': appointment_data['patient_id'],
             'doctor_name': appointment_data['doctor_name'],
@@ -132,37 +554,445 @@ class PatientDatabase:
             'phone': appointment_data.get('phone', ''),
             'email': appointment_data.get('email', '')
         }
+    
+    def book_appointment(self, appointment_data: Dict, session_id: str = None) -> str:
+        with self._exclusive('booking'):
+            # Checking, converting the hold and claiming the slot happen under one lock
+            self._check_bookable(appointment_data, session_id)
+            new_appointment = self._appointment_record(appointment_data, self.id_sequence.next_id('APT'))
+            self._persist_bookings([new_appointment])
+        
+        return new_appointment['appointment_id']
+    
+    def book_appointments(self, appointments: List[Dict], session_id: str = None) -> List[Optional[str]]:
+        """Book many appointments with a single write; None marks one whose slot was taken"""
+        with self._exclusive('booking'):
+            appointment_ids = []
+            new_appointments = []
+            for appointment_data in appointments:
+                try:
+                    self._check_bookable(appointment_data, session_id)
+                except BookingConflictError:
+                    appointment_ids.append(None)
+                    continue
+                
+                new_appointment = self._appointment_record(appointment_data, self.id_sequence.next_id('APT'))
+                # Claimed straight away so later entries of the batch see the slot as taken
+                self._claim_booking(new_appointment)
+                new_appointments.append(new_appointment)
+                appointment_ids.append(new_appointment['appointment_id'])
+            
+            if new_appointments:
+                self._persist_bookings(new_appointments, claimed=True)
         
-        self.appointments_df = pd.concat([self.appointments_df, pd.DataFrame([new_appointment])], ignore_index=True)
+        return appointment_ids
+    
+    def _persist_bookings(self, new_appointments: List[Dict], claimed: bool = False):
+        if self.journal is not None:
+            # One record covers both the appointment row and its slot claim
+            for new_appointment in new_appointments:
+                self._log('booking', {'appointment': new_appointment})
         
-        time_slot = f"{appointment_data['appointment_date']} {appointment_data['appointment_time']}"
-        slot_mask = (
-            (self.schedule_df['doctor_name'] == appointment_data['doctor_name']) &
-            (self.schedule_df['time_slot'] == time_slot)
+        if not claimed:
+            for new_appointment in new_appointments:
+                self._claim_booking(new_appointment)
+        self._apply_booking_rows(new_appointments)
+        
+        if self.journal is None:
+            self._save('booking')
+    
+    def _apply_booking(self, new_appointment: Dict):
+        self._claim_booking(new_appointment)
+        self._apply_booking_rows([new_appointment])
+    
+    def _claim_booking(self, new_appointment: Dict):
+        start = datetime.strptime(f"{new_appointment['appointment_date']} {new_appointment['appointment_time']}", '%Y-%m-%d %H:%M')
+        self.appointment_intervals.add(
+            new_appointment['doctor_name'],
+            start,
+            new_appointment['duration_minutes'],
+            new_appointment['appointment_id']
         )
+        self.availability.claim(new_appointment['doctor_name'], start, new_appointment['duration_minutes'])
+        self.availability_cache.invalidate(new_appointment['doctor_name'], new_appointment['appointment_date'])
+    
+    def _apply_booking_rows(self, new_appointments: List[Dict]):
+        self.appointments_df = append_rows(self.appointments_df, new_appointments, 'appointments')
+        for row, new_appointment in zip(self.appointments_df.index[-len(new_appointments):], new_appointments):
+            self.appointment_index.add(row, new_appointment)
+        
+        booked = {
+            f"{new_appointment['doctor_name']}|{new_appointment['appointment_date']} {new_appointment['appointment_time']}": new_appointment
+            for new_appointment in new_appointments
+        }
+        # Narrowed on the typed slot times first, so only a handful of rows are formatted into keys
+        slot_times = pd.to_datetime([key.split('|', 1)[1] for key in booked], format='%Y-%m-%d %H:%M')
+        candidates = self.schedule_df.index[self.schedule_df['time_slot'].isin(slot_times)]
+        candidate_rows = self.schedule_df.loc[candidates]
+        slot_keys = candidate_rows['doctor_name'].astype(str) + '|' + candidate_rows['time_slot'].dt.strftime('%Y-%m-%d %H:%M')
+        slot_mask = slot_keys.isin(list(booked))
         
         if slot_mask.any():
-            self.schedule_df.loc[slot_mask, 'is_available'] = False
-            self.schedule_df.loc[slot_mask, 'patient_id'] = appointment_data['patient_id']
-            self.schedule_df.loc[slot_mask, 'appointment_type'] = appointment_data['appointment_type']
-            self.schedule_df.loc[slot_mask, 'duration_minutes'] = appointment_data['duration_minutes']
+            rows = slot_keys.index[slot_mask]
+            matched = slot_keys[slot_mask].map(booked)
+            self.schedule_df.loc[rows, 'is_available'] = False
+            for column in ('patient_id', 'appointment_type', 'duration_minutes'):
+                assign(self.schedule_df, rows, column, matched.map(lambda appointment: appointment[column]))
+    
+    def get_appointment(self, appointment_id: str) -> Optional[Dict]:
+        appointments = self.appointments_df[self.appointments_df['appointment_id'] == appointment_id]
+        if appointments.empty:
+            return None
+        return to_records(appointments.iloc[:1], 'appointments')[0]
+    
+    def _confirmed_appointment(self, appointment_id: str) -> Dict:
+        appointment = self.get_appointment(appointment_id)
+        if appointment is None:
+            raise ValueError(f"Appointment {appointment_id} not found")
+        if appointment['status'] != 'confirmed':
+            raise ValueError(f"Appointment {appointment_id} is already {appointment['status']}")
+        return appointment
+    
+    def cancel_appointment(self, appointment_id: str, status: str = 'cancelled') -> Dict:
+        """Mark a confirmed appointment cancelled and give its time back; returns the appointment"""
+        with self._exclusive('cancellation'):
+            appointment = self._confirmed_appointment(appointment_id)
+            if self.journal is not None:
+                self._log('cancellation', {'appointment_id': appointment_id, 'status': status})
+                self._apply_cancellation(appointment_id, status)
+            else:
+                self._apply_cancellation(appointment_id, status)
+                self._save('cancellation')
         
-        self.save_appointments()
-        self.schedule_df.to_excel(self.schedule_file, index=False)
+        return appointment
+    
+    def reschedule_appointment(self, appointment_id: str, appointment_data: Dict, session_id: str = None) -> str:
+        """Move a confirmed appointment to a new time as one change; returns the new appointment's ID"""
+        with self._exclusive('reschedule'):
+            appointment = self._confirmed_appointment(appointment_id)
+            # Released first so the new time may overlap the old one
+            moved = {**appointment, **appointment_data}
+            self._release_booking(appointment)
+            try:
+                self._check_bookable(moved, session_id)
+            except BookingConflictError:
+                self._claim_booking(appointment)
+                raise
+            
+            new_appointment = self._appointment_record(moved, self.id_sequence.next_id('APT'))
+            if self.journal is not None:
+                # One record for both halves, so a crash never leaves the old time given up and the new one unbooked
+                self._log('reschedule', {'appointment_id': appointment_id, 'appointment': new_appointment})
+            self._apply_cancellation_row(appointment_id, 'rescheduled')
+            self._claim_booking(new_appointment)
+            self._apply_booking_rows([new_appointment])
+            if self.journal is None:
+                self._save('reschedule')
         
-        return appointment_id
+        return new_appointment['appointment_id']
+    
+    def _apply_cancellation(self, appointment_id: str, status: str):
+        appointment = self.get_appointment(appointment_id)
+        if appointment is None or appointment['status'] != 'confirmed':
+            return
+        self._release_booking(appointment)
+        self._apply_cancellation_row(appointment_id, status)
+    
+    def _release_booking(self, appointment: Dict):
+        """Give an appointment's time back to the interval index, the bitmap and the cache"""
+        start = datetime.strptime(f"{appointment['appointment_date']} {appointment['appointment_time']}", '%Y-%m-%d %H:%M')
+        duration = int(appointment['duration_minutes']) if not pd.isna(appointment['duration_minutes']) else Config.RETURNING_PATIENT_SLOT_DURATION
+        self.appointment_intervals.remove(appointment['doctor_name'], start, appointment['appointment_id'])
+        self.availability.release(appointment['doctor_name'], start, duration)
+        self.availability_cache.invalidate(appointment['doctor_name'], appointment['appointment_date'])
+    
+    def _apply_cancellation_row(self, appointment_id: str, status: str):
+        row = self.appointments_df['appointment_id'] == appointment_id
+        appointment = self.get_appointment(appointment_id)
+        assign(self.appointments_df, row, 'status', status)
+        
+        slot_mask = (
+            (self.schedule_df['doctor_name'] == appointment['doctor_name']) &
+            (self.schedule_df['time_slot'] == f"{appointment['appointment_date']} {appointment['appointment_time']}") &
+            (self.schedule_df['patient_id'] == appointment['patient_id'])
+        )
+        if slot_mask.any():
+            self.schedule_df.loc[slot_mask, 'is_available'] = True
+            for column in ('patient_id', 'appointment_type', 'duration_minutes'):
+                assign(self.schedule_df, slot_mask, column, None)
     
     def get_doctors(self) -> List[Dict]:
         return self.doctors_df.to_dict('records')
     
+    def find_appointments(self, patient_id: str = None, doctor_name: str = None, start_date: str = None, end_date: str = None, status: str = None) -> pd.DataFrame:
+        """Appointments matching every given filter, in booking order.
+        
+        Dates are inclusive YYYY-MM-DD bounds. The narrowest of the indexed
+        filters picks the candidate rows, and only those are checked
+        against the rest, so the cost follows the result, not the table.
+        """
+        with self._lock:
+            candidates = []
+            if patient_id is not None:
+                candidates.append(self.appointment_index.rows_for_patient(patient_id))
+            if doctor_name is not None:
+                candidates.append(self.appointment_index.rows_for_doctor(doctor_name))
+            if start_date is not None or end_date is not None:
+                candidates.append(self.appointment_index.rows_between(start_date, end_date))
+            appointments = self.appointments_df
+            if candidates:
+                appointments = appointments.loc[sorted(min(candidates, key=len))]
+        
+        mask = pd.Series(True, index=appointments.index)
+        if patient_id is not None:
+            mask &= appointments['patient_id'] == patient_id
+        if doctor_name is not None:
+            mask &= appointments['doctor_name'] == doctor_name
+        if start_date is not None:
+            mask &= appointments['appointment_date'] >= start_date
+        if end_date is not None:
+            mask &= appointments['appointment_date'] <= end_date
+        if status is not None:
+            mask &= appointments['status'] == status
+        return appointments[mask]
+    
+    def appointment_history(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Appointments dated within the inclusive bounds, including months that are not held in memory.
+        
+        Meant for reports: past partitions are read from disk for the
+        call and not kept, so the working set stays the recent months.
+        """
+        if self.partitions is None or (start_date is not None and start_date[:7] >= self.hot_start):
+            return self.find_appointments(start_date=start_date, end_date=end_date)
+        
+        with self._process_lock:
+            cold_months = [
+                month for month in self.partitions.months()
+                if month < self.hot_start and (start_date is None or month >= start_date[:7]) and (end_date is None or month <= end_date[:7])
+            ]
+            cold_df = self.partitions.read(cold_months)
+        hot_df = self.find_appointments(start_date=start_date, end_date=end_date)
+        if cold_df.empty:
+            return hot_df
+        
+        cold_df = apply_schema(cold_df.reindex(columns=APPOINTMENT_COLUMNS), 'appointments')
+        # Columns outside the schema come back from an archived month as text; match the in-memory numbers
+        for column, dtype in hot_df.dtypes.items():
+            if column in cold_df and column not in SCHEMAS['appointments'] and pd.api.types.is_numeric_dtype(dtype):
+                values = pd.to_numeric(cold_df[column], errors='coerce')
+                cold_df[column] = values if values.isna().any() else values.astype(dtype)
+        if start_date is not None:
+            cold_df = cold_df[cold_df['appointment_date'] >= start_date]
+        if end_date is not None:
+            cold_df = cold_df[cold_df['appointment_date'] <= end_date]
+        # Category labels differ between the two halves, so the result is typed afresh
+        return apply_schema(pd.concat([cold_df, hot_df], ignore_index=True), 'appointments')
+    
+    def archive_appointments(self) -> List[str]:
+        """Compress every month before the in-memory ones into parquet; returns the months archived"""
+        if self.partitions is None:
+            return []
+        with self._process_lock:
+            return self.partitions.archive(self.hot_start)
+    
     def get_patient_appointments(self, patient_id: str) -> List[Dict]:
-        mask = self.appointments_df['patient_id'] == patient_id
-        appointments = self.appointments_df[mask]
-        return appointments.to_dict('records')
+        return to_records(self.find_appointments(patient_id=patient_id), 'appointments')
     
     def update_patient_visit(self, patient_id: str):
-        mask = self.patients_df['patient_id'] == patient_id
-        if mask.any():
-            self.patients_df.loc[mask, 'last_visit'] = datetime.now().strftime('%Y-%m-%d')
-            self.patients_df.loc[mask, 'is_new_patient'] = False
-            self.patients_df.to_csv(self.patients_file, index=False)
+        last_visit = datetime.now().strftime('%Y-%m-%d')
+        with self._exclusive('patient_visit'):
+            if self.patient_index.row_for_id(patient_id) is None:
+                return
+            if self.journal is not None:
+                self._log('patient_visit', {'patient_id': patient_id, 'last_visit': last_visit})
+                self._apply_patient_visit(patient_id, last_visit)
+            else:
+                self._apply_patient_visit(patient_id, last_visit)
+                self._save('patient_visit')
+    
+    def _apply_patient_visit(self, patient_id: str, last_visit: str):
+        row = self.patient_index.row_for_id(patient_id)
+        assign(self.patients_df, row, 'last_visit', last_visit)
+        self.patients_df.loc[row, 'is_new_patient'] = False
+    
+    MERGED_FIELDS = ['phone', 'email', 'preferred_doctor', 'insurance_carrier', 'insurance_member_id', 'insurance_group_number']
+    
+    @classmethod
+    def _merged_fields(cls, survivor: Dict, duplicate: Dict) -> Dict:
+        """Values the survivor of a merge takes from the duplicate: fields it lacks, and the later last visit"""
+        def blank(value) -> bool:
+            return value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == ''
+        
+        updates = {
+            column: duplicate[column] for column in cls.MERGED_FIELDS
+            if blank(survivor.get(column)) and not blank(duplicate.get(column))
+        }
+        if not blank(duplicate.get('last_visit')) and (blank(survivor.get('last_visit')) or duplicate['last_visit'] > survivor['last_visit']):
+            updates['last_visit'] = duplicate['last_visit']
+            updates['is_new_patient'] = False
+        return updates
+    
+    def merge_patients(self, survivor_id: str, duplicate_id: str) -> Dict:
+        """Fold a duplicate patient record into survivor_id and remove it.
+        
+        The duplicate's appointments (past partitions included), booked
+        slots, waitlist entries and reminder history move to the survivor,
+        which also takes any contact or insurance details it was missing.
+        """
+        if survivor_id == duplicate_id:
+            return {'success': False, 'message': "A patient cannot be merged into itself"}
+        
+        try:
+            with self._exclusive('patient_merge'):
+                survivor = self.get_patient(survivor_id)
+                duplicate = self.get_patient(duplicate_id)
+                if survivor is None or duplicate is None:
+                    raise ValueError(f"Patient {survivor_id if survivor is None else duplicate_id} not found")
+                
+                updates = self._merged_fields(survivor, duplicate)
+                if self.journal is not None:
+                    self._log('patient_merge', {'survivor_id': survivor_id, 'duplicate_id': duplicate_id, 'updates': updates})
+                    appointments_moved = self._apply_patient_merge(survivor_id, duplicate_id, updates)
+                else:
+                    appointments_moved = self._apply_patient_merge(survivor_id, duplicate_id, updates)
+                    self._save('patient_merge')
+                if self.partitions is not None:
+                    cold_months = [month for month in self.partitions.months() if month < self.hot_start]
+                    appointments_moved += self.partitions.reassign_patient(duplicate_id, survivor_id, cold_months)
+                waitlist_moved = self.waitlist.reassign_patient(duplicate_id, survivor_id)
+                reminders_moved = self._reassign_reminder_log(duplicate_id, survivor_id)
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        
+        return {
+            'success': True,
+            'message': f"Merged {duplicate_id} into {survivor_id}",
+            'appointments_moved': appointments_moved,
+            'reminders_moved': reminders_moved,
+            'waitlist_moved': waitlist_moved,
+            'fields_filled': sorted(updates)
+        }
+    
+    def _apply_patient_merge(self, survivor_id: str, duplicate_id: str, updates: Dict) -> int:
+        appointment_rows = self.appointments_df['patient_id'] == duplicate_id
+        assign(self.appointments_df, appointment_rows, 'patient_id', survivor_id)
+        assign(self.schedule_df, self.schedule_df['patient_id'] == duplicate_id, 'patient_id', survivor_id)
+        
+        survivor_row = self.patient_index.row_for_id(survivor_id)
+        if survivor_row is not None:
+            for column, value in updates.items():
+                assign(self.patients_df, survivor_row, column, value)
+        self.patients_df = self.patients_df[self.patients_df['patient_id'] != duplicate_id].reset_index(drop=True)
+        
+        self.patient_index = PatientIndex.build(self.patients_df)
+        self.appointment_index = AppointmentIndex.build(self.appointments_df)
+        # A merge never changes the survivor's name or date of birth, so only the duplicate leaves the matcher
+        if self._patient_matcher is not None:
+            self._patient_matcher.remove(duplicate_id)
+        return int(appointment_rows.sum())
+    
+    def set_schedule_exception(self, doctor_name: str, date: str, hours: List[str] = None) -> Dict:
+        """Close a doctor's day (hours None) or give it its own hours, e.g. ['09:00-12:00']; template mode only.
+        
+        The exception is saved to the templates file, the only schedule
+        data kept in this mode. Bookings already on the day stay booked.
+        """
+        if self.templates is None:
+            return {'success': False, 'message': "Schedule exceptions are kept only with SLOT_ENGINE=template"}
+        if doctor_name not in self.templates.weekly:
+            return {'success': False, 'message': f"No schedule template for {doctor_name}"}
+        
+        try:
+            # Checked up front so nothing malformed reaches the journal
+            datetime.strptime(date, '%Y-%m-%d')
+            for time_range in hours or []:
+                start, end = time_range.split('-')
+                datetime.strptime(start.strip(), '%H:%M')
+                datetime.strptime(end.strip(), '%H:%M')
+            with self._exclusive('schedule_exception'):
+                exception = {'doctor_name': doctor_name, 'date': date, 'hours': hours}
+                if self.journal is not None:
+                    self._log('schedule_exception', exception)
+                    self._apply_schedule_exception(doctor_name, date, hours)
+                else:
+                    self._apply_schedule_exception(doctor_name, date, hours)
+                    self._save('schedule_exception')
+        except ValueError as e:
+            return {'success': False, 'message': f"Invalid schedule exception: {e}"}
+        
+        return {'success': True, 'message': f"{doctor_name} is {'closed' if hours is None else 'open ' + ', '.join(hours)} on {date}"}
+    
+    def _apply_schedule_exception(self, doctor_name: str, date: str, hours: Optional[List[str]]):
+        self.templates.add_exception(doctor_name, date, hours)
+        self.availability.forget_day(doctor_name, datetime.strptime(date, '%Y-%m-%d').toordinal())
+        day_appointments = self.appointments_df[
+            (self.appointments_df['doctor_name'] == doctor_name) &
+            (self.appointments_df['appointment_date'] == pd.Timestamp(date))
+        ]
+        claim_confirmed(self.availability, day_appointments)
+        self.availability_cache.invalidate(doctor_name, date)
+    
+    def _reassign_reminder_log(self, old_patient_id: str, new_patient_id: str) -> int:
+        with self._process_lock:
+            reminder_log_df = self.load_reminder_log()
+            mask = reminder_log_df['patient_id'] == old_patient_id
+            if mask.any():
+                reminder_log_df.loc[mask, 'patient_id'] = new_patient_id
+                reminder_log_df.to_csv(self.reminder_log_file, index=False)
+            return int(mask.sum())
+    
+    def load_reminder_log(self) -> pd.DataFrame:
+        if not os.path.exists(self.reminder_log_file):
+            return pd.DataFrame(columns=[
+                'appointment_id', 'patient_id', 'reminder_type', 'sent_at',
+                'email_success', 'sms_success', 'response_received'
+            ])
+        return pd.read_csv(self.reminder_log_file)
+    
+    def append_reminder_log(self, log_entry: Dict):
+        # Read-modify-write of a shared file, so it runs under the process lock
+        with self._process_lock:
+            reminder_log_df = self.load_reminder_log()
+            reminder_log_df = pd.concat([reminder_log_df, pd.DataFrame([log_entry])], ignore_index=True)
+            reminder_log_df.to_csv(self.reminder_log_file, index=False)
+    
+    def mark_reminder_response(self, appointment_id: str, reminder_type: str, response: str):
+        with self._process_lock:
+            reminder_log_df = self.load_reminder_log()
+            
+            mask = (
+                (reminder_log_df['appointment_id'] == appointment_id) &
+                (reminder_log_df['reminder_type'] == reminder_type)
+            )
+            
+            if mask.any():
+                reminder_log_df.loc[mask, 'response_received'] = True
+                reminder_log_df.loc[mask, 'response_text'] = response
+                reminder_log_df.to_csv(self.reminder_log_file, index=False)
+
+
+_shared_databases: Dict[str, PatientDatabase] = {}
+_shared_databases_lock = threading.Lock()
+
+
+def get_shared_database(data_dir: str = "data") -> PatientDatabase:
+    """The one open_database(data_dir) instance of this process.
+    
+    Components that share it see each other's bookings straight away and
+    the data is held in memory once; use subscribe() or version to react
+    to changes.
+    """
+    key = f"{Config.STORAGE_BACKEND}:{os.path.abspath(data_dir)}"
+    with _shared_databases_lock:
+        if key not in _shared_databases:
+            _shared_databases[key] = open_database(data_dir)
+        return _shared_databases[key]
+
+
+def open_database(data_dir: str = "data") -> PatientDatabase:
+    """Open the storage backend selected by Config.STORAGE_BACKEND"""
+    if Config.STORAGE_BACKEND == 'sqlite':
+        from sqlite_storage import SQLitePatientDatabase
+        return SQLitePatientDatabase(data_dir, Config.DATABASE_URL)
+    
+    return PatientDatabase(data_dir)
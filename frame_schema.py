@@ -0,0 +1,256 @@
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logging.warning("pyarrow not available. Text columns will use Python string storage.")
+
+
+def _string_dtype() -> pd.StringDtype:
+    storage = 'pyarrow' if PYARROW_AVAILABLE else 'python'
+    try:
+        return pd.StringDtype(storage, na_value=np.nan)
+    except TypeError:
+        # pandas < 2.3 has no na_value; its 'pyarrow_numpy' storage is the NaN-semantics equivalent
+        return pd.StringDtype('pyarrow_numpy' if PYARROW_AVAILABLE else storage)
+
+
+# Arrow-backed text that still uses NaN for missing values, so records keep behaving like plain strings
+STRING_DTYPE = _string_dtype()
+
+# How each column is held in memory. Low-cardinality text is categorical,
+# dates and slot times are datetime64, and times of day stay "HH:MM"
+# categoricals since a clinic day has only a few dozen of them.
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    'patients': {
+        'patient_id': 'string',
+        'first_name': 'string',
+        'last_name': 'string',
+        'date_of_birth': 'date',
+        'phone': 'string',
+        'email': 'string',
+        'preferred_doctor': 'category',
+        'insurance_carrier': 'category',
+        'insurance_member_id': 'string',
+        'insurance_group_number': 'string',
+        'last_visit': 'date',
+        'is_new_patient': 'boolean'
+    },
+    'doctors': {
+        'name': 'string',
+        'specialty': 'category',
+        'location': 'category'
+    },
+    'schedule': {
+        'doctor_name': 'category',
+        'date': 'date',
+        'time_slot': 'minute',
+        'is_available': 'boolean',
+        'patient_id': 'string',
+        'appointment_type': 'category'
+    },
+    'appointments': {
+        'appointment_id': 'string',
+        'patient_id': 'string',
+        'doctor_name': 'category',
+        'appointment_date': 'date',
+        'appointment_time': 'category',
+        'appointment_type': 'category',
+        'status': 'category',
+        'created_at': 'datetime',
+        'insurance_carrier': 'category',
+        'insurance_member_id': 'string',
+        'insurance_group_number': 'string',
+        'phone': 'string',
+        'email': 'string'
+    }
+}
+
+# The text form each datetime kind has in the data files and in records
+FORMATS = {
+    'date': '%Y-%m-%d',
+    'minute': '%Y-%m-%d %H:%M',
+    'datetime': '%Y-%m-%dT%H:%M:%S.%f'
+}
+
+
+def _parse(series: pd.Series, kind: str) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    try:
+        return pd.to_datetime(series.replace('', None), format='ISO8601' if kind == 'datetime' else FORMATS[kind])
+    except (ValueError, TypeError) as e:
+        # A hand-edited file may hold dates in another format; keep such a column as text rather than fail to load
+        logging.warning(f"Keeping {series.name} as text: {str(e).splitlines()[0]}")
+        return series.astype(STRING_DTYPE)
+
+
+def apply_schema(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Convert the columns of a freshly read table to their compact dtypes, in place"""
+    for column, kind in SCHEMAS[table].items():
+        if column not in df:
+            continue
+        if kind == 'category':
+            # Copied when already categorical: codes from a memory-mapped cache are read-only
+            df[column] = df[column].copy() if isinstance(df[column].dtype, pd.CategoricalDtype) else df[column].astype('category')
+        elif kind == 'string':
+            df[column] = df[column].astype(STRING_DTYPE)
+        elif kind == 'boolean':
+            df[column] = df[column].astype('boolean')
+        else:
+            df[column] = _parse(df[column], kind)
+    return df
+
+
+def formatted(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """The table with datetime columns back in their text form, for files and records"""
+    columns = {
+        column: df[column].dt.strftime(FORMATS[kind])
+        for column, kind in SCHEMAS[table].items()
+        if kind in FORMATS and column in df and pd.api.types.is_datetime64_any_dtype(df[column])
+    }
+    return df.assign(**columns) if columns else df
+
+
+def to_records(df: pd.DataFrame, table: str) -> List[Dict]:
+    return formatted(df, table).to_dict('records')
+
+
+def _missing(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA or value is pd.NaT
+
+
+def _new_labels(dtype: pd.CategoricalDtype, values: List) -> List:
+    categories = dtype.categories
+    return list(dict.fromkeys(value for value in values if not _missing(value) and value not in categories))
+
+
+def append_rows(df: pd.DataFrame, rows: List[Dict], table: str) -> pd.DataFrame:
+    """df with rows appended, keeping every column's compact dtype.
+
+    The new rows are built straight into the existing dtypes rather than
+    parsed like a fresh table, since bookings append one row at a time.
+    """
+    schema = SCHEMAS[table]
+    extra = [column for column in dict.fromkeys(column for row in rows for column in row) if column not in df.columns]
+    dtypes = df.dtypes.to_dict()
+    widened = {}
+    new = {}
+    for column in list(df.columns) + extra:
+        values = [row.get(column) for row in rows]
+        kind = schema.get(column)
+        dtype = dtypes.get(column)
+        if isinstance(dtype, pd.CategoricalDtype):
+            # New labels go on the end, so the codes already stored stay valid
+            missing = _new_labels(dtype, values)
+            if missing:
+                widened[column] = df[column].cat.add_categories(missing)
+                dtype = widened[column].dtype
+            new[column] = pd.Categorical([None if _missing(value) else value for value in values], dtype=dtype)
+        elif kind in FORMATS and dtype is not None and pd.api.types.is_datetime64_any_dtype(dtype):
+            new[column] = pd.array([pd.NaT if _missing(value) or value == '' else pd.Timestamp(value) for value in values], dtype=dtype)
+        elif dtype is not None and kind is not None:
+            new[column] = pd.array([None if _missing(value) else value for value in values], dtype=dtype)
+        else:
+            new[column] = values
+
+    if widened:
+        df = df.assign(**widened)
+    new_df = pd.DataFrame(new)
+    if extra:
+        new_df = apply_schema(new_df, table)
+    return pd.concat([df, new_df], ignore_index=True)
+
+
+def assign(df: pd.DataFrame, mask, column: str, value):
+    """df.loc[mask, column] = value, adding the value to a categorical column's labels first"""
+    if isinstance(df[column].dtype, pd.CategoricalDtype):
+        missing = _new_labels(df[column].dtype, value.tolist() if isinstance(value, pd.Series) else [value])
+        if missing:
+            df[column] = df[column].cat.add_categories(missing)
+    elif pd.api.types.is_datetime64_any_dtype(df[column]) and isinstance(value, str):
+        value = pd.Timestamp(value)
+    df.loc[mask, column] = value
+
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+    """Rows and deep in-memory bytes of each table"""
+    return {
+        table: {'rows': len(df), 'bytes': int(df.memory_usage(deep=True).sum())}
+        for table, df in frames.items()
+    }
+
+
+def _synthetic_appointments(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    doctors = np.array(['Dr. Sarah Johnson', 'Dr. Michael Chen', 'Dr. Emily Rodriguez'])
+    carriers = np.array(['Blue Cross Blue Shield', 'Aetna', 'Cigna', 'UnitedHealth', 'Humana', ''])
+    days = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+    times = np.array([f"{hour:02d}:{minute:02d}" for hour in range(9, 17) for minute in (0, 30)])
+    created = pd.Timestamp('2024-12-01') + pd.to_timedelta(rng.integers(0, 60 * 86400 * 10, rows), unit='s')
+    numbers = np.arange(1001, 1001 + rows)
+    return pd.DataFrame({
+        'appointment_id': [f"APT{number}" for number in numbers],
+        'patient_id': [f"P{number}" for number in rng.integers(1000, 200000, rows)],
+        'doctor_name': rng.choice(doctors, rows),
+        'appointment_date': days.strftime('%Y-%m-%d'),
+        'appointment_time': rng.choice(times, rows),
+        'duration_minutes': rng.choice([30, 60], rows),
+        'appointment_type': rng.choice(['new_patient', 'returning_patient'], rows),
+        'status': rng.choice(['confirmed', 'cancelled', 'rescheduled'], rows, p=[0.8, 0.15, 0.05]),
+        'created_at': created.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+        'insurance_carrier': rng.choice(carriers, rows),
+        'insurance_member_id': [f"M{number:09d}" for number in numbers],
+        'insurance_group_number': [f"G{number % 5000:05d}" for number in numbers],
+        'phone': [f"555-{number % 1000:03d}-{number % 10000:04d}" for number in numbers],
+        'email': [f"patient{number}@email.com" for number in numbers]
+    })
+
+
+def memory_benchmark(rows: int = 1_000_000) -> Dict:
+    """Footprint of an appointments table read as plain CSV versus loaded into the compact schema"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "appointments.csv")
+        _synthetic_appointments(rows).to_csv(path, index=False)
+
+        start = time.perf_counter()
+        plain = pd.read_csv(path)
+        plain_seconds = time.perf_counter() - start
+        untyped = pd.read_csv(path, dtype=object)
+
+        start = time.perf_counter()
+        compact = apply_schema(pd.read_csv(path), 'appointments')
+        compact_seconds = time.perf_counter() - start
+
+    report = memory_report({'object': untyped, 'plain': plain, 'compact': compact})
+    return {
+        'rows': rows,
+        'object_bytes': report['object']['bytes'],
+        'plain_bytes': report['plain']['bytes'],
+        'compact_bytes': report['compact']['bytes'],
+        'plain_load_seconds': round(plain_seconds, 3),
+        'compact_load_seconds': round(compact_seconds, 3),
+        'columns': {
+            column: (int(plain[column].memory_usage(deep=True, index=False)), int(compact[column].memory_usage(deep=True, index=False)))
+            for column in compact.columns
+        }
+    }
+
+
+if __name__ == "__main__":
+    report = memory_benchmark()
+    megabytes = lambda size: f"{size / 2 ** 20:.1f} MB"
+    print(f"Appointments:          {report['rows']:,} rows")
+    print(f"object dtypes:         {megabytes(report['object_bytes'])}")
+    print(f"read_csv defaults:     {megabytes(report['plain_bytes'])} in {report['plain_load_seconds']} s")
+    print(f"compact schema:        {megabytes(report['compact_bytes'])} in {report['compact_load_seconds']} s")
+    for column, (plain_bytes, compact_bytes) in report['columns'].items():
+        print(f"  {column:24} {megabytes(plain_bytes):>10} -> {megabytes(compact_bytes)}")
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+import pandas as pd
+from process_lock import ProcessLock
+
+
+def next_free_number(ids: Iterable[str], prefix: str, start: int = 1001) -> int:
+    """First number above every ID like f"{prefix}1234" in ids, or start if there are none"""
+    suffixes = pd.Series(list(ids), dtype=str).str[len(prefix):]
+    numbers = pd.to_numeric(suffixes, errors='coerce').dropna()
+    return max(start, int(numbers.max()) + 1) if len(numbers) else start
+
+
+class IdSequence:
+    """Mints collision-free IDs such as P1060 or APT1012 for one data directory.
+
+    The next unreserved number of every prefix lives in a small JSON file.
+    A process reserves a block of `block_size` numbers from it at a time,
+    under a lock file of its own, and then hands IDs out of that block in
+    memory, so concurrent writers only meet once per block rather than on
+    every insert. The first reservation of a prefix is also raised past
+    `floor(prefix)`, the first number above any ID already in the data, so
+    IDs written before the sequence existed are never reused. Numbers left
+    in a block when the process exits are skipped, never handed out twice.
+    """
+
+    def __init__(self, path: str, floor: Callable[[str], int], block_size: int = 20):
+        self.path = path
+        self.floor = floor
+        self.block_size = max(1, block_size)
+        # A leaf lock: held only while the counter file is read and rewritten
+        self._file_lock = ProcessLock(path + '.lock')
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+
+    def _read(self) -> Dict[str, int]:
+        try:
+            with open(self.path, 'r') as sequence_file:
+                return json.load(sequence_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _reserve(self, prefix: str, seeded: bool, size: int = None) -> Tuple[int, int]:
+        size = max(self.block_size, size or 0)
+        with self._file_lock:
+            counters = self._read()
+            start = counters.get(prefix, 0)
+            if not seeded:
+                start = max(start, self.floor(prefix))
+            counters[prefix] = start + size
+
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as sequence_file:
+                json.dump(counters, sequence_file)
+            os.replace(temp_path, self.path)
+        return start, start + size
+
+    def next_id(self, prefix: str) -> str:
+        with self._lock:
+            block = self._blocks.get(prefix)
+            if block is None or block[0] >= block[1]:
+                block = self._reserve(prefix, seeded=block is not None)
+            number, end = block
+            self._blocks[prefix] = (number + 1, end)
+        return f"{prefix}{number:04d}"
+
+    def next_ids(self, prefix: str, count: int) -> List[str]:
+        """count IDs in order, taking what the current block has left and one reservation for the rest"""
+        with self._lock:
+            block = self._blocks.get(prefix)
+            numbers = []
+            if block is not None:
+                numbers = list(range(block[0], min(block[1], block[0] + count)))
+                block = (block[0] + len(numbers), block[1])
+            if len(numbers) < count:
+                start, end = self._reserve(prefix, seeded=block is not None, size=count - len(numbers))
+                block = (start + count - len(numbers), end)
+                numbers.extend(range(start, block[0]))
+            if block is not None:
+                self._blocks[prefix] = block
+        return [f"{prefix}{number:04d}" for number in numbers]
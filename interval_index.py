@@ -0,0 +1,97 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+import pandas as pd
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_minutes(moment: datetime) -> int:
+    """Minutes since the epoch for a naive local datetime"""
+    return int((moment - EPOCH).total_seconds() // 60)
+
+
+def series_to_minutes(moments: pd.Series) -> List[int]:
+    return (pd.to_datetime(moments).values.astype('datetime64[m]').astype('int64')).tolist()
+
+
+class DoctorIntervalIndex:
+    """Per-doctor appointment intervals kept sorted by start minute.
+
+    An appointment can only overlap [start, end) if it starts before end and
+    after start - longest_duration, so an overlap query is two bisects plus
+    the appointments inside that window: O(log n + k).
+    """
+
+    def __init__(self, default_duration: int = 30):
+        self.default_duration = default_duration
+        self.starts: Dict[str, List[Tuple[int, int, str]]] = {}
+        self.max_duration: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, appointments_df: pd.DataFrame, default_duration: int = 30) -> 'DoctorIntervalIndex':
+        index = cls(default_duration)
+        if appointments_df.empty:
+            return index
+
+        confirmed = appointments_df[appointments_df['status'] == 'confirmed']
+        if confirmed.empty:
+            return index
+
+        starts = series_to_minutes(confirmed['appointment_date'].astype(str) + ' ' + confirmed['appointment_time'].astype(str))
+        durations = pd.to_numeric(confirmed['duration_minutes'], errors='coerce').fillna(default_duration).astype(int).tolist()
+
+        for doctor_name, start, duration, appointment_id in zip(confirmed['doctor_name'].tolist(), starts, durations, confirmed['appointment_id'].tolist()):
+            index.starts.setdefault(doctor_name, []).append((start, start + duration, appointment_id))
+            index.max_duration[doctor_name] = max(index.max_duration.get(doctor_name, 0), duration)
+
+        for intervals in index.starts.values():
+            intervals.sort()
+        return index
+
+    def add(self, doctor_name: str, start: datetime, duration: int, appointment_id: str):
+        duration = int(duration) if duration and not pd.isna(duration) else self.default_duration
+        start_minute = to_minutes(start)
+        insort(self.starts.setdefault(doctor_name, []), (start_minute, start_minute + duration, appointment_id))
+        self.max_duration[doctor_name] = max(self.max_duration.get(doctor_name, 0), duration)
+
+    def remove(self, doctor_name: str, start: datetime, appointment_id: str) -> bool:
+        intervals = self.starts.get(doctor_name, [])
+        start_minute = to_minutes(start)
+        position = bisect_left(intervals, (start_minute,))
+        while position < len(intervals) and intervals[position][0] == start_minute:
+            if intervals[position][2] == appointment_id:
+                del intervals[position]
+                return True
+            position += 1
+        return False
+
+    def _overlaps(self, intervals: List[Tuple[int, int, str]], longest: int, start_minute: int, end_minute: int) -> List[str]:
+        low = bisect_right(intervals, (start_minute - longest, float('inf')))
+        high = bisect_left(intervals, (end_minute,))
+        return [appointment_id for _, existing_end, appointment_id in intervals[low:high] if existing_end > start_minute]
+
+    def overlapping(self, doctor_name: str, start: datetime, duration: int) -> List[str]:
+        """IDs of confirmed appointments that overlap [start, start + duration)"""
+        intervals = self.starts.get(doctor_name)
+        if not intervals:
+            return []
+        start_minute = to_minutes(start)
+        return self._overlaps(intervals, self.max_duration[doctor_name], start_minute, start_minute + duration)
+
+    def has_conflict(self, doctor_name: str, start: datetime, duration: int) -> bool:
+        return bool(self.overlapping(doctor_name, start, duration))
+
+    def conflicts_batch(self, doctor_name: str, starts: Iterable[datetime], duration: int) -> List[bool]:
+        intervals = self.starts.get(doctor_name)
+        if not intervals:
+            return [False for _ in starts]
+        longest = self.max_duration[doctor_name]
+        results = []
+        for start in starts:
+            start_minute = to_minutes(start)
+            results.append(bool(self._overlaps(intervals, longest, start_minute, start_minute + duration)))
+        return results
+
+    def __len__(self) -> int:
+        return sum(len(intervals) for intervals in self.starts.values())
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class BookingJournal:
+    """Append-only JSON-lines journal of database mutations.
+
+    Each record is written and fsync'd before the change is applied in
+    memory, so the base files only need to be rewritten by compaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'ab')
+        self.record_count = len(self.read_records())
+
+    def append(self, record_type: str, data: Dict) -> int:
+        record = {
+            'type': record_type,
+            'logged_at': datetime.now().isoformat(),
+            'data': data
+        }
+        line = (json.dumps(record, default=str) + '\n').encode('utf-8')
+
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.record_count += 1
+            return self._file.tell()
+
+    def append_many(self, record_type: str, items: List[Dict]) -> int:
+        """Append one record per item with a single write and fsync"""
+        logged_at = datetime.now().isoformat()
+        lines = b''.join(
+            (json.dumps({'type': record_type, 'logged_at': logged_at, 'data': data}, default=str) + '\n').encode('utf-8')
+            for data in items
+        )
+
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.record_count += len(items)
+            return self._file.tell()
+
+    def size(self) -> int:
+        with self._lock:
+            self._file.flush()
+            return os.path.getsize(self.path)
+
+    def read_records(self, start_offset: int = 0) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, 'rb') as journal_file:
+            journal_file.seek(start_offset)
+            for line in journal_file:
+                # A torn final line from a crash mid-append is ignored
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+
+    def discard_prefix(self, offset: int) -> int:
+        """Drop every record before offset, keeping anything appended after it"""
+        with self._lock:
+            self._file.flush()
+            with open(self.path, 'rb') as journal_file:
+                journal_file.seek(offset)
+                remainder = journal_file.read()
+
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'wb') as temp_file:
+                temp_file.write(remainder)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+
+            self._file.close()
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'ab')
+
+            discarded = self.record_count
+            self.record_count = remainder.count(b'\n')
+            return discarded - self.record_count
+
+    def replaced(self) -> bool:
+        """True once the file at `path` is no longer the one being appended to"""
+        with self._lock:
+            try:
+                return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+            except FileNotFoundError:
+                return True
+
+    def reopen(self):
+        """Pick up a journal file replaced by another process's compaction"""
+        with self._lock:
+            self._file.close()
+            self._file = open(self.path, 'ab')
+            self.record_count = len(self.read_records())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class JournalCompactor(threading.Thread):
+    """Background thread that folds the journal into the base files"""
+
+    def __init__(self, db, interval_seconds: float = 30, max_records: int = 500):
+        super().__init__(name="journal-compactor", daemon=True)
+        self.db = db
+        self.interval_seconds = interval_seconds
+        self.max_records = max_records
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        self.last_error: Optional[str] = None
+
+    def notify(self, record_count: int):
+        if record_count >= self.max_records:
+            self._wake.set()
+
+    def run(self):
+        while not self._halt.is_set():
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            if self._halt.is_set():
+                break
+            try:
+                self.db.compact_journal()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error compacting journal: {e}")
+
+    def stop(self):
+        self._halt.set()
+        self._wake.set()
+        if self.is_alive():
+            self.join()
@@ -268,3 +268,15 @@ class MessagingService:
             results['sms'] = self.sms_service.send_reminder_sms(patient_data, appointment_data, reminder_type)
         
         return results
+    
+    def send_waitlist_offer(self, patient_data: Dict, offer: Dict) -> Dict:
+        results = {}
+        message = f"Good news! A time opened up with {offer['doctor_name']} on {offer['appointment_date']} at {offer['appointment_time']}. We're holding it for you for a few minutes - contact us to book it. Waitlist ID: {offer['waitlist_id']}. {Config.CLINIC_NAME}"
+        
+        if patient_data.get('email'):
+            results['email'] = self.email_service.send_email(patient_data['email'], f"Appointment Available - {Config.CLINIC_NAME}", message)
+        
+        if patient_data.get('phone'):
+            results['sms'] = self.sms_service.send_sms(patient_data['phone'], message)
+        
+        return results
@@ -0,0 +1,160 @@
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+import pandas as pd
+from config import Config
+from database import PatientDatabase
+from frame_schema import formatted
+from patient_matching import metaphone, name_similarity
+
+# How much each kind of evidence adds to a pair's score
+WEIGHTS = {'name': 0.5, 'date_of_birth': 0.3, 'phone': 0.1, 'email': 0.1}
+
+
+def dob_similarity(first: str, second: str) -> float:
+    """1 for the same YYYY-MM-DD date, 0.5 for one mistyped part or swapped month and day"""
+    if not first or not second:
+        return 0.0
+    if first == second:
+        return 1.0
+    first_parts, second_parts = first.split('-'), second.split('-')
+    if len(first_parts) != 3 or len(second_parts) != 3:
+        return 0.0
+    matching = sum(a == b for a, b in zip(first_parts, second_parts))
+    swapped = first_parts[0] == second_parts[0] and first_parts[1:] == second_parts[:0:-1]
+    return 0.5 if matching == 2 or swapped else 0.0
+
+
+def _patient_number(patient_id: str) -> Tuple[int, str]:
+    digits = ''.join(character for character in patient_id if character.isdigit())
+    return (int(digits) if digits else 0, patient_id)
+
+
+class PatientDeduplicator:
+    """Batch record linkage over the patient table.
+
+    Patients are grouped under three blocking keys: the Metaphone codes of
+    both names with the birth year, the phone number's digits, and the
+    email address. Only patients that share a block are compared, and a
+    block larger than max_block_size (a shared family or front-desk
+    number, say) is skipped as not selective, so the work follows the
+    number of likely duplicates rather than the square of the roster.
+    Each pair is scored on name, date of birth, phone and email; pairs at
+    or above threshold become merge proposals in which the earliest
+    registered patient survives.
+    """
+
+    def __init__(self, db: PatientDatabase, threshold: Optional[float] = None, max_block_size: int = 50):
+        self.db = db
+        self.threshold = Config.PATIENT_DEDUP_THRESHOLD if threshold is None else threshold
+        self.max_block_size = max_block_size
+        self.stats: Dict[str, int] = {}
+
+    def _patients(self) -> pd.DataFrame:
+        patients = formatted(self.db.patients_df, 'patients')
+        text = lambda column: patients[column].fillna('').astype(str).str.strip()
+        digits = text('phone').str.replace(r'\D', '', regex=True).str[-10:]
+        return pd.DataFrame({
+            'patient_id': patients['patient_id'].astype(str).values,
+            'first_name': text('first_name').str.lower().values,
+            'last_name': text('last_name').str.lower().values,
+            'date_of_birth': text('date_of_birth').values,
+            'phone': digits.where(digits.str.len() == 10, '').values,
+            'email': text('email').str.lower().values
+        })
+
+    def blocking_keys(self, patients: pd.DataFrame) -> Dict[str, pd.Series]:
+        # Names repeat, so each distinct one is encoded once
+        codes = {name: metaphone(name) for name in pd.unique(patients[['first_name', 'last_name']].values.ravel())}
+        name_keys = patients['first_name'].map(codes) + '|' + patients['last_name'].map(codes) + '|' + patients['date_of_birth'].str[:4]
+        return {
+            'name': name_keys.where((patients['first_name'] != '') & (patients['last_name'] != '')),
+            'phone': patients['phone'].where(patients['phone'] != ''),
+            'email': patients['email'].where(patients['email'] != '')
+        }
+
+    def candidate_pairs(self, patients: pd.DataFrame) -> Set[Tuple[int, int]]:
+        """Row positions of every pair sharing at least one block"""
+        pairs = set()
+        skipped = 0
+        for keys in self.blocking_keys(patients).values():
+            for positions in keys.dropna().groupby(keys.dropna()).indices.values():
+                if len(positions) < 2:
+                    continue
+                if len(positions) > self.max_block_size:
+                    skipped += 1
+                    continue
+                rows = keys.dropna().index[positions]
+                pairs.update(combinations(sorted(rows), 2))
+        self.stats = {
+            'patients': len(patients),
+            'all_pairs': len(patients) * (len(patients) - 1) // 2,
+            'candidate_pairs': len(pairs),
+            'skipped_blocks': skipped
+        }
+        return pairs
+
+    def score(self, first: Dict, second: Dict) -> Tuple[float, List[str]]:
+        name = name_similarity(first['first_name'], first['last_name'], second['first_name'], second['last_name'])
+        dob = dob_similarity(first['date_of_birth'], second['date_of_birth'])
+        phone = float(bool(first['phone']) and first['phone'] == second['phone'])
+        email = float(bool(first['email']) and first['email'] == second['email'])
+
+        evidence = [f"name {name:.2f}"]
+        if dob:
+            evidence.append("same date of birth" if dob == 1 else "similar date of birth")
+        if phone:
+            evidence.append("same phone")
+        if email:
+            evidence.append("same email")
+        score = WEIGHTS['name'] * name + WEIGHTS['date_of_birth'] * dob + WEIGHTS['phone'] * phone + WEIGHTS['email'] * email
+        return round(score, 4), evidence
+
+    def proposals(self) -> pd.DataFrame:
+        """Likely duplicate pairs, best first, with the surviving and duplicate patient IDs"""
+        patients = self._patients()
+        records = patients.to_dict('records')
+        rows = []
+        for first, second in self.candidate_pairs(patients):
+            score, evidence = self.score(records[first], records[second])
+            if score < self.threshold:
+                continue
+            survivor, duplicate = sorted((records[first]['patient_id'], records[second]['patient_id']), key=_patient_number)
+            rows.append({'survivor_id': survivor, 'duplicate_id': duplicate, 'score': score, 'evidence': ', '.join(evidence)})
+
+        columns = ['survivor_id', 'duplicate_id', 'score', 'evidence']
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame(rows, columns=columns).sort_values(['score', 'survivor_id', 'duplicate_id'], ascending=[False, True, True], ignore_index=True)
+
+    def merge(self, proposals: pd.DataFrame) -> List[Dict]:
+        """Merge every proposed pair; chained pairs (A~B, B~C) all end up under the earliest ID of the group"""
+        parent: Dict[str, str] = {}
+
+        def root(patient_id: str) -> str:
+            while parent.get(patient_id, patient_id) != patient_id:
+                patient_id = parent[patient_id]
+            return patient_id
+
+        for survivor, duplicate in zip(proposals['survivor_id'], proposals['duplicate_id']):
+            first, second = sorted((root(survivor), root(duplicate)), key=_patient_number)
+            if first != second:
+                parent[second] = first
+
+        return [self.db.merge_patients(root(duplicate), duplicate) for duplicate in sorted(parent, key=_patient_number)]
+
+
+if __name__ == "__main__":
+    import sys
+    from database import open_database
+
+    db = open_database()
+    deduplicator = PatientDeduplicator(db)
+    proposals = deduplicator.proposals()
+    stats = deduplicator.stats
+    print(f"{stats['patients']} patients: {stats['candidate_pairs']} candidate pairs of {stats['all_pairs']} possible; {len(proposals)} proposed merges")
+    if not proposals.empty:
+        print(proposals.to_string(index=False))
+    if '--merge' in sys.argv[1:]:
+        for result in deduplicator.merge(proposals):
+            print(result['message'])
+    db.close()
@@ -0,0 +1,67 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+import pandas as pd
+
+
+def normalize_name(name) -> str:
+    return str(name).strip().lower()
+
+
+class PatientIndex:
+    """Hash index from normalized names (and DOB) to patients_df row labels.
+
+    Keys are normalized once when a patient is added, so a lookup is a
+    couple of dict probes instead of lower-casing the whole roster.
+    """
+
+    def __init__(self):
+        self.by_name: Dict[Tuple[str, str], List[Hashable]] = {}
+        self.by_name_dob: Dict[Tuple[str, str, str], List[Hashable]] = {}
+        self.by_id: Dict[str, Hashable] = {}
+
+    @classmethod
+    def build(cls, patients_df: pd.DataFrame) -> 'PatientIndex':
+        index = cls()
+        if patients_df.empty:
+            return index
+
+        first_names = patients_df['first_name'].astype(str).str.strip().str.lower().tolist()
+        last_names = patients_df['last_name'].astype(str).str.strip().str.lower().tolist()
+        dobs = patients_df['date_of_birth'].astype(str).str.strip().tolist()
+        rows = patients_df.index.tolist()
+
+        by_name = index.by_name
+        by_name_dob = index.by_name_dob
+        for row, first, last, dob in zip(rows, first_names, last_names, dobs):
+            by_name.setdefault((first, last), []).append(row)
+            by_name_dob.setdefault((first, last, dob), []).append(row)
+        index.by_id = dict(zip(patients_df['patient_id'].tolist(), rows))
+
+        return index
+
+    def _add_keys(self, row: Hashable, patient_id: str, first: str, last: str, dob: str):
+        self.by_name.setdefault((first, last), []).append(row)
+        self.by_name_dob.setdefault((first, last, dob), []).append(row)
+        self.by_id[patient_id] = row
+
+    def add(self, row: Hashable, patient: Dict):
+        self._add_keys(
+            row,
+            patient['patient_id'],
+            normalize_name(patient['first_name']),
+            normalize_name(patient['last_name']),
+            str(patient['date_of_birth']).strip()
+        )
+
+    def lookup(self, first_name: str, last_name: str, dob: str = None) -> Optional[Hashable]:
+        """Row label of the first patient registered under this name (and DOB)"""
+        if dob:
+            rows = self.by_name_dob.get((normalize_name(first_name), normalize_name(last_name), dob.strip()))
+        else:
+            rows = self.by_name.get((normalize_name(first_name), normalize_name(last_name)))
+        return rows[0] if rows else None
+
+    def row_for_id(self, patient_id: str) -> Optional[Hashable]:
+        return self.by_id.get(patient_id)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
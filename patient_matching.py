@@ -0,0 +1,298 @@
+import re
+import heapq
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+import pandas as pd
+
+VOWELS = set('AEIOU')
+
+SOUNDEX_CODES = {}
+for letters, code in (('BFPV', '1'), ('CGJKQSXZ', '2'), ('DT', '3'), ('L', '4'), ('MN', '5'), ('R', '6')):
+    for letter in letters:
+        SOUNDEX_CODES[letter] = code
+
+
+def _letters(name: str) -> str:
+    return re.sub(r'[^A-Z]', '', str(name).upper())
+
+
+@lru_cache(maxsize=65536)
+def soundex(name: str) -> str:
+    letters = _letters(name)
+    if not letters:
+        return ''
+
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code; vowels do
+        if letter not in 'HW':
+            previous = digit
+
+    return code.ljust(4, '0')
+
+
+@lru_cache(maxsize=65536)
+def metaphone(name: str) -> str:
+    """Original (single) Metaphone encoding of a name"""
+    word = _letters(name)
+    if not word:
+        return ''
+
+    if word[:2] in ('KN', 'GN', 'PN', 'AE', 'WR'):
+        word = word[1:]
+    elif word[0] == 'X':
+        word = 'S' + word[1:]
+    elif word[:2] == 'WH':
+        word = 'W' + word[2:]
+
+    result = []
+    length = len(word)
+
+    def at(position: int) -> str:
+        return word[position] if 0 <= position < length else ''
+
+    for i, letter in enumerate(word):
+        if letter == at(i - 1) and letter != 'C':
+            continue
+
+        following = at(i + 1)
+        if letter in VOWELS:
+            if i == 0:
+                result.append(letter)
+        elif letter == 'B':
+            if not (at(i - 1) == 'M' and i == length - 1):
+                result.append('B')
+        elif letter == 'C':
+            if following == 'I' and at(i + 2) == 'A':
+                result.append('X')
+            elif following == 'H':
+                result.append('K' if at(i - 1) == 'S' else 'X')
+            elif following in ('I', 'E', 'Y'):
+                if at(i - 1) != 'S':
+                    result.append('S')
+            else:
+                result.append('K')
+        elif letter == 'D':
+            if following == 'G' and at(i + 2) in ('E', 'Y', 'I'):
+                result.append('J')
+            else:
+                result.append('T')
+        elif letter == 'G':
+            if following == 'H' and not (i + 2 >= length or at(i + 2) in VOWELS):
+                continue
+            if following == 'N' and (i + 2 == length or word[i + 1:] == 'NED'):
+                continue
+            if at(i - 1) == 'D' and following in ('E', 'Y', 'I'):
+                continue
+            if following in ('I', 'E', 'Y') and at(i - 1) != 'G':
+                result.append('J')
+            else:
+                result.append('K')
+        elif letter == 'H':
+            if at(i - 1) in ('C', 'S', 'P', 'T', 'G'):
+                continue
+            if at(i - 1) in VOWELS and following not in VOWELS:
+                continue
+            result.append('H')
+        elif letter == 'K':
+            if at(i - 1) != 'C':
+                result.append('K')
+        elif letter == 'P':
+            result.append('F' if following == 'H' else 'P')
+        elif letter == 'Q':
+            result.append('K')
+        elif letter == 'S':
+            if following == 'H' or (following == 'I' and at(i + 2) in ('O', 'A')):
+                result.append('X')
+            else:
+                result.append('S')
+        elif letter == 'T':
+            if following == 'I' and at(i + 2) in ('O', 'A'):
+                result.append('X')
+            elif following == 'H':
+                result.append('0')
+            elif not (following == 'C' and at(i + 2) == 'H'):
+                result.append('T')
+        elif letter == 'V':
+            result.append('F')
+        elif letter in ('W', 'Y'):
+            if following in VOWELS:
+                result.append(letter)
+        elif letter == 'X':
+            result.append('KS')
+        elif letter == 'Z':
+            result.append('S')
+        else:
+            result.append(letter)
+
+    return ''.join(result)
+
+
+@lru_cache(maxsize=65536)
+def trigrams(name: str) -> frozenset:
+    padded = f" {str(name).strip().lower()} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def jaro_winkler(first: str, second: str) -> float:
+    if first == second:
+        return 1.0
+    if not first or not second:
+        return 0.0
+
+    match_distance = max(len(first), len(second)) // 2 - 1
+    first_matches = [False] * len(first)
+    second_matches = [False] * len(second)
+
+    matches = 0
+    for i, letter in enumerate(first):
+        start = max(0, i - match_distance)
+        end = min(i + match_distance + 1, len(second))
+        for j in range(start, end):
+            if not second_matches[j] and second[j] == letter:
+                first_matches[i] = second_matches[j] = True
+                matches += 1
+                break
+
+    if matches == 0:
+        return 0.0
+
+    transpositions = 0
+    j = 0
+    for i, letter in enumerate(first):
+        if first_matches[i]:
+            while not second_matches[j]:
+                j += 1
+            if letter != second[j]:
+                transpositions += 1
+            j += 1
+
+    jaro = (matches / len(first) + matches / len(second) + (matches - transpositions / 2) / matches) / 3
+
+    prefix = 0
+    for a, b in zip(first[:4], second[:4]):
+        if a != b:
+            break
+        prefix += 1
+
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def name_similarity(first_a: str, last_a: str, first_b: str, last_b: str) -> float:
+    """Weighted Jaro-Winkler similarity of two lower-cased names, last name counting most"""
+    first_score = jaro_winkler(first_a, first_b)
+    # Nicknames and initials: "Jon" for "Jonathan", "J" for "John"
+    if first_b.startswith(first_a) or first_a.startswith(first_b):
+        first_score = max(first_score, 0.9)
+
+    return round(0.4 * first_score + 0.6 * jaro_winkler(last_a, last_b), 4)
+
+
+class PatientMatcher:
+    """Blocking index for fuzzy patient lookup.
+
+    Every patient is filed under a handful of blocking keys: the Soundex and
+    Metaphone codes of the full name, plus each trigram of the last name
+    paired with the first initial. A query only scores the patients that
+    share a key with it, so candidate generation never scans the roster.
+    """
+
+    def __init__(self, max_block_size: int = 2000, max_scored: int = 50):
+        self.max_block_size = max_block_size
+        self.max_scored = max_scored
+        self.blocks: Dict[Tuple, List[str]] = {}
+        # Lower-cased first and last name for scoring, date of birth, then the names as stored for display
+        self.records: Dict[str, Tuple[str, str, str, str, str]] = {}
+
+    @staticmethod
+    def blocking_keys(first: str, last: str) -> List[Tuple]:
+        keys = [
+            ('soundex', soundex(first), soundex(last)),
+            ('metaphone', metaphone(first), metaphone(last))
+        ]
+        initial = first[:1]
+        keys.extend(('trigram', gram, initial) for gram in trigrams(last))
+        return keys
+
+    @classmethod
+    def build(cls, patients_df: pd.DataFrame, max_block_size: int = 2000) -> 'PatientMatcher':
+        matcher = cls(max_block_size)
+        if patients_df.empty:
+            return matcher
+
+        columns = zip(
+            patients_df['patient_id'].tolist(),
+            patients_df['first_name'].astype(str).tolist(),
+            patients_df['last_name'].astype(str).tolist(),
+            patients_df['date_of_birth'].astype(str).tolist()
+        )
+        for patient_id, first, last, dob in columns:
+            matcher.add(patient_id, first, last, dob)
+        return matcher
+
+    def add(self, patient_id: str, first_name: str, last_name: str, dob: str):
+        first = first_name.strip().lower()
+        last = last_name.strip().lower()
+        self.records[patient_id] = (first, last, str(dob).strip(), first_name.strip(), last_name.strip())
+        for key in self.blocking_keys(first, last):
+            self.blocks.setdefault(key, []).append(patient_id)
+
+    def remove(self, patient_id: str):
+        record = self.records.pop(patient_id, None)
+        if record is None:
+            return
+        for key in self.blocking_keys(record[0], record[1]):
+            block = self.blocks[key]
+            block.remove(patient_id)
+            if not block:
+                del self.blocks[key]
+
+    def candidate_ids(self, first_name: str, last_name: str) -> Dict[str, int]:
+        """Patients sharing at least one blocking key, with the number of keys shared"""
+        hits: Dict[str, int] = {}
+        for key in self.blocking_keys(first_name.strip().lower(), last_name.strip().lower()):
+            block = self.blocks.get(key)
+            # Oversized blocks are not selective enough to be worth scoring
+            if not block or len(block) > self.max_block_size:
+                continue
+            for patient_id in block:
+                hits[patient_id] = hits.get(patient_id, 0) + 1
+        return hits
+
+    def score(self, first_name: str, last_name: str, patient_id: str) -> float:
+        first, last = self.records[patient_id][:2]
+        return name_similarity(first_name.strip().lower(), last_name.strip().lower(), first, last)
+
+    def candidates(self, first_name: str, last_name: str, dob: str = None, limit: int = 5, min_score: float = 0.0) -> List[Dict]:
+        dob = dob.strip() if dob else None
+        hits = self.candidate_ids(first_name, last_name)
+        # Only the patients sharing the most keys are worth a full string comparison
+        shortlist = heapq.nlargest(self.max_scored, hits.items(), key=lambda hit: hit[1])
+
+        ranked = []
+        for patient_id, shared_keys in shortlist:
+            score = self.score(first_name, last_name, patient_id)
+            if score < min_score:
+                continue
+            _, _, patient_dob, first, last = self.records[patient_id]
+            ranked.append({
+                'patient_id': patient_id,
+                'first_name': first,
+                'last_name': last,
+                'date_of_birth': patient_dob,
+                'score': score,
+                'dob_match': bool(dob) and dob == patient_dob,
+                'shared_keys': shared_keys
+            })
+
+        ranked.sort(key=lambda candidate: (round(candidate['score'], 2), candidate['dob_match'], candidate['shared_keys']), reverse=True)
+        return ranked[:limit]
+
+    def __len__(self) -> int:
+        return len(self.records)
@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+    logging.warning("fcntl not available. Writes are only serialized within a single process.")
+
+
+class ProcessLock:
+    """Exclusive lock shared by every process that opens the same data directory.
+
+    Backed by flock() on a lock file, so it is released by the OS if the
+    holder dies. Re-entrant within a process: nested acquires by the
+    holding thread only bump a counter, and other threads queue on an
+    in-process RLock before contending for the file lock. pin() keeps
+    the file lock past the holder's release, keeping other processes
+    out while this one still has writes to flush.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._pins = 0
+        self._file = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._file is None and FCNTL_AVAILABLE:
+            try:
+                self._file = open(self.path, 'a+')
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._pins == 0 and self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def pin(self):
+        """Hold the file lock until unpin(), even once no thread holds this lock; call while holding it"""
+        self._pins += 1
+
+    def unpin(self):
+        """Undo one pin(); call while holding the lock, whose release then frees the file lock"""
+        self._pins -= 1
+
+    def __enter__(self) -> 'ProcessLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class DataVersion:
+    """Counter in a small file, bumped after every committed write to a data directory.
+
+    Comparing it with the value an instance last saw tells that instance
+    whether another process has written since, without reading any data.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self) -> int:
+        try:
+            with open(self.path, 'r') as version_file:
+                return int(version_file.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, current: int) -> int:
+        """Store current + 1; callers hold the ProcessLock"""
+        version = current + 1
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as version_file:
+            version_file.write(str(version))
+        # Replaced atomically so a reader never sees a half-written number
+        os.replace(temp_path, self.path)
+        return version
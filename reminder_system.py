@@ -2,41 +2,32 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import pandas as pd
 from database import PatientDatabase
+from frame_schema import to_records
 from messaging import MessagingService
 
 class ReminderSystem:
     def __init__(self, db: PatientDatabase):
         self.db = db
         self.messaging_service = MessagingService()
-        self.reminder_log_file = "data/reminder_log.csv"
+        self.reminder_log_file = db.reminder_log_file
         self._initialize_reminder_log()
     
     def _initialize_reminder_log(self):
         if not os.path.exists(self.reminder_log_file):
-            reminder_log_df = pd.DataFrame(columns=[
-                'appointment_id', 'patient_id', 'reminder_type', 'sent_at', 
-                'email_success', 'sms_success', 'response_received'
-            ])
-            reminder_log_df.to_csv(self.reminder_log_file, index=False)
+            self.db.load_reminder_log().to_csv(self.reminder_log_file, index=False)
     
     def get_upcoming_appointments(self, days_ahead: int = 7) -> List[Dict]:
         current_date = datetime.now().date()
         target_date = current_date + timedelta(days=days_ahead)
         
-        upcoming_appointments = self.db.appointments_df[
-            (self.db.appointments_df['appointment_date'] == target_date.strftime('%Y-%m-%d')) &
-            (self.db.appointments_df['status'] == 'confirmed')
-        ]
+        target = target_date.strftime('%Y-%m-%d')
+        upcoming_appointments = self.db.find_appointments(start_date=target, end_date=target, status='confirmed')
         
         appointments_with_patient_data = []
-        for _, appointment in upcoming_appointments.iterrows():
-            patient_data = self.db.patients_df[
-                self.db.patients_df['patient_id'] == appointment['patient_id']
-            ]
+        for appointment_data in to_records(upcoming_appointments, 'appointments'):
+            patient = self.db.get_patient(appointment_data['patient_id'])
             
-            if not patient_data.empty:
-                patient = patient_data.iloc[0].to_dict()
-                appointment_data = appointment.to_dict()
+            if patient is not None:
                 appointments_with_patient_data.append({
                     'patient': patient,
                     'appointment': appointment_data
@@ -100,9 +91,7 @@ class ReminderSystem:
             'response_received': False
         }
         
-        reminder_log_df = pd.read_csv(self.reminder_log_file)
-        reminder_log_df = pd.concat([reminder_log_df, pd.DataFrame([log_entry])], ignore_index=True)
-        reminder_log_df.to_csv(self.reminder_log_file, index=False)
+        self.db.append_reminder_log(log_entry)
     
     def process_daily_reminders(self) -> Dict:
         results = {
@@ -152,7 +141,7 @@ class ReminderSystem:
         return results
     
     def get_reminder_status(self, appointment_id: str) -> Dict:
-        reminder_log_df = pd.read_csv(self.reminder_log_file)
+        reminder_log_df = self.db.load_reminder_log()
         appointment_reminders = reminder_log_df[
             reminder_log_df['appointment_id'] == appointment_id
         ]
@@ -169,20 +158,10 @@ class ReminderSystem:
         }
     
     def mark_response_received(self, appointment_id: str, reminder_type: str, response: str):
-        reminder_log_df = pd.read_csv(self.reminder_log_file)
-        
-        mask = (
-            (reminder_log_df['appointment_id'] == appointment_id) &
-            (reminder_log_df['reminder_type'] == reminder_type)
-        )
-        
-        if mask.any():
-            reminder_log_df.loc[mask, 'response_received'] = True
-            reminder_log_df.loc[mask, 'response_text'] = response
-            reminder_log_df.to_csv(self.reminder_log_file, index=False)
+        self.db.mark_reminder_response(appointment_id, reminder_type, response)
     
     def generate_reminder_report(self, start_date: str = None, end_date: str = None) -> Dict:
-        reminder_log_df = pd.read_csv(self.reminder_log_file)
+        reminder_log_df = self.db.load_reminder_log()
         
         if start_date:
             reminder_log_df = reminder_log_df[reminder_log_df['sent_at'] >= start_date]
@@ -0,0 +1,135 @@
+import os
+import time
+import logging
+from typing import Dict, Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logging.warning("pyarrow not available. Schedules will be read from Excel on every start.")
+
+
+class ScheduleCache:
+    """Feather sidecar for doctor_schedules.xlsx keyed by the source file's mtime and size.
+
+    The sidecar is written uncompressed so it can be memory-mapped on read.
+    It is rebuilt whenever the xlsx is changed by anything other than this
+    cache's own store().
+    """
+
+    def __init__(self, source_file: str, cache_file: str = None):
+        self.source_file = source_file
+        if cache_file is None:
+            cache_dir = os.path.join(os.path.dirname(source_file), ".cache")
+            cache_file = os.path.join(cache_dir, os.path.splitext(os.path.basename(source_file))[0] + ".feather")
+        self.cache_file = cache_file
+        self.last_source = None
+        self.last_load_seconds = 0.0
+
+    def _source_key(self) -> Dict[bytes, bytes]:
+        stat = os.stat(self.source_file)
+        return {
+            b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+            b'source_size': str(stat.st_size).encode()
+        }
+
+    def _read_cache(self) -> Optional[pd.DataFrame]:
+        if not PYARROW_AVAILABLE or not os.path.exists(self.cache_file):
+            return None
+
+        try:
+            table = feather.read_table(self.cache_file, memory_map=True)
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        source_key = self._source_key()
+        if any(metadata.get(key) != value for key, value in source_key.items()):
+            return None
+
+        return table.to_pandas()
+
+    def store(self, df: pd.DataFrame):
+        """Write the sidecar for the current state of the source file"""
+        if not PYARROW_AVAILABLE:
+            return
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata.update(self._source_key())
+            table = table.replace_schema_metadata(metadata)
+
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = self.cache_file + ".tmp"
+            feather.write_feather(table, temp_file, compression='uncompressed')
+            os.replace(temp_file, self.cache_file)
+        except (OSError, pa.ArrowException) as e:
+            logging.warning(f"Could not write schedule cache {self.cache_file}: {e}")
+
+    def load(self) -> pd.DataFrame:
+        start = time.perf_counter()
+
+        df = self._read_cache()
+        if df is not None:
+            self.last_source = 'cache'
+        else:
+            df = pd.read_excel(self.source_file)
+            self.store(df)
+            self.last_source = 'excel'
+
+        self.last_load_seconds = time.perf_counter() - start
+        return df
+
+    def invalidate(self):
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+
+def startup_timing_report(data_dir: str = "data", runs: int = 3) -> Dict:
+    """Compare a cold read_excel start against a warm sidecar start"""
+    from database import PatientDatabase
+
+    source_file = os.path.join(data_dir, "doctor_schedules.xlsx")
+    cache = ScheduleCache(source_file)
+
+    excel_seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pd.read_excel(source_file)
+        excel_seconds.append(time.perf_counter() - start)
+
+    cache.load()
+    cache_seconds = []
+    for _ in range(runs):
+        cache.load()
+        cache_seconds.append(cache.last_load_seconds)
+
+    db = PatientDatabase(data_dir, journal_mode=False)
+
+    excel_best = min(excel_seconds)
+    cache_best = min(cache_seconds)
+    return {
+        'schedule_rows': len(db.schedule_df),
+        'excel_seconds': round(excel_best, 4),
+        'cache_seconds': round(cache_best, 4),
+        'saved_seconds': round(excel_best - cache_best, 4),
+        'speedup': round(excel_best / cache_best, 1) if cache_best > 0 else None,
+        'database_load_timings': db.load_timings
+    }
+
+
+if __name__ == "__main__":
+    report = startup_timing_report()
+    print(f"Schedule rows:         {report['schedule_rows']}")
+    print(f"read_excel:            {report['excel_seconds'] * 1000:.1f} ms")
+    print(f"feather sidecar:       {report['cache_seconds'] * 1000:.1f} ms")
+    print(f"Saved per load:        {report['saved_seconds'] * 1000:.1f} ms ({report['speedup']}x)")
+    print("PatientDatabase load:  " + ", ".join(
+        f"{name}={value * 1000:.1f} ms" if isinstance(value, float) else f"{name}={value}"
+        for name, value in report['database_load_timings'].items()
+    ))
@@ -0,0 +1,113 @@
+import json
+from datetime import date
+from typing import Dict, List, Tuple
+import pandas as pd
+from availability import AvailabilityBitmap
+from slot_engine import claim_confirmed
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+def _minutes(clock_time: str) -> int:
+    hours, minutes = clock_time.strip().split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _span(time_range: str) -> Tuple[int, int]:
+    start, end = time_range.split('-')
+    return _minutes(start), _minutes(end)
+
+
+class ScheduleTemplates:
+    """Recurring weekly availability per doctor, read from data/schedule_templates.json.
+
+    A doctor's rule gives working hours per weekday, breaks, and optionally
+    fixed slot start times (otherwise a start is offered every step). Dates
+    listed under `holidays`, a doctor's `blackout_dates`, or `overrides`
+    (replacement hours for one date) are the only per-date data kept, and
+    `config` holds the rules as read so exceptions added later can be saved.
+
+    Masks are precomputed once per doctor and weekday, so materializing a
+    day is a couple of dict lookups.
+    """
+
+    def __init__(self, config: Dict, granularity: int = 15, step_minutes: int = 15):
+        self.config = config
+        self.granularity = granularity
+        self.step_minutes = step_minutes
+        self.holidays = {date.fromisoformat(day).toordinal() for day in config.get('holidays', [])}
+        self.weekly: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        self.overrides: Dict[str, Dict[int, Tuple[int, int]]] = {}
+
+        for doctor_name, rule in config.get('doctors', {}).items():
+            self._compile(doctor_name, rule)
+
+    def _compile(self, doctor_name: str, rule: Dict):
+        breaks = [_span(time_range) for time_range in rule.get('breaks', [])]
+        slot_starts = [_minutes(start) for start in rule['slot_starts']] if 'slot_starts' in rule else None
+
+        self.weekly[doctor_name] = {
+            WEEKDAYS.index(weekday): self._day_masks(ranges, breaks, slot_starts)
+            for weekday, ranges in rule.get('weekly', {}).items()
+        }
+        overrides = {
+            date.fromisoformat(day).toordinal(): self._day_masks(ranges, breaks, slot_starts)
+            for day, ranges in rule.get('overrides', {}).items()
+        }
+        for day in rule.get('blackout_dates', []):
+            overrides[date.fromisoformat(day).toordinal()] = (0, 0)
+        self.overrides[doctor_name] = overrides
+
+    @classmethod
+    def load(cls, path: str, granularity: int = 15, step_minutes: int = 15) -> 'ScheduleTemplates':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), granularity, step_minutes)
+
+    def add_exception(self, doctor_name: str, day: str, hours: List[str] = None):
+        """Close a doctor's YYYY-MM-DD day (hours None) or give it its own hours, e.g. ['09:00-12:00']"""
+        rule = self.config['doctors'][doctor_name]
+        blackout_dates = rule.setdefault('blackout_dates', [])
+        overrides = rule.setdefault('overrides', {})
+        if day in blackout_dates:
+            blackout_dates.remove(day)
+        overrides.pop(day, None)
+        if hours is None:
+            blackout_dates.append(day)
+        else:
+            overrides[day] = list(hours)
+        self._compile(doctor_name, rule)
+
+    def _mask(self, start: int, end: int) -> int:
+        first = start // self.granularity
+        return ((1 << (end // self.granularity - first)) - 1) << first
+
+    def _day_masks(self, ranges: List[str], breaks: List[Tuple[int, int]], slot_starts: List[int] = None) -> Tuple[int, int]:
+        free = 0
+        offered = 0
+        for start, end in (_span(time_range) for time_range in ranges):
+            free |= self._mask(start, end)
+            if slot_starts is None:
+                for minute in range(start, end, self.step_minutes):
+                    offered |= 1 << (minute // self.granularity)
+        for start, end in breaks:
+            free &= ~self._mask(start, end)
+        for minute in slot_starts or []:
+            offered |= 1 << (minute // self.granularity)
+        return free, offered & free
+
+    def day_masks(self, doctor_name: str, day: int) -> Tuple[int, int]:
+        if day in self.holidays:
+            return 0, 0
+        overrides = self.overrides.get(doctor_name, {})
+        if day in overrides:
+            return overrides[day]
+        return self.weekly.get(doctor_name, {}).get(date.fromordinal(day).weekday(), (0, 0))
+
+    def build(self, appointments_df: pd.DataFrame, horizon_days: int = 365) -> AvailabilityBitmap:
+        """An empty bitmap that materializes days from these rules, with bookings cut out"""
+        bitmap = AvailabilityBitmap(self.granularity, self.step_minutes)
+        bitmap.template = self
+        bitmap.horizon_days = horizon_days
+        # Only days that have bookings are materialized here
+        claim_confirmed(bitmap, appointments_df)
+        return bitmap
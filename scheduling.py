@@ -1,84 +1,153 @@
+import heapq
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from database import PatientDatabase
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config import Config
+from database import BookingConflictError, PatientDatabase
+
+# Days from today checked when suggesting appointment times
+SUGGESTION_DAYS_AHEAD = [1, 2, 3, 7, 14]
 
 class SmartScheduler:
-    def __init__(self, db: PatientDatabase):
+    def __init__(self, db: PatientDatabase, clock: Callable[[], datetime] = datetime.now):
         self.db = db
+        self.clock = clock
         self.new_patient_duration = 60
         self.returning_patient_duration = 30
     
     def get_available_slots(self, doctor_name: str, date: str = None, duration: int = 30) -> List[Dict]:
+        # Pick up bookings other processes made since we last looked
+        self.db.refresh_if_stale()
+        now = self.clock()
         if date:
-            available_slots = self.db.get_available_slots(doctor_name, date)
+            slot_times = self.db.availability_cache.get(doctor_name, date, duration, now)
+            if slot_times is None:
+                slot_times = self._slot_strings(self._suitable_starts(doctor_name, date, duration, now))
+                self.db.availability_cache.put(doctor_name, date, duration, slot_times, now)
+            slot_times = np.array(slot_times, dtype=str)
         else:
-            available_slots = self.db.get_available_slots(doctor_name)
-        
-        suitable_slots = []
-        for slot in available_slots:
-            slot_datetime = datetime.strptime(slot['time_slot'], '%Y-%m-%d %H:%M')
-            
-            if self._is_slot_suitable(slot_datetime, duration):
-                suitable_slots.append({
-                    'time_slot': slot['time_slot'],
-                    'date': slot['date'],
-                    'doctor_name': slot['doctor_name'],
-                    'duration': duration
-                })
+            slot_times = self._slot_strings(self._suitable_starts(doctor_name, None, duration, now))
         
-        return suitable_slots
+        return pd.DataFrame({
+            'time_slot': slot_times,
+            'date': np.array([time_slot[:10] for time_slot in slot_times], dtype=str),
+            'doctor_name': doctor_name,
+            'duration': duration
+        }).to_dict('records')
     
-    def _is_slot_suitable(self, slot_datetime: datetime, duration: int) -> bool:
-        current_time = datetime.now()
-        
-        if slot_datetime <= current_time:
-            return False
-        
-        if slot_datetime.weekday() >= 5:
-            return False
-        
-        if slot_datetime.hour < 9 or slot_datetime.hour >= 17:
-            return False
-        
-        if slot_datetime.hour == 12:
-            return False
+    def _suitable_starts(self, doctor_name: str, date: Optional[str], duration: int, now: datetime) -> np.ndarray:
+        slot_starts = self.db.available_slot_starts(doctor_name, date, duration)
+        return slot_starts[self._suitable_mask(slot_starts, now)]
+    
+    @staticmethod
+    def _slot_strings(slot_starts: np.ndarray) -> List[str]:
+        return np.char.replace(np.datetime_as_string(slot_starts, unit='m'), 'T', ' ').tolist()
+    
+    def _suitable_mask(self, slot_starts: np.ndarray, now: datetime) -> np.ndarray:
+        """Future weekday slots inside working hours, outside the lunch hour"""
+        minutes = slot_starts.astype('int64')
+        # 1970-01-01 was a Thursday (weekday 3)
+        weekdays = (minutes // 1440 + 3) % 7
+        hours = minutes % 1440 // 60
         
-        return True
+        return (
+            (slot_starts > np.datetime64(now)) &
+            (weekdays < 5) &
+            (hours >= Config.WORKDAY_START_HOUR) & (hours < Config.WORKDAY_END_HOUR) &
+            (hours != Config.LUNCH_HOUR)
+        )
     
-    def suggest_appointment_times(self, patient_data: Dict, doctor_name: str = None) -> Dict:
+    def suggest_appointment_times(self, patient_data: Dict, doctor_name: str = None, days_ahead: List[int] = None, top_n: int = 3, session_id: str = None) -> Dict:
         is_new_patient = patient_data.get('is_new_patient', True)
         duration = self.new_patient_duration if is_new_patient else self.returning_patient_duration
+        self.db.refresh_if_stale()
         
         if doctor_name:
-            doctors = [{'name': doctor_name}]
+            doctor_names = [doctor_name]
         else:
-            doctors = self.db.get_doctors()
+            doctor_names = [doctor['name'] for doctor in self.db.get_doctors()]
         
-        suggestions = []
+        now = self.clock()
+        target_dates = sorted({(now + timedelta(days=days)).strftime('%Y-%m-%d') for days in (days_ahead or SUGGESTION_DAYS_AHEAD)})
         
-        for doctor in doctors:
-            doctor_name = doctor['name']
-            
-            for days_ahead in [1, 2, 3, 7, 14]:
-                target_date = (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-                available_slots = self.get_available_slots(doctor_name, target_date, duration)
-                
-                if available_slots:
-                    suggestions.append({
-                        'doctor_name': doctor_name,
-                        'date': target_date,
-                        'available_times': [slot['time_slot'] for slot in available_slots[:3]],
-                        'duration': duration
-                    })
+        # Each doctor's earliest target day with times not held by other sessions,
+        # served from the shared cache where possible
+        earliest = {}
+        uncached = []
+        for name in doctor_names:
+            for date in target_dates:
+                slot_times = self.db.availability_cache.get(name, date, duration, now)
+                if slot_times is None:
+                    uncached.append(name)
+                    break
+                slot_times = self._unheld(name, slot_times, session_id, top_n, duration)
+                if slot_times:
+                    earliest[name] = (date, slot_times)
                     break
         
+        if uncached:
+            day_slots = self._scan_horizon(uncached, target_dates, duration, now)
+            for name in uncached:
+                for date in target_dates:
+                    slot_times = self._unheld(name, day_slots.get((name, date), []), session_id, top_n, duration)
+                    if slot_times:
+                        earliest[name] = (date, slot_times)
+                        break
+        
+        suggestions = []
+        for name in doctor_names:
+            if name in earliest:
+                date, slot_times = earliest[name]
+                suggestions.append({
+                    'doctor_name': name,
+                    'date': date,
+                    'available_times': slot_times[:top_n],
+                    'duration': duration
+                })
+        
         return {
             'suggestions': suggestions,
             'is_new_patient': is_new_patient,
             'duration': duration
         }
     
-    def book_appointment(self, patient_data: Dict, appointment_details: Dict) -> Dict:
+    def _unheld(self, doctor_name: str, slot_times: List[str], session_id: Optional[str], limit: int, duration: int) -> List[str]:
+        unheld = []
+        for time_slot in slot_times:
+            if not self.db.slot_holds.is_held_by_other(doctor_name, time_slot, session_id, duration):
+                unheld.append(time_slot)
+                if len(unheld) == limit:
+                    break
+        return unheld
+    
+    def _scan_horizon(self, doctor_names: List[str], target_dates: List[str], duration: int, now: datetime) -> Dict[Tuple[str, str], List[str]]:
+        """One pass over the doctors' slots in the horizon; caches every target day it covers"""
+        codes, slot_starts = self.db.horizon_slot_starts(doctor_names, target_dates[0], target_dates[-1], duration)
+        slot_days = slot_starts.astype('datetime64[D]')
+        keep = self._suitable_mask(slot_starts, now) & np.isin(slot_days, np.array(target_dates, dtype='datetime64[D]'))
+        codes, slot_starts, slot_days = codes[keep], slot_starts[keep], slot_days[keep]
+        
+        day_slots = {}
+        if len(codes):
+            # Rows are ordered by doctor then time, so each (doctor, day) is one contiguous run
+            bounds = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (slot_days[1:] != slot_days[:-1]), True])
+            slot_times = self._slot_strings(slot_starts)
+            for first, end in zip(bounds[:-1], bounds[1:]):
+                day_slots[(doctor_names[codes[first]], str(slot_days[first]))] = slot_times[first:end]
+        
+        for name in doctor_names:
+            for date in target_dates:
+                self.db.availability_cache.put(name, date, duration, day_slots.get((name, date), []), now)
+        return day_slots
+    
+    def hold_slot(self, doctor_name: str, time_slot: str, session_id: str, duration: int = None) -> bool:
+        return self.db.slot_holds.hold(doctor_name, time_slot, session_id, duration)
+    
+    def release_holds(self, session_id: str, keep: Tuple[str, str] = None):
+        self.db.slot_holds.release_session(session_id, keep)
+    
+    def book_appointment(self, patient_data: Dict, appointment_details: Dict, session_id: str = None) -> Dict:
         try:
             appointment_data = {
                 'patient_id': patient_data['patient_id'],
@@ -94,7 +163,7 @@ class SmartScheduler:
                 'email': patient_data.get('email', '')
             }
             
-            appointment_id = self.db.book_appointment(appointment_data)
+            appointment_id = self.db.book_appointment(appointment_data, session_id)
             
             return {
                 'success': True,
@@ -102,43 +171,187 @@ class SmartScheduler:
                 'message': f"Appointment booked successfully! Your appointment ID is {appointment_id}."
             }
         
+        except BookingConflictError as e:
+            return {
+                'success': False,
+                'conflict': True,
+                'message': f"That time is no longer available: {str(e)}"
+            }
         except Exception as e:
             return {
                 'success': False,
                 'message': f"Failed to book appointment: {str(e)}"
             }
     
-    def check_conflicts(self, doctor_name: str, appointment_time: str, duration: int) -> bool:
-        appointment_datetime = datetime.strptime(appointment_time, '%Y-%m-%d %H:%M')
-        end_time = appointment_datetime + timedelta(minutes=duration)
-        
-        existing_appointments = self.db.appointments_df[
-            (self.db.appointments_df['doctor_name'] == doctor_name) &
-            (self.db.appointments_df['status'] == 'confirmed')
+    def get_upcoming_appointments(self, patient_id: str) -> List[Dict]:
+        """A patient's confirmed appointments that have not started yet, soonest first"""
+        now = self.clock().strftime('%Y-%m-%d %H:%M')
+        appointments = [
+            appointment for appointment in self.db.get_patient_appointments(patient_id)
+            if appointment['status'] == 'confirmed' and f"{appointment['appointment_date']} {appointment['appointment_time']}" > now
         ]
+        return sorted(appointments, key=lambda appointment: (appointment['appointment_date'], appointment['appointment_time']))
+    
+    def cancel_appointment(self, appointment_id: str) -> Dict:
+        try:
+            appointment = self.db.cancel_appointment(appointment_id)
+            waitlist_offer = self._offer_freed_slot(appointment)
+            
+            return {
+                'success': True,
+                'appointment': appointment,
+                'waitlist_offer': waitlist_offer,
+                'message': f"Appointment {appointment_id} has been cancelled."
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"Failed to cancel appointment: {str(e)}"
+            }
+    
+    def reschedule_appointment(self, appointment_id: str, appointment_details: Dict, session_id: str = None) -> Dict:
+        try:
+            appointment = self.db.get_appointment(appointment_id)
+            appointment_data = {
+                'doctor_name': appointment_details['doctor_name'],
+                'appointment_date': appointment_details['appointment_date'],
+                'appointment_time': appointment_details['appointment_time']
+            }
+            if appointment_details.get('duration'):
+                appointment_data['duration_minutes'] = appointment_details['duration']
+            
+            new_appointment_id = self.db.reschedule_appointment(appointment_id, appointment_data, session_id)
+            waitlist_offer = self._offer_freed_slot(appointment)
+            
+            return {
+                'success': True,
+                'appointment_id': new_appointment_id,
+                'waitlist_offer': waitlist_offer,
+                'message': f"Appointment moved to {appointment_data['appointment_date']} at {appointment_data['appointment_time']}. Your new appointment ID is {new_appointment_id}."
+            }
+        
+        except BookingConflictError as e:
+            return {
+                'success': False,
+                'conflict': True,
+                'message': f"That time is no longer available: {str(e)}"
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"Failed to reschedule appointment: {str(e)}"
+            }
+    
+    def join_waitlist(self, patient_data: Dict, doctor_name: str = None, earliest_date: str = None, latest_date: str = None) -> Dict:
+        duration = self.new_patient_duration if patient_data.get('is_new_patient', True) else self.returning_patient_duration
+        waitlist_id = self.db.waitlist.add(patient_data['patient_id'], duration, doctor_name, earliest_date, latest_date)
+        return {
+            'success': True,
+            'waitlist_id': waitlist_id,
+            'message': "You've been added to our waitlist. We'll contact you as soon as a matching time opens up."
+        }
+    
+    def _offer_freed_slot(self, appointment: Dict) -> Optional[Dict]:
+        """_backfill for a change that is already saved: a waitlist failure is reported but never fails the change"""
+        try:
+            return self._backfill(appointment)
+        except Exception as e:
+            print(f"Error offering the freed slot of {appointment['appointment_id']} to the waitlist: {e}")
+            return None
+    
+    def _backfill(self, appointment: Dict) -> Optional[Dict]:
+        """Hold a freed slot for the first waitlisted patient it suits and return the offer"""
+        time_slot = f"{appointment['appointment_date']} {appointment['appointment_time']}"
+        slot_time = datetime.strptime(time_slot, '%Y-%m-%d %H:%M')
+        now = self.clock()
+        if slot_time <= now:
+            return None
         
-        for _, appointment in existing_appointments.iterrows():
-            existing_start = datetime.strptime(
-                f"{appointment['appointment_date']} {appointment['appointment_time']}", 
-                '%Y-%m-%d %H:%M'
-            )
-            existing_end = existing_start + timedelta(minutes=appointment['duration_minutes'])
+        for entry in self.db.waitlist.candidates(appointment['doctor_name'], appointment['appointment_date'], now):
+            if entry['patient_id'] == appointment['patient_id']:
+                continue
+            if not self.db.availability.is_free(appointment['doctor_name'], slot_time, entry['duration_minutes']):
+                continue
+            if not self.hold_slot(appointment['doctor_name'], time_slot, f"waitlist-{entry['waitlist_id']}", entry['duration_minutes']):
+                return None
             
-            if (appointment_datetime < existing_end and end_time > existing_start):
-                return True
+            self.db.waitlist.mark_offered(entry['waitlist_id'], appointment['doctor_name'], time_slot, self.db.slot_holds.ttl_seconds, now)
+            return {
+                'waitlist_id': entry['waitlist_id'],
+                'patient_id': entry['patient_id'],
+                'doctor_name': appointment['doctor_name'],
+                'appointment_date': appointment['appointment_date'],
+                'appointment_time': appointment['appointment_time'],
+                'duration': entry['duration_minutes']
+            }
+        return None
+    
+    def accept_waitlist_offer(self, waitlist_id: str) -> Dict:
+        entry = self.db.waitlist.get(waitlist_id)
+        if entry is None or entry['status'] != 'offered':
+            return {'success': False, 'message': f"There is no open offer for waitlist entry {waitlist_id}"}
+        
+        doctor_name, time_slot = entry['offered_slot'].split('|')
+        patient = self.db.get_patient(entry['patient_id']) or {'patient_id': entry['patient_id']}
+        patient = {**patient, 'is_new_patient': entry['duration_minutes'] >= self.new_patient_duration}
+        result = self.book_appointment(patient, {
+            'doctor_name': doctor_name,
+            'appointment_date': time_slot[:10],
+            'appointment_time': time_slot[11:],
+            'duration': entry['duration_minutes']
+        }, f"waitlist-{waitlist_id}")
         
-        return False
+        # A lapsed offer whose slot was taken puts the entry back in line
+        self.db.waitlist.set_status(waitlist_id, 'booked' if result['success'] else 'waiting')
+        return result
     
-    def get_next_available_slot(self, doctor_name: str, preferred_date: str = None) -> Optional[Dict]:
+    def check_conflicts(self, doctor_name: str, appointment_time: str, duration: int) -> bool:
+        appointment_datetime = datetime.strptime(appointment_time, '%Y-%m-%d %H:%M')
+        return self.db.appointment_intervals.has_conflict(doctor_name, appointment_datetime, duration)
+    
+    def check_conflicts_batch(self, doctor_name: str, appointment_times: List[str], duration: int) -> List[bool]:
+        """Conflict flags for many candidate start times in one call"""
+        appointment_datetimes = [datetime.strptime(appointment_time, '%Y-%m-%d %H:%M') for appointment_time in appointment_times]
+        return self.db.appointment_intervals.conflicts_batch(doctor_name, appointment_datetimes, duration)
+    
+    def _slot_record(self, doctor_name: str, slot_time: datetime, duration: int) -> Dict:
+        return {
+            'time_slot': slot_time.strftime('%Y-%m-%d %H:%M'),
+            'date': slot_time.strftime('%Y-%m-%d'),
+            'doctor_name': doctor_name,
+            'duration': duration
+        }
+    
+    def _first_suitable(self, candidates: Iterator[Tuple[datetime, str]], duration: int) -> Optional[Dict]:
+        now = self.clock()
+        for slot_time, doctor_name in candidates:
+            if self._suitable_mask(np.array([slot_time], dtype='datetime64[m]'), now)[0]:
+                return self._slot_record(doctor_name, slot_time, duration)
+        return None
+    
+    def _search_start(self) -> datetime:
+        # Searches begin tomorrow, as the day-by-day loop they replace did
+        return datetime.combine((self.clock() + timedelta(days=1)).date(), datetime.min.time())
+    
+    def get_next_available_slot(self, doctor_name: str, preferred_date: str = None, duration: int = 30) -> Optional[Dict]:
         if preferred_date:
-            available_slots = self.get_available_slots(doctor_name, preferred_date)
+            available_slots = self.get_available_slots(doctor_name, preferred_date, duration)
             if available_slots:
                 return available_slots[0]
         
-        for days_ahead in range(1, 31):
-            target_date = (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-            available_slots = self.get_available_slots(doctor_name, target_date)
-            if available_slots:
-                return available_slots[0]
+        free_slots = self.db.iter_free_slots(doctor_name, self._search_start(), duration)
+        return self._first_suitable(((slot_time, doctor_name) for slot_time in free_slots), duration)
+    
+    def get_earliest_available_slot(self, duration: int = 30, doctor_names: List[str] = None) -> Optional[Dict]:
+        """Earliest suitable slot across doctors, from a k-way merge of their free-slot streams"""
+        if doctor_names is None:
+            doctor_names = [doctor['name'] for doctor in self.db.get_doctors()]
         
-        return None
+        after = self._search_start()
+        
+        def stream(doctor_name: str) -> Iterator[Tuple[datetime, str]]:
+            for slot_time in self.db.iter_free_slots(doctor_name, after, duration):
+                yield slot_time, doctor_name
+        
+        return self._first_suitable(heapq.merge(*(stream(doctor_name) for doctor_name in doctor_names)), duration)
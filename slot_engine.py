@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import List, Tuple
+import pandas as pd
+from config import Config
+from availability import AvailabilityBitmap
+
+
+def claim_confirmed(bitmap: AvailabilityBitmap, appointments_df: pd.DataFrame):
+    """Cut every confirmed appointment out of the bitmap's free time"""
+    if appointments_df.empty:
+        return
+
+    confirmed = appointments_df[appointments_df['status'] == 'confirmed']
+    durations = pd.to_numeric(confirmed['duration_minutes'], errors='coerce').fillna(Config.RETURNING_PATIENT_SLOT_DURATION).astype(int)
+    starts = confirmed['appointment_date'].astype(str) + ' ' + confirmed['appointment_time'].astype(str)
+    for doctor_name, start, duration in zip(confirmed['doctor_name'].tolist(), starts.tolist(), durations.tolist()):
+        bitmap.claim(doctor_name, datetime.strptime(start, '%Y-%m-%d %H:%M'), duration)
+
+
+class SlotEngine:
+    """Availability modelled as working-day free intervals rather than fixed slot rows.
+
+    Every doctor-day that appears in the schedule opens as its working hours
+    minus breaks, with a bookable start every `step_minutes`. Each confirmed
+    appointment is then cut out of the day, splitting whichever interval it
+    falls in, so visits of any length pack back to back and a 60-minute
+    visit blocks everything it overlaps.
+    """
+
+    def __init__(self, granularity: int = 15, step_minutes: int = 15, day_start: int = 9 * 60,
+                 day_end: int = 17 * 60, breaks: List[Tuple[int, int]] = None):
+        if step_minutes % granularity:
+            raise ValueError("Slot step must be a multiple of the granularity")
+        self.granularity = granularity
+        self.step_minutes = step_minutes
+        self.day_start = day_start
+        self.day_end = day_end
+        self.breaks = breaks if breaks is not None else [(12 * 60, 13 * 60)]
+
+    @classmethod
+    def from_config(cls) -> 'SlotEngine':
+        return cls(
+            Config.SLOT_GRANULARITY_MINUTES,
+            Config.SLOT_STEP_MINUTES,
+            Config.WORKDAY_START_HOUR * 60,
+            Config.WORKDAY_END_HOUR * 60,
+            [(Config.LUNCH_HOUR * 60, (Config.LUNCH_HOUR + 1) * 60)]
+        )
+
+    def _span(self, start: int, end: int) -> int:
+        first = start // self.granularity
+        return ((1 << (end // self.granularity - first)) - 1) << first
+
+    def day_masks(self) -> Tuple[int, int]:
+        """Free and offered masks of an untouched working day"""
+        free = self._span(self.day_start, self.day_end)
+        for break_start, break_end in self.breaks:
+            free &= ~self._span(break_start, break_end)
+
+        offered = 0
+        for minute in range(self.day_start, self.day_end, self.step_minutes):
+            offered |= 1 << (minute // self.granularity)
+        return free, offered & free
+
+    def build(self, schedule_df: pd.DataFrame, appointments_df: pd.DataFrame) -> AvailabilityBitmap:
+        bitmap = AvailabilityBitmap(self.granularity, self.step_minutes)
+        free, offered = self.day_masks()
+
+        if not schedule_df.empty:
+            working_days = schedule_df[['doctor_name', 'date']].drop_duplicates()
+            for doctor_name, date in zip(working_days['doctor_name'].tolist(), working_days['date'].astype(str).tolist()):
+                bitmap.open_day(doctor_name, datetime.strptime(date, '%Y-%m-%d').toordinal(), free, offered)
+
+        claim_confirmed(bitmap, appointments_df)
+        return bitmap
@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class TimerWheel:
+    """Hashed timing wheel.
+
+    A timer lands in bucket (due_tick % size) and remembers its due tick, so
+    scheduling is O(1) and advancing the wheel only visits the buckets of
+    the ticks that elapsed. Timers more than one rotation away stay in their
+    bucket until their tick comes round.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, size: int = 512, start: float = 0.0):
+        self.tick_seconds = tick_seconds
+        self.size = size
+        self.buckets: List[List[Tuple[int, Hashable]]] = [[] for _ in range(size)]
+        self.current_tick = int(start // tick_seconds)
+
+    def schedule(self, key: Hashable, due: float):
+        tick = max(int(math.ceil(due / self.tick_seconds)), self.current_tick + 1)
+        self.buckets[tick % self.size].append((tick, key))
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Keys of every timer due at or before `now`"""
+        target = int(now // self.tick_seconds)
+        if target <= self.current_tick:
+            return []
+
+        # Past one full rotation every bucket has been visited once
+        first = max(self.current_tick + 1, target - self.size + 1)
+        due = []
+        for tick in range(first, target + 1):
+            bucket = self.buckets[tick % self.size]
+            if not bucket:
+                continue
+            waiting = []
+            for entry in bucket:
+                (due if entry[0] <= target else waiting).append(entry)
+            self.buckets[tick % self.size] = waiting
+
+        self.current_tick = target
+        return [key for _, key in due]
+
+
+def _span(time_slot: str, duration: Optional[int]) -> Tuple[str, int, int]:
+    """(day, first minute, end minute) of a "YYYY-MM-DD HH:MM" slot lasting duration minutes"""
+    minute = int(time_slot[11:13]) * 60 + int(time_slot[14:16])
+    return time_slot[:10], minute, minute + max(1, duration or 1)
+
+
+class SlotHoldManager:
+    """Short-lived reservations of a doctor's time for a chat session.
+
+    A hold on (doctor, time_slot) covers the appointment's whole duration,
+    so other sessions are neither offered nor allowed to book any start
+    whose visit would overlap it, until it expires or is converted into a
+    booking. Holds are also filed by doctor and day, so an overlap check
+    only looks at that day's holds. Expiry is driven by a timer wheel
+    advanced on each call, so no call scans the hold table.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, clock: Callable[[], float] = time.monotonic, default_minutes: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.default_minutes = default_minutes
+        self.holds: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self.spans: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self.by_day: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+        self.by_session: Dict[str, Set[Tuple[str, str]]] = {}
+        self.wheel = TimerWheel(1.0, 512, clock())
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        for key in self.wheel.advance(now):
+            hold = self.holds.get(key)
+            # The wheel may still carry the old timer of a hold that was since renewed
+            if hold is not None and hold[1] <= now:
+                self._drop(key)
+
+    def _drop(self, key: Tuple[str, str]):
+        session_id, _ = self.holds.pop(key)
+        self.spans.pop(key)
+        day = (key[0], key[1][:10])
+        held_that_day = self.by_day.get(day)
+        if held_that_day is not None:
+            held_that_day.discard(key)
+            if not held_that_day:
+                del self.by_day[day]
+        keys = self.by_session.get(session_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_session[session_id]
+
+    def _other_holder(self, doctor_name: str, time_slot: str, duration: Optional[int], session_id: Optional[str], now: float) -> Optional[str]:
+        """Session other than session_id whose live hold overlaps the slot, if any"""
+        day, start, end = _span(time_slot, duration)
+        for key in self.by_day.get((doctor_name, day), ()):
+            holder, expires_at = self.holds[key]
+            if holder == session_id or expires_at <= now:
+                continue
+            held_start, held_end = self.spans[key]
+            if held_start < end and start < held_end:
+                return holder
+        return None
+
+    def hold(self, doctor_name: str, time_slot: str, session_id: str, duration: int = None) -> bool:
+        """Hold or renew a slot of duration minutes for a session; False if another session holds any of it"""
+        key = (doctor_name, time_slot)
+        duration = duration or self.default_minutes
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            if self._other_holder(doctor_name, time_slot, duration, session_id, now) is not None:
+                return False
+            if key in self.holds:
+                self._drop(key)
+
+            expires_at = now + self.ttl_seconds
+            self.holds[key] = (session_id, expires_at)
+            self.spans[key] = _span(time_slot, duration)[1:]
+            self.by_day.setdefault((doctor_name, time_slot[:10]), set()).add(key)
+            self.by_session.setdefault(session_id, set()).add(key)
+            self.wheel.schedule(key, expires_at)
+            return True
+
+    def is_held_by_other(self, doctor_name: str, time_slot: str, session_id: str = None, duration: int = None) -> bool:
+        """Whether another session holds time a visit of duration minutes at time_slot would use (just its start if None)"""
+        with self._lock:
+            return self._other_holder(doctor_name, time_slot, duration, session_id, self.clock()) is not None
+
+    def convert(self, doctor_name: str, time_slot: str, session_id: str = None, duration: int = None) -> bool:
+        """Consume the session's hold as the slot is booked; False if another session holds any of its time"""
+        key = (doctor_name, time_slot)
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            if self._other_holder(doctor_name, time_slot, duration, session_id, now) is not None:
+                return False
+            if key in self.holds:
+                self._drop(key)
+            return True
+
+    def release(self, doctor_name: str, time_slot: str, session_id: str):
+        key = (doctor_name, time_slot)
+        with self._lock:
+            hold = self.holds.get(key)
+            if hold is not None and hold[0] == session_id:
+                self._drop(key)
+
+    def release_session(self, session_id: str, keep: Tuple[str, str] = None):
+        """Drop every hold of a session, optionally except one (doctor, time_slot)"""
+        with self._lock:
+            for key in list(self.by_session.get(session_id, ())):
+                if key != keep:
+                    self._drop(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(self.clock())
+            return len(self.holds)
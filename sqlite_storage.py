@@ -0,0 +1,639 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+import pandas as pd
+from config import Config
+from database import APPOINTMENT_COLUMNS, SCHEDULE_COLUMNS, BookingConflictError, PatientDatabase
+from interval_index import DoctorIntervalIndex
+from availability import AvailabilityBitmap
+from frame_schema import apply_schema
+
+PATIENT_COLUMNS = [
+    'patient_id', 'first_name', 'last_name', 'date_of_birth', 'phone', 'email',
+    'preferred_doctor', 'insurance_carrier', 'insurance_member_id',
+    'insurance_group_number', 'last_visit', 'is_new_patient'
+]
+
+REMINDER_LOG_COLUMNS = [
+    'appointment_id', 'patient_id', 'reminder_type', 'sent_at',
+    'email_success', 'sms_success', 'response_received', 'response_text'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    date_of_birth TEXT,
+    phone TEXT,
+    email TEXT,
+    preferred_doctor TEXT,
+    insurance_carrier TEXT,
+    insurance_member_id TEXT,
+    insurance_group_number TEXT,
+    last_visit TEXT,
+    is_new_patient INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_patients_name
+    ON patients (last_name COLLATE NOCASE, first_name COLLATE NOCASE, date_of_birth);
+
+CREATE TABLE IF NOT EXISTS doctors (
+    name TEXT PRIMARY KEY,
+    specialty TEXT,
+    location TEXT
+);
+
+CREATE TABLE IF NOT EXISTS schedule_slots (
+    doctor_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time_slot TEXT NOT NULL,
+    is_available INTEGER NOT NULL DEFAULT 1,
+    patient_id TEXT,
+    appointment_type TEXT,
+    duration_minutes INTEGER,
+    PRIMARY KEY (doctor_name, time_slot)
+);
+CREATE INDEX IF NOT EXISTS idx_schedule_doctor_date
+    ON schedule_slots (doctor_name, date, is_available);
+CREATE INDEX IF NOT EXISTS idx_schedule_date
+    ON schedule_slots (date, is_available);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    appointment_id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    doctor_name TEXT NOT NULL,
+    appointment_date TEXT NOT NULL,
+    appointment_time TEXT NOT NULL,
+    duration_minutes INTEGER,
+    appointment_type TEXT,
+    status TEXT NOT NULL,
+    created_at TEXT,
+    insurance_carrier TEXT,
+    insurance_member_id TEXT,
+    insurance_group_number TEXT,
+    phone TEXT,
+    email TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient_id);
+CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date ON appointments (doctor_name, appointment_date);
+CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (appointment_date);
+
+CREATE TABLE IF NOT EXISTS reminder_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    appointment_id TEXT,
+    patient_id TEXT,
+    reminder_type TEXT,
+    sent_at TEXT,
+    email_success INTEGER,
+    sms_success INTEGER,
+    response_received INTEGER,
+    response_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reminder_log_appointment ON reminder_log (appointment_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def sqlite_path_from_url(database_url: str) -> str:
+    """Translate a sqlite:/// URL into a path accepted by sqlite3.connect"""
+    if not database_url.startswith('sqlite:'):
+        raise ValueError(f"Unsupported DATABASE_URL (only sqlite is supported): {database_url}")
+
+    path = database_url[len('sqlite:'):]
+    if path in ('', '//', '///', '///:memory:'):
+        return ':memory:'
+    if path.startswith('///'):
+        return path[3:]
+    raise ValueError(f"Malformed sqlite DATABASE_URL: {database_url}")
+
+
+def _none_if_missing(value):
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def _frame_rows(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    df = df.reindex(columns=columns)
+    return [tuple(_none_if_missing(v) for v in row) for row in df.itertuples(index=False, name=None)]
+
+
+class SQLiteStore:
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self.path = sqlite_path_from_url(database_url)
+        # Writers from other processes queue on SQLite's lock rather than failing straight away
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.lock = threading.RLock()
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def is_migrated(self) -> bool:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_at'").fetchone()
+        return row is not None
+
+    def migrate_from_files(self, data_dir: str) -> Dict[str, int]:
+        """One-shot import of the CSV/xlsx files in data_dir into empty tables"""
+        patients_df = pd.read_csv(os.path.join(data_dir, "patients.csv"))
+        doctors_df = pd.read_csv(os.path.join(data_dir, "doctors.csv"))
+        schedule_df = pd.read_excel(os.path.join(data_dir, "doctor_schedules.xlsx"))
+
+        appointments_file = os.path.join(data_dir, "appointments.csv")
+        appointments_df = pd.read_csv(appointments_file) if os.path.exists(appointments_file) else pd.DataFrame(columns=APPOINTMENT_COLUMNS)
+
+        reminder_log_file = os.path.join(data_dir, "reminder_log.csv")
+        reminder_log_df = pd.read_csv(reminder_log_file) if os.path.exists(reminder_log_file) else pd.DataFrame(columns=REMINDER_LOG_COLUMNS)
+
+        patients_df['is_new_patient'] = patients_df['is_new_patient'].fillna(True).astype(bool).astype(int)
+        schedule_df['is_available'] = schedule_df['is_available'].fillna(True).astype(bool).astype(int)
+        for column in ('email_success', 'sms_success', 'response_received'):
+            if column in reminder_log_df:
+                reminder_log_df[column] = reminder_log_df[column].fillna(False).astype(bool).astype(int)
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO patients ({', '.join(PATIENT_COLUMNS)}) VALUES ({', '.join('?' * len(PATIENT_COLUMNS))})",
+                _frame_rows(patients_df, PATIENT_COLUMNS)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO doctors (name, specialty, location) VALUES (?, ?, ?)",
+                _frame_rows(doctors_df, ['name', 'specialty', 'location'])
+            )
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO schedule_slots ({', '.join(SCHEDULE_COLUMNS)}) VALUES ({', '.join('?' * len(SCHEDULE_COLUMNS))})",
+                _frame_rows(schedule_df, SCHEDULE_COLUMNS)
+            )
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO appointments ({', '.join(APPOINTMENT_COLUMNS)}) VALUES ({', '.join('?' * len(APPOINTMENT_COLUMNS))})",
+                _frame_rows(appointments_df, APPOINTMENT_COLUMNS)
+            )
+            self.conn.execute("DELETE FROM reminder_log")
+            self.conn.executemany(
+                f"INSERT INTO reminder_log ({', '.join(REMINDER_LOG_COLUMNS)}) VALUES ({', '.join('?' * len(REMINDER_LOG_COLUMNS))})",
+                _frame_rows(reminder_log_df, REMINDER_LOG_COLUMNS)
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_at', ?)",
+                (datetime.now().isoformat(),)
+            )
+
+        return {
+            'patients': len(patients_df),
+            'doctors': len(doctors_df),
+            'schedule_slots': len(schedule_df),
+            'appointments': len(appointments_df),
+            'reminder_log': len(reminder_log_df)
+        }
+
+    def read_table(self, query: str, params: tuple = ()) -> pd.DataFrame:
+        with self.lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    def count(self, table: str) -> int:
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class SQLitePatientDatabase(PatientDatabase):
+    """PatientDatabase backed by an indexed SQLite file instead of CSV/xlsx files.
+
+    The *_df attributes are kept for the dashboard and exports, but they are
+    read on access rather than held in memory, so construction cost does not
+    depend on table size.
+    """
+
+    def __init__(self, data_dir: str = "data", database_url: str = "sqlite:///clinic_scheduling.db"):
+        self.database_url = database_url
+        super().__init__(data_dir, journal_mode=False, partitioned=False, coalesce_ms=0)
+
+    def _load_data(self):
+        self.store = SQLiteStore(self.database_url)
+        if not self.store.is_migrated():
+            self.store.migrate_from_files(self.data_dir)
+        self._appointment_intervals = None
+        self._availability = None
+        self._data_version = self.store.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh_if_stale(self) -> bool:
+        with self.store.lock:
+            # data_version changes whenever another connection commits
+            data_version = self.store.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            self._appointment_intervals = None
+            self._availability = None
+            self._patient_matcher = None
+            self.availability_cache.clear()
+        self._notify('refresh')
+        return True
+
+    @contextmanager
+    def _write_transaction(self, change: str):
+        """Write transaction whose in-memory indexes are caught up with every other connection.
+
+        BEGIN IMMEDIATE takes SQLite's write lock up front, so an availability
+        check and the insert that follows cannot interleave with another
+        process's booking.
+        """
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute("BEGIN IMMEDIATE")
+            self.refresh_if_stale()
+            yield
+        self._notify(change)
+
+    def _bookable_from(self) -> str:
+        """First date a booking can still land on: today, or an earlier day the schedule still offers"""
+        with self.store.lock:
+            first_open = self.store.conn.execute("SELECT MIN(date) FROM schedule_slots WHERE is_available = 1").fetchone()[0]
+        today = datetime.now().strftime('%Y-%m-%d')
+        return min(today, first_open) if first_open else today
+
+    @property
+    def appointment_intervals(self) -> DoctorIntervalIndex:
+        # Built on first conflict check from confirmed rows a booking could still collide with, then kept current by book_appointment
+        if self._appointment_intervals is None:
+            confirmed = self.store.read_table(
+                "SELECT appointment_id, doctor_name, appointment_date, appointment_time, duration_minutes, status "
+                "FROM appointments WHERE status = 'confirmed' AND appointment_date >= ?",
+                (self._bookable_from(),)
+            )
+            self._appointment_intervals = DoctorIntervalIndex.build(apply_schema(confirmed, 'appointments'), Config.RETURNING_PATIENT_SLOT_DURATION)
+        return self._appointment_intervals
+
+    @property
+    def availability(self) -> AvailabilityBitmap:
+        # Days before the first bookable one can no longer change, so they are never read
+        if self._availability is None:
+            bookable_from = self._bookable_from()
+            schedule_df = self.store.read_table(
+                f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM schedule_slots WHERE date >= ? ORDER BY doctor_name, time_slot",
+                (bookable_from,)
+            )
+            appointments_df = self.store.read_table(
+                f"SELECT {', '.join(APPOINTMENT_COLUMNS)} FROM appointments WHERE appointment_date >= ?",
+                (bookable_from,)
+            )
+            self._availability = self._build_availability(apply_schema(schedule_df, 'schedule'), apply_schema(appointments_df, 'appointments'))
+        return self._availability
+
+    # SQL has no date or boolean types, so dates come back as text, flags as 0/1 integers and NULLs
+    # as None; apply_schema converts all of them as it does values read from the data files
+
+    @property
+    def patients_df(self) -> pd.DataFrame:
+        return apply_schema(self.store.read_table(f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients ORDER BY patient_id"), 'patients')
+
+    @property
+    def doctors_df(self) -> pd.DataFrame:
+        return apply_schema(self.store.read_table("SELECT name, specialty, location FROM doctors ORDER BY rowid"), 'doctors')
+
+    @property
+    def schedule_df(self) -> pd.DataFrame:
+        return apply_schema(self.store.read_table(f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM schedule_slots ORDER BY doctor_name, time_slot"), 'schedule')
+
+    @property
+    def appointments_df(self) -> pd.DataFrame:
+        return apply_schema(self.store.read_table(f"SELECT {', '.join(APPOINTMENT_COLUMNS)} FROM appointments ORDER BY rowid"), 'appointments')
+
+    def _id_floor(self, prefix: str) -> int:
+        if prefix == 'WL':
+            return super()._id_floor(prefix)
+        table, column = ('patients', 'patient_id') if prefix == 'P' else ('appointments', 'appointment_id')
+        with self.store.lock:
+            row = self.store.conn.execute(
+                f"SELECT MAX(CAST(SUBSTR({column}, ?) AS INTEGER)) FROM {table} WHERE {column} LIKE ?",
+                (len(prefix) + 1, prefix + '%')
+            ).fetchone()
+        return max(1001, row[0] + 1) if row[0] is not None else 1001
+
+    def save_appointments(self):
+        # Every write is committed as it happens; nothing to flush.
+        pass
+
+    def _patient_from_row(self, row: sqlite3.Row) -> Dict:
+        patient = dict(row)
+        patient['is_new_patient'] = patient.get('last_visit') is None
+        return patient
+
+    def find_patient(self, first_name: str, last_name: str, dob: str = None) -> Optional[Dict]:
+        query = (
+            f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients "
+            "WHERE last_name = ? COLLATE NOCASE AND first_name = ? COLLATE NOCASE"
+        )
+        params = [last_name.strip(), first_name.strip()]
+        if dob:
+            query += " AND date_of_birth = ?"
+            params.append(dob)
+        query += " LIMIT 1"
+
+        with self.store.lock:
+            row = self.store.conn.execute(query, params).fetchone()
+
+        return self._patient_from_row(row) if row else None
+
+    def get_patient(self, patient_id: str) -> Optional[Dict]:
+        with self.store.lock:
+            row = self.store.conn.execute(
+                f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients WHERE patient_id = ?",
+                (patient_id,)
+            ).fetchone()
+        return self._patient_from_row(row) if row else None
+
+    def create_new_patient(self, patient_data: Dict) -> str:
+        with self._write_transaction('patient'):
+            patient_id = self.id_sequence.next_id('P')
+            self.store.conn.execute(
+                f"INSERT INTO patients ({', '.join(PATIENT_COLUMNS)}) VALUES ({', '.join('?' * len(PATIENT_COLUMNS))})",
+                (
+                    patient_id,
+                    patient_data['first_name'],
+                    patient_data['last_name'],
+                    patient_data['date_of_birth'],
+                    patient_data.get('phone', ''),
+                    patient_data.get('email', ''),
+                    patient_data.get('preferred_doctor', ''),
+                    patient_data.get('insurance_carrier', ''),
+                    patient_data.get('insurance_member_id', ''),
+                    patient_data.get('insurance_group_number', ''),
+                    None,
+                    1
+                )
+            )
+
+        if self._patient_matcher is not None:
+            self._patient_matcher.add(patient_id, patient_data['first_name'], patient_data['last_name'], patient_data['date_of_birth'])
+
+        return patient_id
+
+    def import_patients(self, patients: List[Dict]) -> List[str]:
+        if not patients:
+            return []
+
+        with self._write_transaction('patient'):
+            patient_ids = self.id_sequence.next_ids('P', len(patients))
+            self.store.conn.executemany(
+                f"INSERT INTO patients ({', '.join(PATIENT_COLUMNS)}) VALUES ({', '.join('?' * len(PATIENT_COLUMNS))})",
+                [
+                    (patient_id,) + tuple(patient.get(column, '') for column in PATIENT_COLUMNS[1:-2]) + (None, 1)
+                    for patient, patient_id in zip(patients, patient_ids)
+                ]
+            )
+
+        if self._patient_matcher is not None:
+            for patient, patient_id in zip(patients, patient_ids):
+                self._patient_matcher.add(patient_id, patient['first_name'], patient['last_name'], patient['date_of_birth'])
+        return patient_ids
+
+    def get_available_slots(self, doctor_name: str, date: str = None) -> List[Dict]:
+        query = "SELECT time_slot, date, doctor_name FROM schedule_slots WHERE doctor_name = ? AND is_available = 1"
+        params = [doctor_name]
+        if date:
+            query += " AND date = ?"
+            params.append(date)
+        query += " ORDER BY time_slot"
+
+        with self.store.lock:
+            return [dict(row) for row in self.store.conn.execute(query, params)]
+
+    def _insert_appointment(self, appointment_data: Dict, appointment_id: str):
+        self.store.conn.execute(
+            f"INSERT INTO appointments ({', '.join(APPOINTMENT_COLUMNS)}) VALUES ({', '.join('?' * len(APPOINTMENT_COLUMNS))})",
+            (
+                appointment_id,
+                appointment_data['patient_id'],
+                appointment_data['doctor_name'],
+                appointment_data['appointment_date'],
+                appointment_data['appointment_time'],
+                appointment_data['duration_minutes'],
+                appointment_data['appointment_type'],
+                'confirmed',
+                datetime.now().isoformat(),
+                appointment_data.get('insurance_carrier', ''),
+                appointment_data.get('insurance_member_id', ''),
+                appointment_data.get('insurance_group_number', ''),
+                appointment_data.get('phone', ''),
+                appointment_data.get('email', '')
+            )
+        )
+        self.store.conn.execute(
+            "UPDATE schedule_slots SET is_available = 0, patient_id = ?, appointment_type = ?, duration_minutes = ? "
+            "WHERE doctor_name = ? AND time_slot = ?",
+            (
+                appointment_data['patient_id'],
+                appointment_data['appointment_type'],
+                appointment_data['duration_minutes'],
+                appointment_data['doctor_name'],
+                f"{appointment_data['appointment_date']} {appointment_data['appointment_time']}"
+            )
+        )
+    
+    def _claim_booked(self, appointment_data: Dict, appointment_id: str):
+        start = datetime.strptime(f"{appointment_data['appointment_date']} {appointment_data['appointment_time']}", '%Y-%m-%d %H:%M')
+        if self._appointment_intervals is not None:
+            self._appointment_intervals.add(
+                appointment_data['doctor_name'],
+                start,
+                appointment_data['duration_minutes'],
+                appointment_id
+            )
+        if self._availability is not None:
+            self._availability.claim(appointment_data['doctor_name'], start, appointment_data['duration_minutes'])
+        self.availability_cache.invalidate(appointment_data['doctor_name'], appointment_data['appointment_date'])
+
+    def book_appointment(self, appointment_data: Dict, session_id: str = None) -> str:
+        with self._write_transaction('booking'):
+            self._check_bookable(appointment_data, session_id)
+            appointment_id = self.id_sequence.next_id('APT')
+            self._insert_appointment(appointment_data, appointment_id)
+            self._claim_booked(appointment_data, appointment_id)
+            return appointment_id
+
+    def book_appointments(self, appointments: List[Dict], session_id: str = None) -> List[Optional[str]]:
+        with self._write_transaction('booking'):
+            appointment_ids = []
+            for appointment_data in appointments:
+                try:
+                    self._check_bookable(appointment_data, session_id)
+                except BookingConflictError:
+                    appointment_ids.append(None)
+                    continue
+
+                appointment_id = self.id_sequence.next_id('APT')
+                self._insert_appointment(appointment_data, appointment_id)
+                self._claim_booked(appointment_data, appointment_id)
+                appointment_ids.append(appointment_id)
+
+            return appointment_ids
+
+    def get_appointment(self, appointment_id: str) -> Optional[Dict]:
+        with self.store.lock:
+            row = self.store.conn.execute(
+                f"SELECT {', '.join(APPOINTMENT_COLUMNS)} FROM appointments WHERE appointment_id = ?",
+                (appointment_id,)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def _update_cancelled(self, appointment: Dict, status: str):
+        self.store.conn.execute("UPDATE appointments SET status = ? WHERE appointment_id = ?", (status, appointment['appointment_id']))
+        self.store.conn.execute(
+            "UPDATE schedule_slots SET is_available = 1, patient_id = NULL, appointment_type = NULL, duration_minutes = NULL "
+            "WHERE doctor_name = ? AND time_slot = ? AND patient_id = ?",
+            (
+                appointment['doctor_name'],
+                f"{appointment['appointment_date']} {appointment['appointment_time']}",
+                appointment['patient_id']
+            )
+        )
+
+    def _release_booked(self, appointment: Dict):
+        start = datetime.strptime(f"{appointment['appointment_date']} {appointment['appointment_time']}", '%Y-%m-%d %H:%M')
+        duration = appointment['duration_minutes'] or Config.RETURNING_PATIENT_SLOT_DURATION
+        if self._appointment_intervals is not None:
+            self._appointment_intervals.remove(appointment['doctor_name'], start, appointment['appointment_id'])
+        if self._availability is not None:
+            self._availability.release(appointment['doctor_name'], start, duration)
+        self.availability_cache.invalidate(appointment['doctor_name'], appointment['appointment_date'])
+
+    def cancel_appointment(self, appointment_id: str, status: str = 'cancelled') -> Dict:
+        with self._write_transaction('cancellation'):
+            appointment = self._confirmed_appointment(appointment_id)
+            self._update_cancelled(appointment, status)
+            self._release_booked(appointment)
+            return appointment
+
+    def reschedule_appointment(self, appointment_id: str, appointment_data: Dict, session_id: str = None) -> str:
+        with self._write_transaction('reschedule'):
+            appointment = self._confirmed_appointment(appointment_id)
+            # Built before the release so the bitmap does not come back from rows that still hold the old time
+            self.availability
+            new_appointment = {**appointment, **appointment_data}
+            self._release_booked(appointment)
+            try:
+                self._check_bookable(new_appointment, session_id)
+            except BookingConflictError:
+                self._claim_booked(appointment, appointment_id)
+                raise
+
+            new_appointment_id = self.id_sequence.next_id('APT')
+            self._update_cancelled(appointment, 'rescheduled')
+            self._insert_appointment(new_appointment, new_appointment_id)
+            self._claim_booked(new_appointment, new_appointment_id)
+            return new_appointment_id
+
+    def get_doctors(self) -> List[Dict]:
+        with self.store.lock:
+            return [dict(row) for row in self.store.conn.execute("SELECT name, specialty, location FROM doctors ORDER BY rowid")]
+
+    def find_appointments(self, patient_id: str = None, doctor_name: str = None, start_date: str = None, end_date: str = None, status: str = None) -> pd.DataFrame:
+        filters = [
+            ('patient_id = ?', patient_id),
+            ('doctor_name = ?', doctor_name),
+            ('appointment_date >= ?', start_date),
+            ('appointment_date <= ?', end_date),
+            ('status = ?', status)
+        ]
+        given = [(clause, value) for clause, value in filters if value is not None]
+        where = f"WHERE {' AND '.join(clause for clause, _ in given)} " if given else ""
+        appointments_df = self.store.read_table(
+            f"SELECT {', '.join(APPOINTMENT_COLUMNS)} FROM appointments {where}ORDER BY rowid",
+            tuple(value for _, value in given)
+        )
+        return apply_schema(appointments_df, 'appointments')
+
+    def get_patient_appointments(self, patient_id: str) -> List[Dict]:
+        with self.store.lock:
+            rows = self.store.conn.execute(
+                f"SELECT {', '.join(APPOINTMENT_COLUMNS)} FROM appointments WHERE patient_id = ? ORDER BY rowid",
+                (patient_id,)
+            )
+            return [dict(row) for row in rows]
+
+    def update_patient_visit(self, patient_id: str):
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute(
+                "UPDATE patients SET last_visit = ?, is_new_patient = 0 WHERE patient_id = ?",
+                (datetime.now().strftime('%Y-%m-%d'), patient_id)
+            )
+        self._notify('patient_visit')
+
+    def merge_patients(self, survivor_id: str, duplicate_id: str) -> Dict:
+        if survivor_id == duplicate_id:
+            return {'success': False, 'message': "A patient cannot be merged into itself"}
+
+        with self._write_transaction('patient_merge'):
+            survivor = self.get_patient(survivor_id)
+            duplicate = self.get_patient(duplicate_id)
+            if survivor is None or duplicate is None:
+                return {'success': False, 'message': f"Patient {survivor_id if survivor is None else duplicate_id} not found"}
+
+            updates = self._merged_fields(survivor, duplicate)
+            conn = self.store.conn
+            appointments_moved = conn.execute("UPDATE appointments SET patient_id = ? WHERE patient_id = ?", (survivor_id, duplicate_id)).rowcount
+            conn.execute("UPDATE schedule_slots SET patient_id = ? WHERE patient_id = ?", (survivor_id, duplicate_id))
+            reminders_moved = conn.execute("UPDATE reminder_log SET patient_id = ? WHERE patient_id = ?", (survivor_id, duplicate_id)).rowcount
+            for column, value in updates.items():
+                conn.execute(f"UPDATE patients SET {column} = ? WHERE patient_id = ?", (int(value) if isinstance(value, bool) else value, survivor_id))
+            conn.execute("DELETE FROM patients WHERE patient_id = ?", (duplicate_id,))
+        waitlist_moved = self.waitlist.reassign_patient(duplicate_id, survivor_id)
+
+        if self._patient_matcher is not None:
+            self._patient_matcher.remove(duplicate_id)
+        return {
+            'success': True,
+            'message': f"Merged {duplicate_id} into {survivor_id}",
+            'appointments_moved': appointments_moved,
+            'reminders_moved': reminders_moved,
+            'waitlist_moved': waitlist_moved,
+            'fields_filled': sorted(updates)
+        }
+
+    def load_reminder_log(self) -> pd.DataFrame:
+        df = self.store.read_table(f"SELECT {', '.join(REMINDER_LOG_COLUMNS)} FROM reminder_log ORDER BY id")
+        for column in ('email_success', 'sms_success', 'response_received'):
+            df[column] = df[column].fillna(0).astype(bool)
+        return df
+
+    def append_reminder_log(self, log_entry: Dict):
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute(
+                f"INSERT INTO reminder_log ({', '.join(REMINDER_LOG_COLUMNS)}) VALUES ({', '.join('?' * len(REMINDER_LOG_COLUMNS))})",
+                tuple(_none_if_missing(log_entry.get(column)) for column in REMINDER_LOG_COLUMNS)
+            )
+
+    def mark_reminder_response(self, appointment_id: str, reminder_type: str, response: str):
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute(
+                "UPDATE reminder_log SET response_received = 1, response_text = ? "
+                "WHERE appointment_id = ? AND reminder_type = ?",
+                (response, appointment_id, reminder_type)
+            )
+
+
+if __name__ == "__main__":
+    import sys
+    from config import Config
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    store = SQLiteStore(Config.DATABASE_URL)
+    counts = store.migrate_from_files(data_dir)
+    print(f"Migrated {data_dir} into {store.path}: " + ", ".join(f"{count} {table}" for table, count in counts.items()))
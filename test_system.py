@@ -2,7 +2,17 @@
 
 import sys
 import os
-from datetime import datetime
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+import pandas as pd
+
+def _copy_data_dir():
+    """Copy data/ into a temporary directory so tests never modify the real files"""
+    temp_dir = tempfile.mkdtemp(prefix="clinic_test_")
+    data_dir = os.path.join(temp_dir, "data")
+    shutil.copytree("data", data_dir, ignore=shutil.ignore_patterns(".cache", "booking_journal.jsonl", ".id_sequences.json*"))
+    return data_dir
 
 def test_imports():
     """Test that all modules can be imported successfully"""
@@ -169,6 +179,1172 @@ def test_scheduling():
         print(f"✗ Scheduling test failed: {e}")
         return False
 
+def test_vectorized_slot_filter():
+    """Test the vectorized suitability mask against the per-slot rules"""
+    print("\nTesting vectorized slot filter...")
+    
+    try:
+        import time
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        
+        db = PatientDatabase()
+        
+        def suitable(slot_datetime, now):
+            return (slot_datetime > now and slot_datetime.weekday() < 5 and
+                    9 <= slot_datetime.hour < 17 and slot_datetime.hour != 12)
+        
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        for now in (first_day - timedelta(days=1), first_day + timedelta(days=3, hours=10)):
+            scheduler = SmartScheduler(db, clock=lambda now=now: now)
+            for doctor in db.get_doctors():
+                expected = [slot['time_slot'] for slot in db.get_available_slots(doctor['name'])
+                            if suitable(datetime.strptime(slot['time_slot'], '%Y-%m-%d %H:%M'), now)]
+                slots = scheduler.get_available_slots(doctor['name'], duration=45)
+                if [slot['time_slot'] for slot in slots] != expected:
+                    print(f"✗ Vectorized filter disagrees with the per-slot rules for {doctor['name']} at {now}")
+                    return False
+                if slots and set(slots[0]) != {'time_slot', 'date', 'doctor_name', 'duration'}:
+                    print(f"✗ Unexpected slot record: {slots[0]}")
+                    return False
+        print("✓ Vectorized filter matches the per-slot rules for a fixed clock")
+        
+        start = time.perf_counter()
+        for _ in range(100):
+            scheduler.get_available_slots(db.get_doctors()[0]['name'])
+        print(f"✓ 100 slot queries in {(time.perf_counter() - start) * 1000:.1f} ms")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Vectorized slot filter test failed: {e}")
+        return False
+
+def test_single_pass_suggestions():
+    """Test that one-pass suggestions match the per-doctor, per-day loop"""
+    print("\nTesting single-pass suggestions...")
+    
+    try:
+        import time
+        import pandas as pd
+        from database import PatientDatabase
+        from scheduling import SmartScheduler, SUGGESTION_DAYS_AHEAD
+        
+        db = PatientDatabase(_copy_data_dir())
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        
+        for now in (first_day - timedelta(days=1), first_day + timedelta(days=2, hours=11)):
+            scheduler = SmartScheduler(db, clock=lambda now=now: now)
+            expected = []
+            for doctor in db.get_doctors():
+                for days_ahead in SUGGESTION_DAYS_AHEAD:
+                    target_date = (now + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+                    slots = scheduler.get_available_slots(doctor['name'], target_date, 30)
+                    if slots:
+                        expected.append((doctor['name'], target_date, [slot['time_slot'] for slot in slots[:3]]))
+                        break
+            
+            suggestions = scheduler.suggest_appointment_times({'is_new_patient': False})['suggestions']
+            if [(s['doctor_name'], s['date'], s['available_times']) for s in suggestions] != expected:
+                print(f"✗ Single-pass suggestions differ from the per-day loop at {now}")
+                return False
+        print("✓ Single-pass suggestions match the per-doctor, per-day loop")
+        
+        # Scale check: 40 doctors with hourly slots over a 90-day horizon
+        extra_doctors = [f"Dr. Load {i}" for i in range(40)]
+        for name in extra_doctors:
+            for day in range(90):
+                for hour in range(9, 17):
+                    db.availability.add_slot(name, first_day + timedelta(days=day, hours=hour))
+        db.doctors_df = pd.concat([db.doctors_df, pd.DataFrame({'name': extra_doctors})], ignore_index=True)
+        
+        scheduler = SmartScheduler(db, clock=lambda: first_day)
+        start = time.perf_counter()
+        suggestions = scheduler.suggest_appointment_times({'is_new_patient': True}, days_ahead=list(range(1, 91)))['suggestions']
+        elapsed = time.perf_counter() - start
+        if len(suggestions) < len(extra_doctors):
+            print(f"✗ Expected a suggestion for every doctor, got {len(suggestions)}")
+            return False
+        print(f"✓ {len(suggestions)} doctors over a 90-day horizon suggested in {elapsed * 1000:.1f} ms")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Single-pass suggestions test failed: {e}")
+        return False
+
+def test_next_available_slot():
+    """Test the indexed next-available and earliest-across-doctors queries"""
+    print("\nTesting next available slot...")
+    
+    try:
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        
+        db = PatientDatabase(_copy_data_dir())
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        now = first_day + timedelta(days=1, hours=10)
+        scheduler = SmartScheduler(db, clock=lambda: now)
+        tomorrow = (now + timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        earliest = []
+        for doctor in db.get_doctors():
+            later = [slot for slot in scheduler.get_available_slots(doctor['name']) if slot['date'] >= tomorrow]
+            expected = later[0] if later else None
+            if scheduler.get_next_available_slot(doctor['name']) != expected:
+                print(f"✗ Next slot for {doctor['name']} disagrees with a full scan")
+                return False
+            if expected:
+                earliest.append(expected)
+        
+        expected = min(earliest, key=lambda slot: slot['time_slot'])
+        found = scheduler.get_earliest_available_slot()
+        if found is None or found['time_slot'] != expected['time_slot']:
+            print(f"✗ Earliest slot across doctors was {found}, expected {expected}")
+            return False
+        print(f"✓ Next slot per doctor and earliest overall ({found['doctor_name']} {found['time_slot']}) match a full scan")
+        
+        # A doctor with nothing free for two months is still found, with no 30-day horizon
+        far_slot = (now + timedelta(days=60)).replace(hour=10, minute=0)
+        while far_slot.weekday() >= 5:
+            far_slot += timedelta(days=1)
+        db.availability.add_slot("Dr. Far Future", far_slot)
+        found = scheduler.get_next_available_slot("Dr. Far Future")
+        if found is None or found['time_slot'] != far_slot.strftime('%Y-%m-%d %H:%M'):
+            print(f"✗ Slot 60 days out not found: {found}")
+            return False
+        
+        db.book_appointment({
+            'patient_id': 'P1000',
+            'doctor_name': "Dr. Far Future",
+            'appointment_date': far_slot.strftime('%Y-%m-%d'),
+            'appointment_time': far_slot.strftime('%H:%M'),
+            'duration_minutes': 60,
+            'appointment_type': 'new_patient'
+        })
+        if scheduler.get_next_available_slot("Dr. Far Future") is not None:
+            print("✗ Booked slot is still returned as next available")
+            return False
+        print("✓ Slots beyond 30 days are found and booking removes them")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Next available slot test failed: {e}")
+        return False
+
+def test_availability_cache():
+    """Test the shared availability cache and its booking-driven invalidation"""
+    print("\nTesting availability cache...")
+    
+    try:
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        
+        db = PatientDatabase(_copy_data_dir())
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        now = first_day - timedelta(days=1)
+        scheduler = SmartScheduler(db, clock=lambda: now)
+        cache = db.availability_cache
+        
+        first = scheduler.suggest_appointment_times({'is_new_patient': True})
+        misses = cache.stats()['misses']
+        second = SmartScheduler(db, clock=lambda: now).suggest_appointment_times({'is_new_patient': True})
+        stats = cache.stats()
+        if first != second or stats['misses'] != misses or stats['hits'] == 0:
+            print(f"✗ Repeated suggestions were not served from the cache: {stats}")
+            return False
+        print(f"✓ Second session's suggestions served from cache ({stats['hits']} hits)")
+        
+        booked, other = first['suggestions'][0], first['suggestions'][1]
+        booked_time = booked['available_times'][0]
+        db.book_appointment({
+            'patient_id': 'P1000',
+            'doctor_name': booked['doctor_name'],
+            'appointment_date': booked['date'],
+            'appointment_time': booked_time.split()[1],
+            'duration_minutes': 60,
+            'appointment_type': 'new_patient'
+        })
+        if cache.get(booked['doctor_name'], booked['date'], 60, now) is not None:
+            print("✗ Booking did not invalidate the affected doctor-day")
+            return False
+        if cache.get(other['doctor_name'], other['date'], 60, now) is None:
+            print("✗ Booking invalidated an unrelated doctor-day")
+            return False
+        
+        refreshed = scheduler.suggest_appointment_times({'is_new_patient': True}, doctor_name=booked['doctor_name'])
+        if booked_time in refreshed['suggestions'][0]['available_times']:
+            print("✗ Booked time is still suggested")
+            return False
+        print(f"✓ Booking invalidates only its own doctor-day: {cache.stats()}")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Availability cache test failed: {e}")
+        return False
+
+def test_slot_engine():
+    """Test the working-day slot engine with variable-length visits"""
+    print("\nTesting slot engine...")
+    
+    try:
+        from config import Config
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        
+        data_dir = _copy_data_dir()
+        fixed_db = PatientDatabase(data_dir)
+        Config.SLOT_ENGINE = 'flexible'
+        try:
+            db = PatientDatabase(data_dir)
+        finally:
+            Config.SLOT_ENGINE = 'fixed'
+        
+        doctor_name = db.get_doctors()[0]['name']
+        date = fixed_db.get_available_slots(doctor_name)[0]['date']
+        scheduler = SmartScheduler(db, clock=lambda: datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1))
+        
+        fixed_capacity = len(fixed_db.get_available_slots(doctor_name, date))
+        if db.availability.capacity(doctor_name, date, 30) != 14:
+            print(f"✗ Expected 14 half-hour visits in a 9-17 day with lunch, got {db.availability.capacity(doctor_name, date, 30)}")
+            return False
+        print(f"✓ A working day fits 14 half-hour visits instead of {fixed_capacity} fixed slots")
+        
+        def book(time_slot, duration):
+            db.book_appointment({
+                'patient_id': 'P1000',
+                'doctor_name': doctor_name,
+                'appointment_date': date,
+                'appointment_time': time_slot,
+                'duration_minutes': duration,
+                'appointment_type': 'new_patient' if duration == 60 else 'returning_patient'
+            })
+        
+        book('09:00', 60)
+        book('10:15', 30)
+        if db.free_intervals(doctor_name, date) != [('10:00', '10:15'), ('10:45', '12:00'), ('13:00', '17:00')]:
+            print(f"✗ Bookings did not split the free intervals: {db.free_intervals(doctor_name, date)}")
+            return False
+        
+        hour_starts = [slot['time_slot'][11:] for slot in scheduler.get_available_slots(doctor_name, date, 60)]
+        half_hour_starts = [slot['time_slot'][11:] for slot in scheduler.get_available_slots(doctor_name, date, 30)]
+        if hour_starts[:3] != ['10:45', '11:00', '13:00'] or '09:30' in half_hour_starts or '10:00' in half_hour_starts:
+            print(f"✗ Unexpected windows: 60 min {hour_starts[:3]}, 30 min {half_hour_starts[:3]}")
+            return False
+        print(f"✓ Bookings split intervals; next hour-long window starts {hour_starts[0]}, half-hour {half_hour_starts[0]}")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Slot engine test failed: {e}")
+        return False
+
+def test_schedule_templates():
+    """Test recurring schedule templates with on-demand day materialization"""
+    print("\nTesting schedule templates...")
+    
+    try:
+        import json
+        from config import Config
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        
+        data_dir = _copy_data_dir()
+        fixed_db = PatientDatabase(data_dir)
+        
+        templates_file = os.path.join(data_dir, "schedule_templates.json")
+        with open(templates_file) as f:
+            templates = json.load(f)
+        blackout_doctor = fixed_db.get_doctors()[1]['name']
+        templates['doctors'][blackout_doctor]['blackout_dates'] = ["2026-03-02"]
+        with open(templates_file, "w") as f:
+            json.dump(templates, f)
+        
+        Config.SLOT_ENGINE = 'template'
+        try:
+            db = PatientDatabase(data_dir)
+        finally:
+            Config.SLOT_ENGINE = 'fixed'
+        
+        booked_days = db.appointments_df[db.appointments_df['status'] == 'confirmed'][['doctor_name', 'appointment_date']].drop_duplicates()
+        if db.availability.doctor_days() > len(booked_days):
+            print(f"✗ {db.availability.doctor_days()} days materialized at load, expected only booked days")
+            return False
+        print(f"✓ Only {db.availability.doctor_days()} booked doctor-days materialized at load")
+        
+        for doctor in db.get_doctors():
+            for date in sorted(set(fixed_db.schedule_df['date'].dt.strftime('%Y-%m-%d'))):
+                if db.get_available_slots(doctor['name'], date) != fixed_db.get_available_slots(doctor['name'], date):
+                    print(f"✗ Template slots differ from the spreadsheet for {doctor['name']} on {date}")
+                    return False
+        print("✓ Template slots match the spreadsheet over its whole range")
+        
+        if db.get_available_slots(blackout_doctor, "2026-03-02") or db.get_available_slots(blackout_doctor, "2025-12-25"):
+            print("✗ Blackout date or holiday still offers slots")
+            return False
+        
+        scheduler = SmartScheduler(db, clock=lambda: datetime(2026, 8, 1, 8, 0))
+        found = scheduler.get_next_available_slot(blackout_doctor)
+        if found is None or found['time_slot'] != '2026-08-03 09:00':
+            print(f"✗ Expected the first slot eleven months out to be 2026-08-03 09:00, got {found}")
+            return False
+        print(f"✓ Holidays and blackouts honored; slots materialize on demand months ahead ({found['time_slot']})")
+        
+        schedule_file = os.path.join(data_dir, "doctor_schedules.xlsx")
+        sheet_mtime = os.stat(schedule_file).st_mtime_ns
+        if not db.schedule_df.empty or db.load_timings['schedule_source'] != 'templates':
+            print("✗ Template mode still loaded the expanded schedule sheet")
+            return False
+        # Dates from the real clock, since a booking has to land on a day still to come
+        exception_day = SmartScheduler(db).get_next_available_slot(blackout_doctor, duration=60)['time_slot'][:10]
+        result = db.set_schedule_exception(blackout_doctor, exception_day, ["10:30-17:00"])
+        following = db.iter_free_slots(blackout_doctor, datetime.strptime(exception_day, '%Y-%m-%d') + timedelta(days=1), 60)
+        booked_start = next(following)
+        db.book_appointment({
+            'patient_id': 'P1001', 'doctor_name': blackout_doctor, 'appointment_date': booked_start.strftime('%Y-%m-%d'),
+            'appointment_time': booked_start.strftime('%H:%M'), 'duration_minutes': 60, 'appointment_type': 'new_patient'
+        })
+        Config.SLOT_ENGINE = 'template'
+        try:
+            reopened = PatientDatabase(data_dir)
+        finally:
+            Config.SLOT_ENGINE = 'fixed'
+        reopened_slots = [slot['time_slot'][11:] for slot in reopened.get_available_slots(blackout_doctor, exception_day)]
+        if not result['success'] or not reopened_slots or min(reopened_slots) < '10:30':
+            print(f"✗ Override hours were not kept across a reopen: {reopened_slots}")
+            return False
+        if os.stat(schedule_file).st_mtime_ns != sheet_mtime:
+            print("✗ Template mode rewrote the expanded schedule sheet")
+            return False
+        print("✓ Template mode saves exceptions to the templates and leaves the schedule sheet alone")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Schedule templates test failed: {e}")
+        return False
+
+def test_slot_holds():
+    """Test slot holds, their timer-wheel expiry and atomic booking"""
+    print("\nTesting slot holds...")
+    
+    try:
+        import threading
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        from slot_holds import SlotHoldManager
+        
+        db = PatientDatabase(_copy_data_dir())
+        fake_time = [1000.0]
+        db.slot_holds = SlotHoldManager(ttl_seconds=300, clock=lambda: fake_time[0])
+        
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        scheduler = SmartScheduler(db, clock=lambda: first_day - timedelta(days=1))
+        
+        offer = scheduler.suggest_appointment_times({'is_new_patient': True}, session_id='A')['suggestions'][0]
+        doctor_name, time_slot = offer['doctor_name'], offer['available_times'][0]
+        if not scheduler.hold_slot(doctor_name, time_slot, 'A', 60) or scheduler.hold_slot(doctor_name, time_slot, 'B', 60):
+            print("✗ A held slot could be taken over by another session")
+            return False
+        
+        other = scheduler.suggest_appointment_times({'is_new_patient': True}, doctor_name=doctor_name, session_id='B')['suggestions'][0]
+        if time_slot in other['available_times']:
+            print("✗ Slot held by session A was offered to session B")
+            return False
+        
+        details = {'doctor_name': doctor_name, 'appointment_date': time_slot[:10], 'appointment_time': time_slot[11:], 'duration': 60}
+        result = scheduler.book_appointment({'patient_id': 'P1000'}, details, session_id='B')
+        if result['success'] or not result.get('conflict'):
+            print("✗ Session B booked a slot held by session A")
+            return False
+        if not scheduler.book_appointment({'patient_id': 'P1001'}, details, session_id='A')['success'] or len(db.slot_holds):
+            print("✗ Session A could not convert its hold into a booking")
+            return False
+        if scheduler.book_appointment({'patient_id': 'P1002'}, details, session_id='A')['success']:
+            print("✗ An already booked slot was booked twice")
+            return False
+        print("✓ Held slots are hidden from other sessions and bookings convert holds")
+        
+        scheduler.hold_slot(doctor_name, other['available_times'][0], 'B')
+        fake_time[0] += 299
+        if not db.slot_holds.is_held_by_other(doctor_name, other['available_times'][0], 'A'):
+            print("✗ Hold expired before its TTL")
+            return False
+        fake_time[0] += 2
+        if len(db.slot_holds) or db.slot_holds.by_session:
+            print("✗ Hold outlived its TTL")
+            return False
+        print("✓ Holds expire through the timer wheel after their TTL")
+        
+        # A hold covers the whole visit, so later starts inside it are neither offered nor bookable
+        other_doctor = next(doctor['name'] for doctor in db.get_doctors() if doctor['name'] != doctor_name)
+        long_slot = scheduler.suggest_appointment_times({'is_new_patient': True}, doctor_name=other_doctor, session_id='A')['suggestions'][0]['available_times'][0]
+        inside = (datetime.strptime(long_slot, '%Y-%m-%d %H:%M') + timedelta(minutes=30)).strftime('%Y-%m-%d %H:%M')
+        scheduler.hold_slot(other_doctor, long_slot, 'A', 60)
+        short_offers = scheduler.suggest_appointment_times({'is_new_patient': False}, doctor_name=other_doctor, session_id='B')['suggestions'][0]['available_times']
+        if inside in short_offers or not db.slot_holds.is_held_by_other(other_doctor, inside, 'B', 30):
+            print("✗ A time inside another session's held visit was offered")
+            return False
+        short_details = {'doctor_name': other_doctor, 'appointment_date': inside[:10], 'appointment_time': inside[11:], 'duration': 30}
+        if scheduler.book_appointment({'patient_id': 'P1003'}, short_details, session_id='B')['success']:
+            print("✗ Session B booked a time inside session A's held visit")
+            return False
+        if not scheduler.book_appointment({'patient_id': 'P1004'}, dict(short_details, appointment_time=long_slot[11:], duration=60), session_id='A')['success']:
+            print("✗ Session A lost its held visit to an overlapping booking")
+            return False
+        print("✓ Holds cover the held visit's whole duration")
+        
+        # Many sessions racing for the same slot: exactly one booking wins
+        contested = other['available_times'][0]
+        details = {'doctor_name': doctor_name, 'appointment_date': contested[:10], 'appointment_time': contested[11:], 'duration': 60}
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(scheduler.book_appointment({'patient_id': f'P{1100 + i}'}, details, session_id=f'S{i}'))) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if sum(result['success'] for result in results) != 1:
+            print(f"✗ {sum(result['success'] for result in results)} of 20 concurrent bookings succeeded")
+            return False
+        print("✓ One of 20 concurrent bookings for the same slot succeeds")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Slot holds test failed: {e}")
+        return False
+
+def test_batch_scheduler():
+    """Test bulk assignment of appointment requests to free slots"""
+    print("\nTesting batch scheduler...")
+    
+    try:
+        import time
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        from batch_scheduler import BatchScheduler
+        
+        db = PatientDatabase(_copy_data_dir())
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        scheduler = SmartScheduler(db, clock=lambda: first_day - timedelta(days=1))
+        batch = BatchScheduler(scheduler)
+        doctor_names = [doctor['name'] for doctor in db.get_doctors()]
+        day = first_day.strftime('%Y-%m-%d')
+        
+        requests = [
+            {'patient_id': 'P1000', 'doctor_name': doctor_names[0], 'earliest_date': day, 'latest_date': day},
+            {'patient_id': 'P1001', 'doctor_name': doctor_names[0], 'earliest_date': day, 'latest_date': day, 'priority': 5},
+            {'patient_id': 'P1002', 'doctor_name': 'Dr. Nobody'},
+            {'patient_id': 'P1003', 'doctor_name': doctor_names[0], 'preferred_only': True, 'earliest_date': '2000-01-01', 'latest_date': '2000-01-02'}
+        ]
+        first_slot = scheduler.get_available_slots(doctor_names[0], day, 60)[0]['time_slot']
+        result = batch.plan(requests)
+        by_patient = {assignment['patient_id']: assignment for assignment in result['assigned']}
+        if f"{by_patient['P1001']['appointment_date']} {by_patient['P1001']['appointment_time']}" != first_slot:
+            print("✗ Higher priority request did not get the earliest slot")
+            return False
+        if [entry['patient_id'] for entry in result['unplaced']] != ['P1002', 'P1003']:
+            print(f"✗ Unexpected unplaced requests: {result['unplaced']}")
+            return False
+        if db.get_available_slots(doctor_names[0], day)[0]['time_slot'] != first_slot:
+            print("✗ Planning changed live availability")
+            return False
+        print("✓ Requests are placed by priority and unplaceable ones are reported")
+        
+        # Thousands of requests with one-week windows, booked in one write
+        requests = [
+            {
+                'patient_id': f"P{2000 + i}",
+                'is_new_patient': i % 2 == 0,
+                'doctor_name': doctor_names[i % len(doctor_names)],
+                'priority': i % 4,
+                'earliest_date': (first_day + timedelta(days=i % 21)).strftime('%Y-%m-%d'),
+                'latest_date': (first_day + timedelta(days=i % 21 + 7)).strftime('%Y-%m-%d')
+            }
+            for i in range(3000)
+        ]
+        start = time.perf_counter()
+        result = batch.schedule(requests)
+        elapsed = time.perf_counter() - start
+        if not result['success'] or len(result['assigned']) + len(result['unplaced']) != len(requests):
+            print(f"✗ Batch did not account for every request: {result['message']}")
+            return False
+        
+        booked = db.appointments_df[db.appointments_df['appointment_id'].isin([assignment['appointment_id'] for assignment in result['assigned']])]
+        for assignment in result['assigned']:
+            start_time = datetime.strptime(f"{assignment['appointment_date']} {assignment['appointment_time']}", '%Y-%m-%d %H:%M')
+            overlapping = db.appointment_intervals.overlapping(assignment['doctor_name'], start_time, assignment['duration'])
+            if len(overlapping) != 1:
+                print(f"✗ {assignment['doctor_name']} double-booked at {start_time}")
+                return False
+        if len(booked) != len(result['assigned']):
+            print("✗ Not every assignment was booked")
+            return False
+        print(f"✓ {result['message']} in {elapsed:.2f}s without double-booking")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Batch scheduler test failed: {e}")
+        return False
+
+def test_cancel_and_reschedule():
+    """Test cancelling and rescheduling appointments with waitlist backfill"""
+    print("\nTesting cancellation and rescheduling...")
+    
+    try:
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        from ai_agent import ClinicSchedulingAgent
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir, journal_mode=True)
+        first_day = pd.Timestamp(db.schedule_df['date'].min()).to_pydatetime()
+        scheduler = SmartScheduler(db, clock=lambda: first_day - timedelta(days=1))
+        
+        slots = scheduler.get_available_slots(db.get_doctors()[0]['name'], first_day.strftime('%Y-%m-%d'), 60)
+        details = {'doctor_name': slots[0]['doctor_name'], 'appointment_date': slots[0]['date'], 'appointment_time': slots[0]['time_slot'][11:], 'duration': 60}
+        appointment_id = scheduler.book_appointment({'patient_id': 'P1001'}, details)['appointment_id']
+        scheduler.join_waitlist({'patient_id': 'P1002'}, doctor_name=details['doctor_name'])
+        
+        result = scheduler.cancel_appointment(appointment_id)
+        start = datetime.strptime(slots[0]['time_slot'], '%Y-%m-%d %H:%M')
+        if not result['success'] or db.get_appointment(appointment_id)['status'] != 'cancelled':
+            print(f"✗ Appointment was not cancelled: {result['message']}")
+            return False
+        if not db.availability.is_free(details['doctor_name'], start, 60) or db.appointment_intervals.has_conflict(details['doctor_name'], start, 60):
+            print("✗ Cancelled slot was not released")
+            return False
+        offer = result['waitlist_offer']
+        if not offer or offer['patient_id'] != 'P1002' or scheduler.book_appointment({'patient_id': 'P1003'}, details)['success']:
+            print("✗ Freed slot was not offered to and held for the waitlisted patient")
+            return False
+        if not scheduler.accept_waitlist_offer(offer['waitlist_id'])['success']:
+            print("✗ Waitlisted patient could not take the offered slot")
+            return False
+        if scheduler.cancel_appointment(appointment_id)['success']:
+            print("✗ A cancelled appointment was cancelled twice")
+            return False
+        print("✓ Cancelling releases the slot and offers it to the waitlist")
+        
+        # Reschedule onto a free time, then onto a taken one
+        waitlisted_id = db.get_patient_appointments('P1002')[-1]['appointment_id']
+        new_slot = slots[1]
+        journal_records = db.journal.record_count
+        result = scheduler.reschedule_appointment(waitlisted_id, {'doctor_name': new_slot['doctor_name'], 'appointment_date': new_slot['date'], 'appointment_time': new_slot['time_slot'][11:]})
+        if not result['success'] or db.get_appointment(waitlisted_id)['status'] != 'rescheduled':
+            print(f"✗ Appointment was not rescheduled: {result['message']}")
+            return False
+        if db.journal.record_count != journal_records + 1:
+            print("✗ Rescheduling was not journaled as a single record")
+            return False
+        if not db.availability.is_free(details['doctor_name'], start, 60):
+            print("✗ Rescheduling did not release the old slot")
+            return False
+        taken = db.get_appointment(db.appointments_df.loc[db.appointments_df['appointment_id'] != result['appointment_id'], 'appointment_id'].iloc[0])
+        conflict = scheduler.reschedule_appointment(result['appointment_id'], {'doctor_name': taken['doctor_name'], 'appointment_date': taken['appointment_date'], 'appointment_time': taken['appointment_time']})
+        new_start = datetime.strptime(new_slot['time_slot'], '%Y-%m-%d %H:%M')
+        if not conflict.get('conflict') or db.availability.is_free(new_slot['doctor_name'], new_start, 60):
+            print("✗ Rescheduling onto a taken slot did not leave the appointment in place")
+            return False
+        print("✓ Rescheduling moves the appointment and keeps it on a conflict")
+        
+        # A waitlist failure after the cancellation is saved must not report the cancellation as failed
+        later = slots[2]
+        later_id = scheduler.book_appointment({'patient_id': 'P1004'}, {'doctor_name': later['doctor_name'], 'appointment_date': later['date'], 'appointment_time': later['time_slot'][11:], 'duration': 60})['appointment_id']
+        def broken_backfill(appointment):
+            raise RuntimeError("waitlist unavailable")
+        scheduler._backfill = broken_backfill
+        cancelled = scheduler.cancel_appointment(later_id)
+        del scheduler._backfill
+        if not cancelled['success'] or cancelled['waitlist_offer'] is not None or db.get_appointment(later_id)['status'] != 'cancelled':
+            print("✗ A waitlist error turned a saved cancellation into a failure")
+            return False
+        print("✓ Waitlist errors after a saved change are reported without failing it")
+        
+        # Cancellations are journaled and replayed
+        db.journal.close()
+        db.journal = None
+        db.compactor.stop()
+        reopened = PatientDatabase(data_dir, journal_mode=True)
+        if reopened.get_appointment(appointment_id)['status'] != 'cancelled' or reopened.get_appointment(waitlisted_id)['status'] != 'rescheduled' or reopened.get_appointment(result['appointment_id'])['status'] != 'confirmed':
+            print("✗ Cancellations were not replayed from the journal")
+            return False
+        reopened.close()
+        print("✓ Cancellations survive a restart through the journal")
+        
+        # The agent cancels through the chat flow
+        agent = ClinicSchedulingAgent(PatientDatabase(_copy_data_dir()))
+        agent.scheduler = SmartScheduler(agent.db, clock=lambda: first_day - timedelta(days=1))
+        booked = agent.db.appointments_df.iloc[0]
+        patient = agent.db.get_patient(booked['patient_id'])
+        agent.process_message("I need to cancel my appointment")
+        agent.process_message(f"{patient['first_name']} {patient['last_name']}")
+        if agent.conversation_state['current_step'] != 'manage_appointment':
+            print("✗ AI agent did not start the cancellation flow")
+            return False
+        appointments = agent.conversation_state.get('manage_appointments')
+        if appointments:
+            agent.process_message("1")
+        chosen = agent.conversation_state['manage_appointment_id']
+        response = agent.process_message("yes")
+        if 'cancelled' not in response or agent.db.get_appointment(chosen)['status'] != 'cancelled':
+            print(f"✗ AI agent did not cancel the appointment: {response}")
+            return False
+        print("✓ AI agent cancels appointments in conversation")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Cancellation test failed: {e}")
+        return False
+
+def test_multi_process_booking():
+    """Test that bookings from several processes never double-book or get lost"""
+    print("\nTesting multi-process booking...")
+    
+    try:
+        from booking_stress import run_stress
+        
+        for journal_mode, processes, slot_limit in ((True, 3, 30), (False, 2, 8)):
+            result = run_stress(processes, journal_mode=journal_mode, slot_limit=slot_limit)
+            mode = 'journal' if journal_mode else 'file'
+            if result['booked'] != result['slots'] or result['double_booked'] or result['lost']:
+                print(f"✗ {mode} mode: {result['booked']}/{result['slots']} booked, {result['double_booked']} double-booked, {result['lost']} lost")
+                return False
+            print(f"✓ {processes} processes in {mode} mode: every slot booked once, {result['conflicts']} clean conflicts, {result['bookings_per_second']:.1f} bookings/s")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Multi-process booking test failed: {e}")
+        return False
+
+def test_id_sequence():
+    """Test that minted IDs never reuse existing ones, across instances"""
+    print("\nTesting ID sequence...")
+    
+    try:
+        import pandas as pd
+        from database import PatientDatabase
+        from id_sequence import IdSequence
+        
+        data_dir = _copy_data_dir()
+        # Leave a gap, as a deleted patient would, so row counts no longer match the highest ID
+        patients = pd.read_csv(os.path.join(data_dir, "patients.csv"))
+        highest = patients['patient_id'].str[1:].astype(int).max()
+        patients.drop(index=0).to_csv(os.path.join(data_dir, "patients.csv"), index=False)
+        
+        first = PatientDatabase(data_dir, journal_mode=False)
+        second = PatientDatabase(data_dir, journal_mode=False)
+        patient = {'first_name': 'Ida', 'last_name': 'Sequence', 'date_of_birth': '1990-01-01'}
+        patient_ids = [db.create_new_patient(patient) for db in (first, second, first, second)]
+        numbers = [int(patient_id[1:]) for patient_id in patient_ids]
+        if len(set(patient_ids)) != 4 or min(numbers) <= highest:
+            print(f"✗ Patient IDs collide or reuse existing ones: {patient_ids}")
+            return False
+        print(f"✓ Patient IDs from two instances are distinct and above P{highest}: {', '.join(patient_ids)}")
+        
+        # A fresh allocator on the same file continues after the reserved blocks
+        sequence = IdSequence(os.path.join(data_dir, ".id_sequences.json"), lambda prefix: 1001, block_size=5)
+        next_id = sequence.next_id('P')
+        if next_id in patient_ids or int(next_id[1:]) <= max(numbers):
+            print(f"✗ Reserved blocks were handed out again: {next_id}")
+            return False
+        print(f"✓ New allocator continues past reserved blocks at {next_id}")
+        
+        return True
+    except Exception as e:
+        print(f"✗ ID sequence test failed: {e}")
+        return False
+
+def test_shared_database():
+    """Test that components sharing one database see each other's changes"""
+    print("\nTesting shared database...")
+    
+    try:
+        from database import PatientDatabase, get_shared_database
+        from reminder_system import ReminderSystem
+        import pandas as pd
+        from ai_agent import ClinicSchedulingAgent
+        
+        data_dir = _copy_data_dir()
+        db = get_shared_database(data_dir)
+        agent = ClinicSchedulingAgent(get_shared_database(data_dir))
+        reminders = ReminderSystem(get_shared_database(data_dir))
+        if agent.db is not db or reminders.db is not db or agent.reminder_system.db is not db:
+            print("✗ Components got separate database instances")
+            return False
+        print("✓ Agent, reminders and dashboard share one database instance")
+        
+        changes = []
+        unsubscribe = db.subscribe(changes.append)
+        version = db.version
+        doctor = db.get_doctors()[0]['name']
+        slot_time = pd.Timestamp(db.available_slot_starts(doctor, None, 60)[0])
+        appointment_id = agent.db.book_appointment({
+            'patient_id': 'P1001',
+            'doctor_name': doctor,
+            'appointment_date': slot_time.strftime('%Y-%m-%d'),
+            'appointment_time': slot_time.strftime('%H:%M'),
+            'duration_minutes': 60,
+            'appointment_type': 'new_patient'
+        })
+        if changes != ['booking'] or db.version != version + 1 or appointment_id not in set(reminders.db.appointments_df['appointment_id']):
+            print(f"✗ Booking was not seen by the other components: {changes}")
+            return False
+        print("✓ A chat booking is visible to reminders immediately and notifies subscribers")
+        
+        # A write from another instance, as from another worker process, arrives as a refresh
+        other = PatientDatabase(data_dir, journal_mode=False)
+        other.create_new_patient({'first_name': 'Una', 'last_name': 'Shared', 'date_of_birth': '1985-05-05'})
+        db.refresh_if_stale()
+        unsubscribe()
+        db.cancel_appointment(appointment_id)
+        if changes != ['booking', 'refresh'] or db.find_patient('Una', 'Shared') is None:
+            print(f"✗ Unexpected change notifications: {changes}")
+            return False
+        print("✓ Writes from other processes are picked up and unsubscribing stops notifications")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Shared database test failed: {e}")
+        return False
+
+def test_compact_schema():
+    """Test the compact in-memory dtypes and that files keep their text format"""
+    print("\nTesting compact schema...")
+    
+    try:
+        from database import PatientDatabase
+        from frame_schema import memory_benchmark
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir, journal_mode=False)
+        expected = {
+            'doctor_name': 'category', 'status': 'category', 'appointment_type': 'category',
+            'appointment_date': 'datetime64', 'created_at': 'datetime64'
+        }
+        for column, dtype in expected.items():
+            if not str(db.appointments_df[column].dtype).startswith(dtype):
+                print(f"✗ appointments.{column} loaded as {db.appointments_df[column].dtype}")
+                return False
+        if str(db.patients_df['is_new_patient'].dtype) != 'boolean' or str(db.schedule_df['is_available'].dtype) != 'boolean':
+            print("✗ Flags were not loaded as nullable booleans")
+            return False
+        print("✓ Tables load with categorical, datetime and nullable boolean columns")
+        
+        before = open(os.path.join(data_dir, "appointments.csv")).read()
+        slot_time = pd.Timestamp(db.available_slot_starts(db.get_doctors()[0]['name'], None, 60)[0])
+        appointment_id = db.book_appointment({
+            'patient_id': 'P1001',
+            'doctor_name': db.get_doctors()[0]['name'],
+            'appointment_date': slot_time.strftime('%Y-%m-%d'),
+            'appointment_time': slot_time.strftime('%H:%M'),
+            'duration_minutes': 60,
+            'appointment_type': 'new_patient'
+        })
+        db.cancel_appointment(appointment_id)
+        after = open(os.path.join(data_dir, "appointments.csv")).read()
+        appointment = db.get_appointment(appointment_id)
+        if not after.startswith(before.replace('\r\n', '\n')) or appointment['appointment_date'] != slot_time.strftime('%Y-%m-%d'):
+            print("✗ Writing the compact tables changed the file format")
+            return False
+        if str(db.appointments_df['status'].dtype) != 'category' or str(db.appointments_df['appointment_date'].dtype).split('[')[0] != 'datetime64':
+            print("✗ Appending and cancelling lost the compact dtypes")
+            return False
+        print("✓ Bookings keep the compact dtypes and files keep their text format")
+        
+        report = memory_benchmark(20000)
+        if report['compact_bytes'] >= report['plain_bytes']:
+            print(f"✗ Compact schema is not smaller: {report['compact_bytes']} vs {report['plain_bytes']} bytes")
+            return False
+        print(f"✓ 20,000 appointments take {report['compact_bytes'] / 2 ** 20:.1f} MB instead of {report['plain_bytes'] / 2 ** 20:.1f} MB")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Compact schema test failed: {e}")
+        return False
+
+def test_appointment_index():
+    """Test the patient, doctor and date indexes behind appointment searches"""
+    print("\nTesting appointment index...")
+    
+    try:
+        import time
+        from database import PatientDatabase
+        from appointment_index import AppointmentIndex
+        from frame_schema import _synthetic_appointments, apply_schema
+        
+        db = PatientDatabase(_copy_data_dir(), journal_mode=False)
+        doctor = db.get_doctors()[0]['name']
+        booked = []
+        for slot_time in db.available_slot_starts(doctor, None, 60)[:6]:
+            slot_time = pd.Timestamp(slot_time)
+            booked.append(db.book_appointment({
+                'patient_id': 'P1003',
+                'doctor_name': doctor,
+                'appointment_date': slot_time.strftime('%Y-%m-%d'),
+                'appointment_time': slot_time.strftime('%H:%M'),
+                'duration_minutes': 60,
+                'appointment_type': 'returning_patient'
+            }))
+        db.cancel_appointment(booked[0])
+        
+        df = db.appointments_df
+        dates = sorted(set(df['appointment_date'].dt.strftime('%Y-%m-%d')))
+        start, end = dates[1], dates[-2]
+        checks = [
+            (db.find_appointments(patient_id='P1003'), df['patient_id'] == 'P1003'),
+            (db.find_appointments(doctor_name=doctor, status='confirmed'), (df['doctor_name'] == doctor) & (df['status'] == 'confirmed')),
+            (db.find_appointments(start_date=start, end_date=end), (df['appointment_date'] >= start) & (df['appointment_date'] <= end)),
+            (db.find_appointments(patient_id='P1003', start_date=start), (df['patient_id'] == 'P1003') & (df['appointment_date'] >= start))
+        ]
+        for found, mask in checks:
+            if found['appointment_id'].tolist() != df[mask]['appointment_id'].tolist():
+                print("✗ Indexed search disagrees with a full scan")
+                return False
+        if [appointment['appointment_id'] for appointment in db.get_patient_appointments('P1003')][-6:] != booked:
+            print("✗ Patient appointments are missing new bookings")
+            return False
+        print("✓ Patient, doctor, date-range and status searches match a full scan, including new bookings")
+        
+        large = apply_schema(_synthetic_appointments(200000), 'appointments')
+        index = AppointmentIndex.build(large)
+        start_time = time.perf_counter()
+        for _ in range(100):
+            rows = index.rows_between('2025-06-01', '2025-06-01')
+        indexed = (time.perf_counter() - start_time) / 100
+        start_time = time.perf_counter()
+        for _ in range(10):
+            scanned = large.index[large['appointment_date'] == '2025-06-01'].tolist()
+        scan = (time.perf_counter() - start_time) / 10
+        if sorted(rows) != scanned:
+            print("✗ Date index disagrees with a full scan on 200,000 appointments")
+            return False
+        print(f"✓ One day of 200,000 appointments: {indexed * 1000:.3f} ms indexed vs {scan * 1000:.2f} ms scanned")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Appointment index test failed: {e}")
+        return False
+
+def test_appointment_partitions():
+    """Test monthly appointment partitions, lazy history reads and archival"""
+    print("\nTesting appointment partitions...")
+    
+    try:
+        import numpy as np
+        from datetime import datetime
+        from database import PatientDatabase
+        from frame_schema import _synthetic_appointments
+        
+        data_dir = _copy_data_dir()
+        history = _synthetic_appointments(3000)
+        offsets = np.random.default_rng(3).integers(-900, 60, len(history))
+        history['appointment_date'] = (pd.Timestamp(datetime.now().date()) + pd.to_timedelta(offsets, unit='D')).strftime('%Y-%m-%d')
+        history['appointment_id'] = [f"APT{number}" for number in range(5001, 5001 + len(history))]
+        existing = pd.read_csv(os.path.join(data_dir, "appointments.csv")) if os.path.exists(os.path.join(data_dir, "appointments.csv")) else pd.DataFrame()
+        history = pd.concat([existing, history], ignore_index=True)
+        history.to_csv(os.path.join(data_dir, "appointments.csv"), index=False)
+        
+        db = PatientDatabase(data_dir, journal_mode=False, partitioned=True)
+        hot_rows = history[history['appointment_date'].str[:7] >= db.hot_start]
+        if len(db.appointments_df) != len(hot_rows) or len(db.partitions.months()) < 24:
+            print("✗ Partitioned load did not keep only the recent months in memory")
+            return False
+        print(f"✓ {len(history)} appointments split into {len(db.partitions.months())} months; {len(hot_rows)} from {db.hot_start} on held in memory")
+        
+        cold = {month: os.stat(path).st_mtime_ns for month, path in db.partitions.months().items() if month < db.hot_start}
+        doctor = db.get_doctors()[0]['name']
+        slot_time = pd.Timestamp(db.available_slot_starts(doctor, None, 60)[0])
+        appointment_id = db.book_appointment({
+            'patient_id': 'P1003',
+            'doctor_name': doctor,
+            'appointment_date': slot_time.strftime('%Y-%m-%d'),
+            'appointment_time': slot_time.strftime('%H:%M'),
+            'duration_minutes': 60,
+            'appointment_type': 'returning_patient'
+        })
+        if any(os.stat(db.partitions.months()[month]).st_mtime_ns != mtime for month, mtime in cold.items()):
+            print("✗ A booking rewrote a past month")
+            return False
+        print("✓ Booking rewrites only the in-memory months")
+        
+        archived = db.archive_appointments()
+        if sorted(archived) != sorted(cold) or not all(db.partitions.months()[month].endswith('.parquet') for month in cold):
+            print("✗ Past months were not archived to parquet")
+            return False
+        full = db.appointment_history()
+        ids = full['appointment_id'].tolist()
+        if len(full) != len(history) + 1 or len(set(ids)) != len(ids) or appointment_id not in ids:
+            print("✗ Appointment history is missing rows or has duplicate IDs")
+            return False
+        if not pd.api.types.is_integer_dtype(full['duration_minutes']) or full['duration_minutes'].sum() != history['duration_minutes'].sum() + 60:
+            print("✗ Archived appointments came back with text durations")
+            return False
+        month = sorted(cold)[len(cold) // 2]
+        in_month = db.appointment_history(f"{month}-01", f"{month}-31")
+        if len(in_month) != (history['appointment_date'].str[:7] == month).sum():
+            print("✗ History for one past month disagrees with the source rows")
+            return False
+        print(f"✓ {len(archived)} past months archived; history over all {len(full)} appointments reads them back")
+        
+        reopened = PatientDatabase(data_dir, journal_mode=False, partitioned=True)
+        if sorted(reopened.appointments_df['appointment_id']) != sorted(db.appointments_df['appointment_id']):
+            print("✗ Reopened database holds different recent appointments")
+            return False
+        print("✓ Reopening loads the same recent months")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Appointment partitions test failed: {e}")
+        return False
+
+def test_write_coalescing():
+    """Test that bursts of writes are group-committed in one flush"""
+    print("\nTesting write coalescing...")
+    
+    try:
+        import threading
+        import time
+        from database import PatientDatabase
+        
+        timings = {}
+        for window_ms in (0, 50):
+            data_dir = _copy_data_dir()
+            db = PatientDatabase(data_dir, journal_mode=False, coalesce_ms=window_ms)
+            doctor = db.get_doctors()[0]['name']
+            slots = [pd.Timestamp(slot_time) for slot_time in db.available_slot_starts(doctor, None, 30)[:24]]
+            booked = []
+            
+            def book(slot_time):
+                booked.append(db.book_appointment({
+                    'patient_id': 'P1003',
+                    'doctor_name': doctor,
+                    'appointment_date': slot_time.strftime('%Y-%m-%d'),
+                    'appointment_time': slot_time.strftime('%H:%M'),
+                    'duration_minutes': 30,
+                    'appointment_type': 'returning_patient'
+                }))
+            
+            start = time.perf_counter()
+            threads = [threading.Thread(target=book, args=(slot_time,)) for slot_time in slots]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            db.flush()
+            timings[window_ms] = time.perf_counter() - start
+            
+            on_disk = set(pd.read_csv(os.path.join(data_dir, "appointments.csv"))['appointment_id'])
+            reopened = PatientDatabase(data_dir, journal_mode=False)
+            if len(booked) != len(slots) or not set(booked) <= on_disk or any(reopened.get_appointment(appointment_id) is None for appointment_id in booked):
+                print("✗ Bookings were not all durable after flush()")
+                return False
+            if window_ms:
+                writes, flushes = db.coalescer.writes, db.coalescer.flushes
+            db.close()
+        
+        if flushes >= writes:
+            print("✗ Coalescer wrote once per booking")
+            return False
+        print(f"✓ {writes} concurrent bookings flushed in {flushes} write(s): {timings[50]:.2f}s vs {timings[0]:.2f}s writing each through")
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir, journal_mode=False, coalesce_ms=60000)
+        patient_id = db.create_new_patient({'first_name': 'Ada', 'last_name': 'Lovelace', 'date_of_birth': '1815-12-10'})
+        if patient_id in set(pd.read_csv(os.path.join(data_dir, "patients.csv"))['patient_id']) or db.coalescer.pending() != {'patients'}:
+            print("✗ Coalesced write reached the file before its window closed")
+            return False
+        db.flush()
+        if patient_id not in set(pd.read_csv(os.path.join(data_dir, "patients.csv"))['patient_id']):
+            print("✗ flush() did not write the pending patient")
+            return False
+        db.close()
+        
+        db = PatientDatabase(data_dir, journal_mode=False, coalesce_ms=50)
+        patient_id = db.create_new_patient({'first_name': 'Grace', 'last_name': 'Hopper', 'date_of_birth': '1906-12-09'})
+        time.sleep(0.3)
+        if patient_id not in set(pd.read_csv(os.path.join(data_dir, "patients.csv"))['patient_id']) or db.coalescer.pending():
+            print("✗ Pending write was not flushed when its window closed")
+            return False
+        db.close()
+        print("✓ Pending writes wait for flush() or the end of their window")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Write coalescing test failed: {e}")
+        return False
+
+def test_bulk_import():
+    """Test chunked bulk patient import with vectorized validation"""
+    print("\nTesting bulk patient import...")
+    
+    try:
+        import time
+        from database import PatientDatabase
+        from bulk_import import PatientImporter
+        
+        data_dir = _copy_data_dir()
+        existing = pd.read_csv(os.path.join(data_dir, "patients.csv")).iloc[0]
+        rows = 3000
+        roster = pd.DataFrame({
+            'first_name': ['Alice', 'Bob', 'Carol', 'Dan'] * (rows // 4),
+            'last_name': [f"Rowe{chr(97 + number % 26)}{chr(97 + number // 26 % 26)}{chr(97 + number // 676 % 26)}" for number in range(rows)],
+            'date_of_birth': [f"19{50 + number % 50}-0{1 + number % 9}-1{number % 10}" for number in range(rows)],
+            'phone': '(555) 123-4567',
+            'email': [f"Patient{number}@Example.com" for number in range(rows)],
+            'preferred_doctor': '',
+            'insurance_carrier': 'aetna',
+            'insurance_member_id': 'abc12345',
+            'insurance_group_number': ''
+        })
+        bad = {
+            10: ('first_name', 'J'),
+            11: ('date_of_birth', '12/31/1980'),
+            12: ('date_of_birth', '2999-01-01'),
+            13: ('phone', '555-1234'),
+            14: ('email', 'not-an-email'),
+            15: ('preferred_doctor', 'Dr. Nobody'),
+            16: ('insurance_carrier', 'Acme Mutual'),
+            17: ('insurance_member_id', 'A1'),
+            18: ('insurance_group_number', 'G-1')
+        }
+        for position, (column, value) in bad.items():
+            roster.loc[position, column] = value
+        roster.loc[2500] = roster.loc[20]
+        roster.loc[21, ['first_name', 'last_name', 'date_of_birth']] = [existing['first_name'].upper(), existing['last_name'], existing['date_of_birth']]
+        import_path = os.path.join(data_dir, "import.csv")
+        roster.to_csv(import_path, index=False)
+        
+        db = PatientDatabase(data_dir, journal_mode=False)
+        db.match_patients(existing['first_name'], existing['last_name'])
+        matcher = db._patient_matcher
+        start = time.perf_counter()
+        result = PatientImporter(db, chunk_size=500).import_file(import_path)
+        elapsed = time.perf_counter() - start
+        report = result['rejections'].set_index('row')['reasons']
+        expected_fields = {position + 1: column for position, (column, value) in bad.items()}
+        if not result['success'] or result['imported'] != rows - len(bad) - 2:
+            print(f"✗ Bulk import accepted the wrong rows: {result['message']}")
+            return False
+        if any(not report[row].startswith(field) for row, field in expected_fields.items()):
+            print("✗ Rejection report does not name the failing field")
+            return False
+        if report[2501] != "Duplicate of row 21" or report[22] != f"Already registered as {existing['patient_id']}":
+            print("✗ Duplicates within the file or of existing patients were not reported")
+            return False
+        print(f"✓ {result['imported']} of {rows} patients imported in {elapsed:.2f}s; {result['rejected']} rejected with reasons")
+        
+        numbers = [int(patient_id[1:]) for patient_id in result['patient_ids']]
+        on_disk = pd.read_csv(os.path.join(data_dir, "patients.csv"))
+        patient = db.find_patient('alice', roster.loc[0, 'last_name'], roster.loc[0, 'date_of_birth'])
+        if numbers != list(range(numbers[0], numbers[0] + len(numbers))) or not set(result['patient_ids']) <= set(on_disk['patient_id']):
+            print("✗ Imported IDs are not one contiguous, persisted block")
+            return False
+        if patient is None or patient['email'] != 'patient0@example.com' or patient['insurance_carrier'] != 'Aetna' or patient['insurance_member_id'] != 'ABC12345':
+            print("✗ Imported values were not normalized like the intake does")
+            return False
+        if db._patient_matcher is not matcher or len(matcher) != len(db.patients_df) or db.match_patients('Alice', roster.loc[0, 'last_name'], limit=1)[0]['patient_id'] != patient['patient_id']:
+            print("✗ Fuzzy matcher was not extended with the imported patients")
+            return False
+        print("✓ IDs come from one block and imported values are normalized and searchable")
+        
+        data_dir = _copy_data_dir()
+        journaled = PatientDatabase(data_dir, journal_mode=True)
+        parquet_path = os.path.join(data_dir, "import.parquet")
+        roster.iloc[:200].to_parquet(parquet_path, index=False)
+        result = PatientImporter(journaled).import_file(parquet_path)
+        journaled.journal.close()
+        journaled.compactor.stop()
+        reopened = PatientDatabase(data_dir, journal_mode=False)
+        recovered = PatientDatabase(data_dir, journal_mode=True)
+        if not result['success'] or result['imported'] != 200 - len(bad) - 1 or len(recovered.patients_df) != len(reopened.patients_df) + result['imported']:
+            print("✗ Parquet import in journal mode was not replayed")
+            return False
+        recovered.close()
+        print("✓ Parquet import is journaled as one append and replays on restart")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Bulk import test failed: {e}")
+        return False
+
+def test_patient_dedup():
+    """Test blocked duplicate detection and merging of patient records"""
+    print("\nTesting patient deduplication...")
+    
+    try:
+        from datetime import datetime
+        from database import PatientDatabase
+        from patient_dedup import PatientDeduplicator
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir, journal_mode=False)
+        original = db.get_patient('P1000')
+        chat_copy = db.create_new_patient({'first_name': original['first_name'].lower(), 'last_name': original['last_name'].lower(), 'date_of_birth': original['date_of_birth']})
+        misspelled = db.create_new_patient({
+            'first_name': original['first_name'][0] + original['first_name'][2:],
+            'last_name': original['last_name'],
+            'date_of_birth': original['date_of_birth'],
+            'phone': f"({original['phone'][:3]}) {original['phone'][4:]}",
+            'email': 'new.address@email.com'
+        })
+        namesake = db.create_new_patient({'first_name': original['first_name'], 'last_name': original['last_name'], 'date_of_birth': '1961-07-04'})
+        
+        slot_time = pd.Timestamp(db.available_slot_starts(db.get_doctors()[0]['name'], None, 30)[0])
+        appointment_id = db.book_appointment({
+            'patient_id': chat_copy,
+            'doctor_name': db.get_doctors()[0]['name'],
+            'appointment_date': slot_time.strftime('%Y-%m-%d'),
+            'appointment_time': slot_time.strftime('%H:%M'),
+            'duration_minutes': 30,
+            'appointment_type': 'new_patient'
+        })
+        db.append_reminder_log({
+            'appointment_id': appointment_id, 'patient_id': chat_copy, 'reminder_type': 'confirmation',
+            'sent_at': datetime.now().isoformat(), 'email_success': True, 'sms_success': False, 'response_received': False
+        })
+        db.waitlist.add(misspelled, 30)
+        
+        deduplicator = PatientDeduplicator(db)
+        proposals = deduplicator.proposals()
+        pairs = set(zip(proposals['survivor_id'], proposals['duplicate_id']))
+        if not {('P1000', chat_copy), ('P1000', misspelled)} <= pairs or any(namesake in pair for pair in pairs):
+            print(f"✗ Unexpected merge proposals: {sorted(pairs)}")
+            return False
+        if deduplicator.stats['candidate_pairs'] * 10 > deduplicator.stats['all_pairs']:
+            print("✗ Blocking did not prune the pairwise comparison")
+            return False
+        print(f"✓ {len(proposals)} merge proposals from {deduplicator.stats['candidate_pairs']} of {deduplicator.stats['all_pairs']} possible pairs; namesake with another DOB kept apart")
+        
+        db.match_patients(original['first_name'], original['last_name'])
+        matcher = db._patient_matcher
+        results = deduplicator.merge(proposals)
+        merged = db.get_patient('P1000')
+        if not all(result['success'] for result in results) or db.get_patient(chat_copy) or db.get_patient(misspelled):
+            print("✗ Duplicates were not merged")
+            return False
+        if db.get_appointment(appointment_id)['patient_id'] != 'P1000' or appointment_id not in db.find_appointments(patient_id='P1000')['appointment_id'].tolist():
+            print("✗ Appointment did not move to the surviving patient")
+            return False
+        reminder_log = db.load_reminder_log()
+        if chat_copy in set(reminder_log['patient_id']) or any(entry['patient_id'] == misspelled for entry in db.waitlist.entries.values()):
+            print("✗ Reminder history or waitlist still refers to a merged patient")
+            return False
+        if merged['email'] != original['email'] or db.get_patient(namesake) is None:
+            print("✗ Merge overwrote the survivor's details or removed a different person")
+            return False
+        candidate_ids = [candidate['patient_id'] for candidate in db.match_patients(original['first_name'], original['last_name'], limit=10)]
+        if db._patient_matcher is not matcher or len(matcher) != len(db.patients_df) or chat_copy in candidate_ids or 'P1000' not in candidate_ids:
+            print("✗ Fuzzy matcher still offers merged patients or was rebuilt")
+            return False
+        print("✓ Appointments, reminder history and waitlist moved to the surviving patient")
+        
+        reopened = PatientDatabase(data_dir, journal_mode=False)
+        if reopened.get_patient(chat_copy) or reopened.get_appointment(appointment_id)['patient_id'] != 'P1000' or not PatientDeduplicator(reopened).proposals().empty:
+            print("✗ Merge was not persisted")
+            return False
+        print("✓ Merge persists and a second run proposes nothing")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Patient dedup test failed: {e}")
+        return False
+
 def test_ai_agent():
     """Test AI agent functionality"""
     print("\nTesting AI agent...")
@@ -186,11 +1362,367 @@ def test_ai_agent():
             print("✗ AI agent greeting failed")
             return False
         
+        # A misspelled returning patient is offered the close match and confirmed by date of birth
+        patient = agent.db.get_patient(agent.db.patients_df['patient_id'].iloc[0])
+        response = agent.process_message(f"{patient['first_name']} {patient['last_name']}x")
+        if agent.conversation_state.get('waiting_for') != 'patient_match_dob':
+            print(f"✗ AI agent did not offer a close match: {response}")
+            return False
+        agent.process_message(patient['date_of_birth'])
+        if agent.conversation_state['patient_data'].get('patient_id') != patient['patient_id']:
+            print("✗ AI agent did not confirm the close match by date of birth")
+            return False
+        print("✓ AI agent recovers misspelled names through fuzzy matching")
+        
         return True
     except Exception as e:
         print(f"✗ AI agent test failed: {e}")
         return False
 
+def test_sqlite_storage():
+    """Test the SQLite storage backend"""
+    print("\nTesting SQLite storage...")
+    
+    try:
+        from database import PatientDatabase
+        from sqlite_storage import SQLitePatientDatabase
+        
+        data_dir = _copy_data_dir()
+        database_url = f"sqlite:///{os.path.join(data_dir, 'clinic.db')}"
+        db = SQLitePatientDatabase(data_dir, database_url)
+        print(f"✓ Migrated {len(db.patients_df)} patients into SQLite")
+        
+        patient_id = db.create_new_patient({
+            'first_name': 'Test', 'last_name': 'Sqlite', 'date_of_birth': '1990-01-01'
+        })
+        patient = db.find_patient('test', 'SQLITE')
+        if not patient or patient['patient_id'] != patient_id:
+            print("✗ SQLite patient lookup failed")
+            return False
+        print("✓ SQLite patient create and lookup works")
+        
+        slot = db.get_available_slots(db.get_doctors()[0]['name'])[0]
+        appointment_id = db.book_appointment({
+            'patient_id': patient_id,
+            'doctor_name': slot['doctor_name'],
+            'appointment_date': slot['date'],
+            'appointment_time': slot['time_slot'].split()[1],
+            'duration_minutes': 60,
+            'appointment_type': 'new_patient'
+        })
+        
+        reopened = SQLitePatientDatabase(data_dir, database_url)
+        booked = reopened.get_patient_appointments(patient_id)
+        if not booked or booked[0]['appointment_id'] != appointment_id:
+            print("✗ SQLite booking was not persisted")
+            return False
+        if slot in reopened.get_available_slots(slot['doctor_name'], slot['date']):
+            print("✗ SQLite booking did not claim the slot")
+            return False
+        print("✓ SQLite booking persisted and slot claimed")
+        
+        if not pd.api.types.is_datetime64_any_dtype(reopened.appointments_df['appointment_date']) or reopened.schedule_df['is_available'].dtype != 'boolean':
+            print("✗ SQLite tables are not read back in the schema dtypes")
+            return False
+        # Searches return the same dtypes whichever backend serves them
+        file_found = PatientDatabase(data_dir).find_appointments(start_date=slot['date']).dtypes.astype(str)
+        sqlite_found = reopened.find_appointments(start_date=slot['date']).dtypes.astype(str)
+        if not sqlite_found.equals(file_found):
+            print(f"✗ SQLite appointment search dtypes differ from the file backend: {dict(sqlite_found[sqlite_found != file_found])}")
+            return False
+        with reopened.store.lock, reopened.store.conn:
+            reopened.store.conn.execute(
+                "INSERT INTO appointments (appointment_id, patient_id, doctor_name, appointment_date, appointment_time, duration_minutes, status) "
+                "VALUES ('APT900', ?, ?, '2020-01-06', '09:00', 30, 'confirmed')", (patient_id, slot['doctor_name'])
+            )
+        fresh = SQLitePatientDatabase(data_dir, database_url)
+        first_day = min(day for days in fresh.availability.free.values() for day in days)
+        if first_day < datetime.strptime(fresh._bookable_from(), '%Y-%m-%d').toordinal() or fresh.appointment_intervals.overlapping(slot['doctor_name'], datetime(2020, 1, 6, 9, 0), 30):
+            print("✗ SQLite availability was built from days that can no longer be booked")
+            return False
+        print("✓ SQLite tables come back typed and availability reads only bookable days")
+        
+        return True
+    except Exception as e:
+        print(f"✗ SQLite storage test failed: {e}")
+        return False
+
+def test_booking_journal():
+    """Test journal mode replay and compaction"""
+    print("\nTesting booking journal...")
+    
+    try:
+        import pandas as pd
+        from database import PatientDatabase
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir, journal_mode=True)
+        db.compactor.stop()
+        
+        patient_id = db.create_new_patient({
+            'first_name': 'Journal', 'last_name': 'Test', 'date_of_birth': '1985-05-05'
+        })
+        slot = db.get_available_slots(db.get_doctors()[0]['name'])[0]
+        appointment_id = db.book_appointment({
+            'patient_id': patient_id,
+            'doctor_name': slot['doctor_name'],
+            'appointment_date': slot['date'],
+            'appointment_time': slot['time_slot'].split()[1],
+            'duration_minutes': 60,
+            'appointment_type': 'new_patient'
+        })
+        
+        if appointment_id in set(pd.read_csv(db.appointments_file)['appointment_id']):
+            print("✗ Journal mode rewrote appointments.csv on booking")
+            return False
+        print(f"✓ Booking appended to journal ({db.journal.record_count} records)")
+        
+        # A new instance without close() simulates a restart after a crash
+        recovered = PatientDatabase(data_dir, journal_mode=True)
+        recovered.compactor.stop()
+        if not recovered.get_patient_appointments(patient_id) or slot in recovered.get_available_slots(slot['doctor_name'], slot['date']):
+            print("✗ Journal replay did not restore the booking")
+            return False
+        print("✓ Journal replay restores bookings after restart")
+        
+        recovered.compact_journal()
+        if recovered.journal.record_count != 0 or appointment_id not in set(pd.read_csv(db.appointments_file)['appointment_id']):
+            print("✗ Journal compaction failed")
+            return False
+        recovered.close()
+        print("✓ Journal compaction folds records into the base files")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Booking journal test failed: {e}")
+        return False
+
+def test_schedule_cache():
+    """Test the schedule sidecar cache"""
+    print("\nTesting schedule cache...")
+    
+    try:
+        from database import PatientDatabase
+        
+        data_dir = _copy_data_dir()
+        first = PatientDatabase(data_dir)
+        second = PatientDatabase(data_dir)
+        if first.load_timings['schedule_source'] != 'excel' or second.load_timings['schedule_source'] != 'cache':
+            print("✗ Schedule cache was not used on the second load")
+            return False
+        if not second.schedule_df.equals(first.schedule_df):
+            print("✗ Cached schedule differs from the Excel schedule")
+            return False
+        print(f"✓ Schedule loaded from cache in {second.load_timings['schedule'] * 1000:.1f} ms")
+        
+        edited = first.schedule_df.iloc[:-1]
+        edited.to_excel(first.schedule_file, index=False)
+        third = PatientDatabase(data_dir)
+        if third.load_timings['schedule_source'] != 'excel' or len(third.schedule_df) != len(edited):
+            print("✗ Schedule cache was not rebuilt after the xlsx changed")
+            return False
+        print("✓ Schedule cache rebuilds when the xlsx changes")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Schedule cache test failed: {e}")
+        return False
+
+def test_patient_index():
+    """Test the patient name index"""
+    print("\nTesting patient index...")
+    
+    try:
+        from database import PatientDatabase
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir)
+        existing = db.patients_df.iloc[0]
+        
+        patient = db.find_patient(existing['first_name'].upper(), f"  {existing['last_name'].lower()} ")
+        if not patient or patient['patient_id'] != existing['patient_id']:
+            print("✗ Indexed lookup did not find an existing patient")
+            return False
+        if db.find_patient(existing['first_name'], existing['last_name'], '1800-01-01'):
+            print("✗ Indexed lookup ignored the date of birth")
+            return False
+        print("✓ Indexed lookup is case-insensitive and honors date of birth")
+        
+        patient_id = db.create_new_patient({
+            'first_name': 'Indexed', 'last_name': 'Patient', 'date_of_birth': '1970-07-07'
+        })
+        patient = db.find_patient('indexed', 'patient', '1970-07-07')
+        if not patient or patient['patient_id'] != patient_id or len(db.patient_index) != len(db.patients_df):
+            print("✗ Patient index was not updated by create_new_patient")
+            return False
+        print("✓ Patient index is maintained incrementally")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Patient index test failed: {e}")
+        return False
+
+def test_patient_matching():
+    """Test fuzzy and phonetic patient matching"""
+    print("\nTesting patient matching...")
+    
+    try:
+        from database import PatientDatabase
+        from patient_matching import soundex, metaphone
+        
+        if soundex("Robert") != soundex("Rupert") or metaphone("Smith") != metaphone("Smyth"):
+            print("✗ Phonetic encoders disagree on equivalent names")
+            return False
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir)
+        existing = db.patients_df.iloc[0]
+        misspelled_last = existing['last_name'] + existing['last_name'][-1]
+        
+        candidates = db.match_patients(existing['first_name'], misspelled_last, limit=3)
+        if not candidates or candidates[0]['patient_id'] != existing['patient_id']:
+            print("✗ Misspelled name did not rank the right patient first")
+            return False
+        print(f"✓ '{existing['first_name']} {misspelled_last}' matched {candidates[0]['patient_id']} (score {candidates[0]['score']})")
+        
+        twin_id = db.create_new_patient({
+            'first_name': existing['first_name'], 'last_name': existing['last_name'], 'date_of_birth': '1999-09-09'
+        })
+        candidates = db.match_patients(existing['first_name'], misspelled_last, '1999-09-09', limit=3)
+        if candidates[0]['patient_id'] != twin_id or not candidates[0]['dob_match']:
+            print("✗ Date of birth did not break the tie between equal names")
+            return False
+        print("✓ Date of birth breaks ties between equally scored candidates")
+        
+        mixed_id = db.create_new_patient({'first_name': "Sean", 'last_name': "McDonald-O'Neil", 'date_of_birth': '1988-03-14'})
+        candidates = db.match_patients("Sean", "Mcdonald-Oneil", limit=1)
+        if candidates[0]['patient_id'] != mixed_id or candidates[0]['last_name'] != "McDonald-O'Neil":
+            print(f"✗ Candidate name was not returned as registered: {candidates[0]['last_name']}")
+            return False
+        print("✓ Candidates keep the registered spelling of mixed-case names")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Patient matching test failed: {e}")
+        return False
+
+def test_conflict_index():
+    """Test the per-doctor interval index behind check_conflicts"""
+    print("\nTesting conflict index...")
+    
+    try:
+        import random
+        from datetime import timedelta
+        from database import PatientDatabase
+        from scheduling import SmartScheduler
+        from frame_schema import to_records
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir)
+        scheduler = SmartScheduler(db)
+        
+        slot = db.get_available_slots(db.get_doctors()[1]['name'])[0]
+        db.book_appointment({
+            'patient_id': 'P1000',
+            'doctor_name': slot['doctor_name'],
+            'appointment_date': slot['date'],
+            'appointment_time': slot['time_slot'].split()[1],
+            'duration_minutes': 60,
+            'appointment_type': 'returning_patient'
+        })
+        
+        def brute_force(doctor_name, start, duration):
+            end = start + timedelta(minutes=duration)
+            for appointment in to_records(db.appointments_df[db.appointments_df['doctor_name'] == doctor_name], 'appointments'):
+                existing_start = datetime.strptime(f"{appointment['appointment_date']} {appointment['appointment_time']}", '%Y-%m-%d %H:%M')
+                if start < existing_start + timedelta(minutes=int(appointment['duration_minutes'])) and end > existing_start:
+                    return True
+            return False
+        
+        base = datetime.strptime(slot['time_slot'], '%Y-%m-%d %H:%M')
+        probes = [base + timedelta(minutes=random.randint(-24 * 60, 24 * 60)) for _ in range(200)]
+        probe_strings = [probe.strftime('%Y-%m-%d %H:%M') for probe in probes]
+        
+        expected = [brute_force(slot['doctor_name'], probe, 30) for probe in probes]
+        if scheduler.check_conflicts_batch(slot['doctor_name'], probe_strings, 30) != expected:
+            print("✗ Batch conflict check disagrees with a full scan")
+            return False
+        if not scheduler.check_conflicts(slot['doctor_name'], slot['time_slot'], 30):
+            print("✗ New booking was not added to the conflict index")
+            return False
+        print("✓ Interval index agrees with a full scan and tracks new bookings")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Conflict index test failed: {e}")
+        return False
+
+def test_availability_bitmap():
+    """Test slot queries served from the per-doctor availability bitmap"""
+    print("\nTesting availability bitmap...")
+    
+    try:
+        from database import PatientDatabase
+        
+        data_dir = _copy_data_dir()
+        db = PatientDatabase(data_dir)
+        
+        for doctor in db.get_doctors():
+            mask = (db.schedule_df['doctor_name'] == doctor['name']) & (db.schedule_df['is_available'] == True)
+            expected = sorted(db.schedule_df[mask]['time_slot'].dt.strftime('%Y-%m-%d %H:%M').tolist())
+            if [slot['time_slot'] for slot in db.get_available_slots(doctor['name'])] != expected:
+                print(f"✗ Bitmap slots disagree with the schedule for {doctor['name']}")
+                return False
+        print("✓ Bitmap slots match the schedule for every doctor")
+        
+        slot = db.get_available_slots(db.get_doctors()[0]['name'])[0]
+        db.book_appointment({
+            'patient_id': 'P1000',
+            'doctor_name': slot['doctor_name'],
+            'appointment_date': slot['date'],
+            'appointment_time': slot['time_slot'].split()[1],
+            'duration_minutes': 30,
+            'appointment_type': 'returning_patient'
+        })
+        
+        remaining = [s['time_slot'] for s in db.get_available_slots(slot['doctor_name'], slot['date'])]
+        if slot['time_slot'] in remaining:
+            print("✗ Booked slot is still offered")
+            return False
+        
+        window = db.first_available_window(slot['doctor_name'], slot['date'], 60)
+        if window is None or window == slot['time_slot'] or window[:10] != slot['date']:
+            print(f"✗ Unexpected first 60-minute window: {window}")
+            return False
+        if db.first_available_window(slot['doctor_name'], slot['date'], 24 * 60) is not None:
+            print("✗ Found a window longer than any free stretch")
+            return False
+        print(f"✓ Booking removes the slot; first free hour on {slot['date']} starts {window[11:]}")
+        
+        # In fixed mode only the schedule's slot starts are bookable
+        from database import BookingConflictError
+        offered = db.get_available_slots(db.get_doctors()[1]['name'])[0]
+        between = datetime.strptime(offered['time_slot'], '%Y-%m-%d %H:%M') + timedelta(minutes=15)
+        request = {
+            'patient_id': 'P1001', 'doctor_name': offered['doctor_name'], 'appointment_date': offered['date'],
+            'appointment_time': between.strftime('%H:%M'), 'duration_minutes': 30, 'appointment_type': 'returning_patient'
+        }
+        try:
+            db.book_appointment(request)
+            print("✗ A start between fixed slots was booked")
+            return False
+        except BookingConflictError:
+            pass
+        if offered not in db.get_available_slots(offered['doctor_name'], offered['date']) or not db.book_appointment(dict(request, appointment_time=offered['time_slot'][11:])):
+            print("✗ Rejected in-between start disturbed the offered slot")
+            return False
+        print(f"✓ Starts between fixed slots are rejected ({between.strftime('%H:%M')}); the slot at {offered['time_slot'][11:]} stays bookable")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Availability bitmap test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🏥 AI Healthcare Scheduling Agent - System Test")
@@ -202,6 +1734,31 @@ def main():
         test_patient_intake,
         test_insurance_collection,
         test_scheduling,
+        test_sqlite_storage,
+        test_booking_journal,
+        test_schedule_cache,
+        test_patient_index,
+        test_patient_matching,
+        test_conflict_index,
+        test_availability_bitmap,
+        test_vectorized_slot_filter,
+        test_single_pass_suggestions,
+        test_next_available_slot,
+        test_availability_cache,
+        test_slot_engine,
+        test_schedule_templates,
+        test_slot_holds,
+        test_batch_scheduler,
+        test_cancel_and_reschedule,
+        test_multi_process_booking,
+        test_id_sequence,
+        test_shared_database,
+        test_compact_schema,
+        test_appointment_index,
+        test_appointment_partitions,
+        test_write_coalescing,
+        test_bulk_import,
+        test_patient_dedup,
         test_ai_agent
     ]
     
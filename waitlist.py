@@ -0,0 +1,111 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+from id_sequence import next_free_number
+
+WAITLIST_COLUMNS = [
+    'waitlist_id', 'patient_id', 'doctor_name', 'duration_minutes', 'earliest_date',
+    'latest_date', 'status', 'added_at', 'offered_slot', 'offer_expires_at'
+]
+
+
+class Waitlist:
+    """Patients waiting for an earlier or any opening, in the order they joined.
+
+    An entry is 'waiting' until a freed slot is offered to it, 'offered'
+    while that offer is held for it, and 'booked' or 'removed' afterwards.
+    An offer that lapses puts the entry back in line for the next opening.
+    Kept in data/waitlist.csv. It only ever holds a handful of rows, so
+    every change re-reads and rewrites the file under `lock`, which other
+    processes sharing the data directory also take.
+    """
+
+    def __init__(self, path: str, lock=None, id_sequence=None):
+        self.path = path
+        self.lock = lock if lock is not None else threading.RLock()
+        self.id_sequence = id_sequence
+        self.entries: Dict[str, Dict] = {}
+        self.reload()
+
+    def reload(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            df = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+            for record in df.to_dict('records'):
+                record['duration_minutes'] = int(record['duration_minutes'])
+                self.entries[record['waitlist_id']] = record
+
+    def _save(self):
+        pd.DataFrame(list(self.entries.values()), columns=WAITLIST_COLUMNS).to_csv(self.path, index=False)
+
+    def reassign_patient(self, old_patient_id: str, new_patient_id: str) -> int:
+        """Move every entry of one patient to another; returns how many moved"""
+        with self.lock:
+            self.reload()
+            moved = [entry for entry in self.entries.values() if entry['patient_id'] == old_patient_id]
+            for entry in moved:
+                entry['patient_id'] = new_patient_id
+            if moved:
+                self._save()
+            return len(moved)
+
+    def add(self, patient_id: str, duration_minutes: int, doctor_name: str = None, earliest_date: str = None, latest_date: str = None) -> str:
+        with self.lock:
+            self.reload()
+            if self.id_sequence is not None:
+                waitlist_id = self.id_sequence.next_id('WL')
+            else:
+                waitlist_id = f"WL{next_free_number(self.entries, 'WL'):04d}"
+            self.entries[waitlist_id] = {
+                'waitlist_id': waitlist_id,
+                'patient_id': patient_id,
+                'doctor_name': doctor_name or '',
+                'duration_minutes': int(duration_minutes),
+                'earliest_date': earliest_date or '',
+                'latest_date': latest_date or '',
+                'status': 'waiting',
+                'added_at': datetime.now().isoformat(),
+                'offered_slot': '',
+                'offer_expires_at': ''
+            }
+            self._save()
+        return waitlist_id
+
+    def get(self, waitlist_id: str) -> Optional[Dict]:
+        return self.entries.get(waitlist_id)
+
+    def waiting(self) -> List[Dict]:
+        return [entry for entry in self.entries.values() if entry['status'] in ('waiting', 'offered')]
+
+    def candidates(self, doctor_name: str, date: str, now: datetime = None) -> Iterator[Dict]:
+        """Entries that would take a slot with this doctor on this date, first come first served"""
+        now = now or datetime.now()
+        for entry in self.entries.values():
+            if entry['status'] == 'offered' and entry['offer_expires_at'] > now.isoformat():
+                continue
+            if entry['status'] not in ('waiting', 'offered'):
+                continue
+            if entry['doctor_name'] and entry['doctor_name'] != doctor_name:
+                continue
+            if entry['earliest_date'] and date < entry['earliest_date']:
+                continue
+            if entry['latest_date'] and date > entry['latest_date']:
+                continue
+            yield entry
+
+    def mark_offered(self, waitlist_id: str, doctor_name: str, time_slot: str, ttl_seconds: float, now: datetime = None):
+        with self.lock:
+            self.reload()
+            entry = self.entries[waitlist_id]
+            entry['status'] = 'offered'
+            entry['offered_slot'] = f"{doctor_name}|{time_slot}"
+            entry['offer_expires_at'] = ((now or datetime.now()) + timedelta(seconds=ttl_seconds)).isoformat()
+            self._save()
+
+    def set_status(self, waitlist_id: str, status: str):
+        with self.lock:
+            self.reload()
+            self.entries[waitlist_id]['status'] = status
+            self._save()
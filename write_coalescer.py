@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Callable, Iterable, Optional, Set
+from process_lock import ProcessLock
+
+
+class WriteCoalescer(threading.Thread):
+    """Background thread that group-commits file writes.
+
+    A write applies its change in memory and calls mark() with the tables
+    it touched instead of rewriting them. The first mark of a batch opens
+    a window of window_seconds; every write landing in it joins the batch,
+    and when it closes each dirty table is written once, however many
+    writes touched it. flush() writes the batch straight away for callers
+    that need the change on disk before they continue.
+
+    While a batch is pending the process lock stays pinned, so no other
+    process can write the files, or read them stale, before the flush.
+    """
+
+    def __init__(self, write_tables: Callable[[Set[str]], None], process_lock: ProcessLock, window_seconds: float = 0.05):
+        super().__init__(name="write-coalescer", daemon=True)
+        self.write_tables = write_tables
+        self.process_lock = process_lock
+        self.window_seconds = window_seconds
+        self._dirty: Set[str] = set()
+        self._opened_at = 0.0
+        self._changed = threading.Condition()
+        self._halt = False
+        self.writes = 0
+        self.flushes = 0
+        self.last_error: Optional[str] = None
+
+    def mark(self, tables: Iterable[str]):
+        """Queue tables for the next flush; call while holding the process lock"""
+        with self._changed:
+            if not self._dirty:
+                self.process_lock.pin()
+                self._opened_at = time.monotonic()
+            self._dirty.update(tables)
+            self.writes += 1
+            self._changed.notify()
+
+    def pending(self) -> Set[str]:
+        with self._changed:
+            return set(self._dirty)
+
+    def flush(self) -> int:
+        """Write every pending table now; returns how many were written"""
+        with self.process_lock:
+            with self._changed:
+                dirty = self._dirty
+                self._dirty = set()
+            if not dirty:
+                return 0
+            try:
+                self.write_tables(dirty)
+            except Exception:
+                # Still pending: retried when the next window closes, and still pinned until then
+                with self._changed:
+                    self._dirty |= dirty
+                    self._opened_at = time.monotonic()
+                raise
+            self.process_lock.unpin()
+            self.flushes += 1
+            return len(dirty)
+
+    def run(self):
+        while True:
+            with self._changed:
+                while not self._halt and (not self._dirty or time.monotonic() < self._opened_at + self.window_seconds):
+                    self._changed.wait(self._opened_at + self.window_seconds - time.monotonic() if self._dirty else None)
+                if self._halt:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error flushing coalesced writes: {e}")
+
+    def stop(self):
+        """Flush whatever is pending and end the thread"""
+        self.flush()
+        with self._changed:
+            self._halt = True
+            self._changed.notify()
+        if self.is_alive():
+            self.join()